@@ -1,32 +1,44 @@
 import asyncio
+import json
 from collections import defaultdict
+from itertools import groupby
 from contextlib import asynccontextmanager
 import os
 import time
 import uuid
 import re
 import uvicorn
+from typing import List, Optional
 from fastapi import FastAPI, Depends, Request, HTTPException
+from fastapi.responses import JSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import select, delete
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+# Several workers each write and rotate their own log files. Set before the first logger is created
+if int(os.getenv("BACKEND_WORKERS", 1)) > 1:
+    os.environ["LOG_FILE_SUFFIX"] = str(os.getpid())
 
 #from backend import crud
 from backend.utils.embed_builder import EmbedBuilder
-from backend.utils.models import Event, Seat, RawEventData
-from backend.utils.schema import SeatingPayload, EventCreateRequest, EventResponse
+from backend.utils.models import Event, Seat, RawEventData, EventLease, AlertRule
+from backend.utils.schema import (SeatingPayload, EventCreateRequest, EventResponse, LeaseClaimRequest,
+                                  LeaseRenewRequest, LeaseReleaseRequest, LeaseClaimResponse, LeaseRenewResponse,
+                                  AlertRuleCreate, AlertRuleResponse)
+from backend.utils.alert_rules import AlertRuleIndex
+from backend.utils.shared_state import BACKEND_WORKERS, create_shared_state
 from backend.utils.db import SessionLocal, init_db
+from backend.utils import outbox
+from backend.utils.event_registry import LEASE_TTL, load_event_list, claim_leases, renew_leases, release_leases
+from backend.utils.history_store import HISTORY, HISTORY_COMPACT_INTERVAL, HistoryStore
+from backend.utils.ingest_recorder import INGEST_RECORD_PATH, IngestRecorder, worker_path
+from backend.utils.rollups import (RESOLUTIONS, ROLLUP_FIELDS, ROLLUP_SERIES, prune_rollups, query_rollups,
+                                   upsert_rollups)
 import httpx
 from os import getenv
 from utils.logger import setup_logger
-
-from dotenv import load_dotenv
-
-load_dotenv(override=True)
-
-# creating logfile if isn't already there
-log_path = os.path.join("logs", "fastapi.log")
-if not os.path.exists(log_path):
-    open(log_path, "w").close()
+from utils.profiling import install_profiler
 
 logger = setup_logger("FASTAPI", logfile='./logs/fastapi.log')
 logger.propagate = False
@@ -41,88 +53,176 @@ def get_db():
 
 DEBUG = True if getenv("DEBUG", "True") == "True" else False
 BUFFER_INTERVAL = 5 # in seconds
-events_db = {}
-seats_db = {}
 
+# Identifies this worker process in shared leases
+WORKER_ID = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+# A worker that stops renewing its dispatcher lease for this long is replaced by another one
+DISPATCHER_LEASE_TTL = 3 * BUFFER_INTERVAL
 
-last_reset_time = 0
-
-buffers = defaultdict(list)          # Map webhook_url -> list of messages
-buffer_locks = defaultdict(asyncio.Lock)  # Map webhook_url -> individual lock
-flush_tasks = {}
-last_reset_time = 0
-remaining_requests = 5
-lock = asyncio.Lock()
+shared_state = create_shared_state()
+profiler = install_profiler("backend")
+# webhook -> task sending its outbox messages, in this worker
+senders = {}
 
 logger.info(f"Debug enabled: {DEBUG}")
 
-async def flush_buffer(webhook_url):
+async def dispatch_messages():
+    """
+    Every BUFFER_INTERVAL, start sending the outbox messages of each webhook. Each webhook is sent
+    by the one worker holding its lease, so messages aren't sent twice and stay in order.
+    """
     while True:
         await asyncio.sleep(BUFFER_INTERVAL)
-        async with buffer_locks[webhook_url]:
-            if buffers[webhook_url]:
-                combined_message = buffers[webhook_url][:10]
-                buffers[webhook_url] = buffers[webhook_url][10:]
-                logger.info(f"Sending message to {webhook_url}: \n{combined_message}")
-                if not DEBUG:
-                    asyncio.create_task(send_to_discord(combined_message, webhook_url))
-                else:
-                    print(f"Buffered Message for {webhook_url}:\n", combined_message)
-
-async def add_to_msg_buffer(message, webhook_url):
-    # Start flusher if not already started
-    if webhook_url not in flush_tasks:
-        logger.info(f"Started flush buffer for {webhook_url}")
-        flush_tasks[webhook_url] = asyncio.create_task(flush_buffer(webhook_url))
-
-    async with buffer_locks[webhook_url]:
-        logger.info(f"Added msg to buffer for {webhook_url}")
-        buffers[webhook_url].append(message)
+        try:
+            with SessionLocal() as db:
+                if await asyncio.to_thread(alert_rules.refresh, db):
+                    logger.info("Reloaded alert rules changed by another worker")
+                webhooks = await asyncio.to_thread(outbox.pending_webhooks, db)
+            for webhook_url in webhooks:
+                if webhook_url in senders and not senders[webhook_url].done():
+                    continue
+                if not await hold_dispatch_lease(webhook_url):
+                    continue
+                senders[webhook_url] = asyncio.create_task(send_outbox(webhook_url))
+        except Exception as e:
+            logger.error(f"Dispatching messages failed: {e}")
+
+async def hold_dispatch_lease(webhook_url) -> bool:
+    """Take or renew this worker's lease on sending a webhook's outbox. False if another worker holds it."""
+    return await asyncio.to_thread(shared_state.acquire, f"dispatch:{webhook_url}", WORKER_ID, DISPATCHER_LEASE_TTL)
+
+async def sleep_holding_lease(webhook_url, seconds) -> bool:
+    """
+    Sleep, renewing the webhook's dispatcher lease well before it expires, so no other worker
+    takes over and sends the same batch meanwhile. False if the lease was lost anyway.
+    """
+    deadline = time.monotonic() + seconds
+    while (remaining := deadline - time.monotonic()) > 0:
+        await asyncio.sleep(min(remaining, DISPATCHER_LEASE_TTL / 3))
+        if not await hold_dispatch_lease(webhook_url):
+            return False
+    return True
+
+async def send_outbox(webhook_url):
+    """Send a webhook's outbox in batches of up to 10 embeds, oldest first, until it's empty or a batch has to wait."""
+    with SessionLocal() as db:
+        while await hold_dispatch_lease(webhook_url):
+            batch = await asyncio.to_thread(outbox.next_batch, db, webhook_url)
+            if not batch:
+                return
+            ids = [message.id for message in batch]
+            embeds = [json.loads(message.embed) for message in batch]
+            logger.info(f"Sending message to {webhook_url}: \n{embeds}")
+            if DEBUG:
+                # Only logged
+                status = 200
+            else:
+                # Wait out the webhook's rate limit without letting the lease expire
+                remaining_requests, reset_at = await asyncio.to_thread(shared_state.get_rate_limit, webhook_url)
+                if remaining_requests == 0 and not await sleep_holding_lease(webhook_url, reset_at - time.time()):
+                    return
+                status, retry_after = await send_to_discord(embeds, webhook_url)
+                if retry_after and not await sleep_holding_lease(webhook_url, retry_after):
+                    # The new holder retries the batch
+                    return
+
+            if status is not None and (200 <= status < 300 or (400 <= status < 500 and status != 429)):
+                # Client errors won't go away by retrying
+                await asyncio.to_thread(outbox.delivered, db, ids)
+            elif not await asyncio.to_thread(outbox.failed, db, ids, max(message.attempts for message in batch) + 1):
+                logger.error(f"Dropped {len(ids)} messages to {webhook_url} after {outbox.OUTBOX_MAX_ATTEMPTS} attempts")
 
 async def send_to_discord( embeds, webhook_url):
-    global last_reset_time, remaining_requests
-
+    """
+    Post embeds to a webhook and store the rate limit Discord reports. Returns the response status
+    (None if the request failed) and the seconds Discord asked to wait before the next attempt.
+    """
     try:
-        async with lock:
-            now = time.time()
-            if remaining_requests == 0 and now < last_reset_time:
-                sleep_for = last_reset_time - now
-                await asyncio.sleep(sleep_for)
-
-            async with httpx.AsyncClient() as client:
-                response = await client.post(webhook_url, json={"embeds": embeds})
+        async with httpx.AsyncClient() as client:
+            response = await client.post(webhook_url, json={"embeds": embeds})
+
+            # Parse rate limit headers
+            remaining = response.headers.get("X-RateLimit-Remaining")
+            reset = response.headers.get("X-RateLimit-Reset")
+            retry_after = response.headers.get("Retry-After")
+
+            if remaining is not None or reset is not None:
+                # Rate limits are shared, so the worker taking over a webhook respects them too
+                remaining_requests, last_reset_time = await asyncio.to_thread(shared_state.get_rate_limit, webhook_url)
+                await asyncio.to_thread(
+                    shared_state.set_rate_limit, webhook_url,
+                    int(remaining) if remaining is not None else remaining_requests,
+                    float(reset) if reset is not None else last_reset_time,
+                )
 
-                # Parse rate limit headers
-                remaining = response.headers.get("X-RateLimit-Remaining")
-                reset = response.headers.get("X-RateLimit-Reset")
-                retry_after = response.headers.get("Retry-After")
+            wait = 0.0
+            if response.status_code == 429 and retry_after:
+                logger.warning(f"Rate limited for {retry_after}")
+                wait = float(retry_after)
 
+            if response.status_code >= 400:
+                logger.error(f"Failed to send message: {response.text}")
+            elif response.is_success:
+                logger.info("Sent message to discord")
+            else:
+                logger.warning(f"Got unhandled response from discord: {response.text}")
+            return response.status_code, wait
+    except Exception as e:
+        logger.error(f"Got an error in send_to_discord: {str(e)[:60]}...")
+        return None, 0.0
 
-                if remaining is not None:
-                    remaining_requests = int(remaining)
+# Seconds between two deletions of expired minute rollups
+ROLLUP_PRUNE_INTERVAL = 3600
 
-                if reset is not None:
-                    last_reset_time = float(reset)
 
-                if response.status_code == 429 and retry_after:
-                    logger.warning(f"Rate limited for {retry_after}")
-                    await asyncio.sleep(float(retry_after))
+async def prune_rollups_loop():
+    while True:
+        try:
+            # One worker prunes. Another takes over if it stops
+            if not await asyncio.to_thread(shared_state.acquire, "prune-rollups", WORKER_ID, 2 * ROLLUP_PRUNE_INTERVAL):
+                await asyncio.sleep(ROLLUP_PRUNE_INTERVAL)
+                continue
+            with SessionLocal() as db:
+                pruned = await asyncio.to_thread(prune_rollups, db)
+            if pruned:
+                logger.info(f"Deleted {pruned} expired minute rollups")
+        except Exception as e:
+            logger.error(f"Pruning rollups failed: {e}")
+        await asyncio.sleep(ROLLUP_PRUNE_INTERVAL)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    profiler.watch_loop()
+    tasks = [asyncio.create_task(prune_rollups_loop()), asyncio.create_task(dispatch_messages())]
+    yield
+    for task in tasks:
+        task.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
+init_db()
 
-                if response.status_code >= 400:
-                    logger.error("Failed to send message:", response.text)
+with SessionLocal() as registry_db:
+    registered = load_event_list(registry_db, getenv("EVENT_LIST_PATH", "event_list"))
+    logger.info(f"Registered {registered} new events for leasing")
+    alert_rules = AlertRuleIndex(shared_state)
+    alert_rules.load(registry_db)
 
-                if response.status_code == 200:
-                    logger.info("Sent message to discord")
-                else:
-                    logger.warning(f"Got unhandled response from discord: {response.text}")
-    except Exception as e:
-        logger.error(f"Got an error in send_to_discord: {e[:60]}...")
+history_store = HistoryStore(
+    may_compact=lambda: shared_state.acquire("history-compaction", WORKER_ID, 2 * HISTORY_COMPACT_INTERVAL)
+) if HISTORY else None
+if history_store:
+    history_store.start()
 
-app = FastAPI()
-init_db()
+recorder = IngestRecorder(worker_path(INGEST_RECORD_PATH, BACKEND_WORKERS)) if INGEST_RECORD_PATH else None
+if recorder:
+    recorder.start()
 
 @app.post("/create-event", response_model=EventResponse)
 def create_event(data: EventCreateRequest, db: Session = Depends(get_db)):
+    if recorder:
+        recorder.record("/create-event", data.model_dump())
     match = re.search(r'/([\d]+)/', data.url)
     if not match:
         raise HTTPException(status_code=422, detail="No event ID found in URL")
@@ -144,14 +244,22 @@ def create_event(data: EventCreateRequest, db: Session = Depends(get_db)):
 
 
 @app.post("/ingest")
-async def ingest_seating(payload: SeatingPayload, db: Session = Depends(get_db)):
-
-
+async def ingest_seating(payload: SeatingPayload, request: Request, db: Session = Depends(get_db)):
+    if recorder:
+        # The body as it came in, stale snapshots included, so a replay has the same shape
+        recorder.record("/ingest", await request.body())
+    # Before the sequence check, so a payload of an unknown event doesn't take up a sequence number
     event = db.query(Event).filter(Event.id == payload.event_id).first()
     if not event:
         raise HTTPException(status_code=404, detail="Event not found")
+
+    # Posts of one section can arrive out of order. An older snapshot must not overwrite a newer one
+    if payload.sequence is not None and not await asyncio.to_thread(
+            shared_state.advance, f"ingest:{payload.event_id}:{payload.section}", payload.sequence):
+        logger.info("Skipped stale snapshot %d", payload.sequence, extra={"event": payload.event_id, "section": payload.section})
+        raise HTTPException(status_code=409, detail="Stale snapshot: a newer one of this section was already ingested")
     
-    logger.info(f"Ingested seating info for {event.id} in section {payload.section}") 
+    logger.info("Ingested seating info", extra={"event": event.id, "section": payload.section})
     # Get all current seats for this event
     current_seats = db.execute(
         select(Seat).where(Seat.event_id == payload.event_id)
@@ -210,24 +318,149 @@ async def ingest_seating(payload: SeatingPayload, db: Session = Depends(get_db))
             delete(Seat).where(Seat.id.in_(seats_to_delete), Seat.event_id == payload.event_id, Seat.section == payload.section)
         )
 
-    db.commit()
+    try:
+        upsert_rollups(db, payload.event_id, payload.section, payload.rows, payload.scraped_at)
+    except Exception as e:
+        # Rolled back on its own. The seats and alerts are still committed
+        logger.error(f"Updating rollups failed: {e}", extra={"event": event.id, "section": payload.section})
     embed_builder = EmbedBuilder()
-
-    if len(new_alerts) <= 4:
-        if len(new_alerts) != 0:
-            logger.info(f"Got {len(new_alerts)} new alerts for event: {event.id} for section {payload.section}")
-        for alert in new_alerts:
-            embed = embed_builder.build_detailed_seat_embed(alert)
-            asyncio.create_task(add_to_msg_buffer(embed, event.webhook_url))
-    else: 
-        logger.info(f"Got more than 4 new alerts for event: {event.id} for section {payload.section}")
-        embed = embed_builder.build_summary_embed(event.url, event.time, len(new_alerts), payload.section)
-        asyncio.create_task(add_to_msg_buffer(embed, event.webhook_url))
+    messages = defaultdict(list)
+
+    for rule, run in alert_rules.evaluate(payload.event_id, payload.section, payload.rows):
+        logger.info("Alert rule %d matched %d adjacent seats in row %s", rule.id, run.length, run.row,
+                    extra={"event": event.id, "section": payload.section})
+        embed = embed_builder.build_rule_embed(event.url, event.time, payload.section, rule, run)
+        messages[rule.webhook_url].append(embed)
+
+    # Sections a webhook set up rules for only get the alerts it asked for
+    if not alert_rules.covers(event.webhook_url, payload.event_id, payload.section):
+        if len(new_alerts) <= 4:
+            if len(new_alerts) != 0:
+                logger.info("Got %d new alerts", len(new_alerts), extra={"event": event.id, "section": payload.section})
+            for alert in new_alerts:
+                messages[event.webhook_url].append(embed_builder.build_detailed_seat_embed(alert))
+        else:
+            logger.info("Got more than 4 new alerts", extra={"event": event.id, "section": payload.section})
+            embed = embed_builder.build_summary_embed(event.url, event.time, len(new_alerts), payload.section)
+            messages[event.webhook_url].append(embed)
+
+    # The alerts are committed with the seats they're about, and sent from the outbox
+    for webhook_url, embeds in messages.items():
+        outbox.enqueue(db, webhook_url, embeds)
+    db.commit()
+    if history_store:
+        history_store.record(payload.event_id, payload.section, payload.rows, payload.scraped_at)
 
     return {"message": f"{len(new_alerts)} new available seats ingested"}
 
 
+@app.post("/leases/claim", response_model=LeaseClaimResponse)
+def claim_event_leases(data: LeaseClaimRequest, db: Session = Depends(get_db)):
+    leases = claim_leases(db, data.scraper_id, data.capacity, data.ttl or LEASE_TTL)
+    if leases:
+        logger.info(f"Leased {len(leases)} events to {data.scraper_id}")
+    return {"leases": [{"url": l.url, "webhook_url": l.webhook_url, "expires_at": l.expires_at} for l in leases]}
+
+
+@app.post("/leases/renew", response_model=LeaseRenewResponse)
+def renew_event_leases(data: LeaseRenewRequest, db: Session = Depends(get_db)):
+    leases = renew_leases(db, data.scraper_id, data.urls, data.ttl or LEASE_TTL)
+    renewed = {l.url for l in leases}
+    lost = [url for url in data.urls if url not in renewed]
+    if lost:
+        logger.warning(f"{data.scraper_id} lost leases on {lost}")
+    return {
+        "renewed": [{"url": l.url, "webhook_url": l.webhook_url, "expires_at": l.expires_at} for l in leases],
+        "lost": lost,
+    }
+
+
+@app.post("/leases/release")
+def release_event_leases(data: LeaseReleaseRequest, db: Session = Depends(get_db)):
+    released = release_leases(db, data.scraper_id, data.urls)
+    logger.info(f"{data.scraper_id} released {released} leases")
+    return {"released": released}
+
+
+@app.get("/leases")
+def list_event_leases(db: Session = Depends(get_db)):
+    now = time.time()
+    return [
+        {"url": l.url, "owner": l.owner if l.expires_at >= now else None, "expires_at": l.expires_at}
+        for l in db.query(EventLease).all()
+    ]
+
+
+@app.post("/alert-rules", response_model=AlertRuleResponse)
+def create_alert_rule(data: AlertRuleCreate, db: Session = Depends(get_db)):
+    rule = AlertRule(**data.model_dump())
+    db.add(rule)
+    db.commit()
+    db.refresh(rule)
+    alert_rules.add(rule)
+    logger.info(f"Created alert rule {rule.id} for {rule.webhook_url}")
+    return rule
+
+
+@app.get("/alert-rules", response_model=List[AlertRuleResponse])
+def list_alert_rules(webhook_url: Optional[str] = None, db: Session = Depends(get_db)):
+    query = db.query(AlertRule)
+    if webhook_url is not None:
+        query = query.filter(AlertRule.webhook_url == webhook_url)
+    return query.order_by(AlertRule.id).all()
+
+
+@app.delete("/alert-rules/{rule_id}")
+def delete_alert_rule(rule_id: int, db: Session = Depends(get_db)):
+    rule = db.get(AlertRule, rule_id)
+    if not rule:
+        raise HTTPException(status_code=404, detail="Alert rule not found")
+    db.delete(rule)
+    db.commit()
+    alert_rules.remove(rule_id)
+    logger.info(f"Deleted alert rule {rule_id}")
+    return {"deleted": rule_id}
+
+
+@app.get("/rollups/{event_id}")
+def event_rollups(event_id: str, start: Optional[float] = None, end: Optional[float] = None,
+                  resolution: Optional[str] = None, section: Optional[str] = None, db: Session = Depends(get_db)):
+    """
+    Availability of an event's sections over time, one point per minute or hour bucket.
+    Defaults to the last day. Without a resolution, spans over two days use hour buckets.
+    """
+    if resolution is not None and resolution not in RESOLUTIONS:
+        raise HTTPException(status_code=422, detail=f"resolution must be one of {list(RESOLUTIONS)}")
+    end = end or time.time()
+    start = start if start is not None else end - 86400
+    seconds, rollups = query_rollups(db, event_id, start, end, resolution, section)
+    # One list per field and section: much smaller and faster to encode than an object per bucket
+    sections = {}
+    for section_name, section_rollups in groupby(rollups, key=lambda rollup: rollup.section):
+        columns = dict(zip(ROLLUP_FIELDS, zip(*section_rollups)))
+        sections[section_name] = {"time": columns["bucket_start"], **{field: columns[field] for field in ROLLUP_SERIES}}
+    return JSONResponse({"event_id": event_id, "resolution": seconds, "sections": sections})
+
+
+@app.get("/history/{event_id}/{section}")
+async def section_history(event_id: str, section: str, at: Optional[float] = None):
+    """Seats of a section as they were at unix time ``at`` (default: now)."""
+    if not history_store:
+        raise HTTPException(status_code=404, detail="History is disabled")
+    snapshot = await asyncio.to_thread(history_store.reconstruct, event_id, section, at or time.time())
+    if snapshot is None:
+        raise HTTPException(status_code=404, detail="No history for this section at that time")
+    return snapshot
+
+
+@app.get("/history/{event_id}/{section}/times")
+async def section_history_times(event_id: str, section: str):
+    """Unix times at which the section changed."""
+    if not history_store:
+        raise HTTPException(status_code=404, detail="History is disabled")
+    return await asyncio.to_thread(history_store.snapshot_times, event_id, section)
+
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("backend.backend_main:app", host="127.0.0.1", port=4000, reload=False)
+    uvicorn.run("backend.backend_main:app", host="127.0.0.1", port=4000, reload=False, workers=BACKEND_WORKERS)
@@ -0,0 +1,222 @@
+import re
+import threading
+from collections import defaultdict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from sqlalchemy.orm import Session
+
+from .models import AlertRule
+from .shared_state import MemorySharedState, SharedState
+
+_RANGE = re.compile(r"^\s*(\d+)\s*[-–]\s*(\d+)\s*$")
+# Shared set of "rule id, event, section" that currently match, and version counter of the rules
+MATCHING = "alert-rule-matches"
+RULES_VERSION = "alert-rules"
+
+
+@dataclass
+class SeatRun:
+    """Adjacent available seats of one row."""
+    row: str
+    first_seat: str
+    last_seat: str
+    length: int
+    min_price: float
+    max_price: float
+
+
+@dataclass
+class SectionArrays:
+    """The seats of a section as arrays, ordered by row and seat, for run-length passes."""
+    row_index: np.ndarray
+    seat_index: np.ndarray
+    available: np.ndarray
+    price: np.ndarray
+    rows: List[str]
+    seats: List[str]
+
+    @classmethod
+    def from_rows(cls, rows: list) -> "SectionArrays":
+        seats = [seat for row in rows for seat in row.seats]
+        row_index = np.fromiter((seat.rowIndex for seat in seats), dtype=np.int64, count=len(seats))
+        seat_index = np.fromiter((seat.seatIndex for seat in seats), dtype=np.int64, count=len(seats))
+        order = np.lexsort((seat_index, row_index))
+        return cls(
+            row_index=row_index[order],
+            seat_index=seat_index[order],
+            available=np.fromiter((seat.isAvailable for seat in seats), dtype=bool, count=len(seats))[order],
+            price=np.fromiter((_price(seat.priceNum) for seat in seats), dtype=np.float64, count=len(seats))[order],
+            rows=[seats[i].row for i in order],
+            seats=[seats[i].seat for i in order],
+        )
+
+    def runs(self, max_price: Optional[float] = None, min_length: int = 1) -> List[SeatRun]:
+        """
+        Runs of adjacent available seats (consecutive seat indexes in the same row), optionally only
+        counting seats at or under ``max_price``. Longest first.
+        """
+        mask = self.available if max_price is None else self.available & (self.price <= max_price)
+        positions = np.flatnonzero(mask)
+        if positions.size == 0:
+            return []
+        rows, seats = self.row_index[positions], self.seat_index[positions]
+        # A run starts wherever the row changes or the previous seat isn't the neighbour
+        starts = np.flatnonzero(np.concatenate(([True], (rows[1:] != rows[:-1]) | (seats[1:] != seats[:-1] + 1))))
+        lengths = np.diff(np.append(starts, positions.size))
+        keep = np.flatnonzero(lengths >= min_length)
+        prices = self.price[positions]
+        runs = []
+        for k in keep[np.argsort(-lengths[keep], kind="stable")]:
+            first, last = positions[starts[k]], positions[starts[k] + lengths[k] - 1]
+            run_prices = prices[starts[k]:starts[k] + lengths[k]]
+            runs.append(SeatRun(row=self.rows[first], first_seat=self.seats[first], last_seat=self.seats[last],
+                                length=int(lengths[k]), min_price=float(run_prices.min()), max_price=float(run_prices.max())))
+        return runs
+
+
+def _price(price_num) -> float:
+    try:
+        return float(price_num)
+    except (TypeError, ValueError):
+        return np.inf
+
+
+def parse_sections(spec: Optional[str]) -> Tuple[Set[str], List[Tuple[int, int]]]:
+    """'101-110, 201, GA' -> exact section names and inclusive numeric ranges. Empty means every section."""
+    names, ranges = set(), []
+    for part in (spec or "").split(","):
+        if not part.strip():
+            continue
+        match = _RANGE.match(part)
+        if match:
+            low, high = sorted((int(match.group(1)), int(match.group(2))))
+            ranges.append((low, high))
+        else:
+            names.add(part.strip())
+    return names, ranges
+
+
+class _CompiledRule:
+    def __init__(self, rule: AlertRule):
+        self.id = rule.id
+        self.webhook_url = rule.webhook_url
+        self.event_id = rule.event_id
+        self.sections, self.ranges = parse_sections(rule.sections)
+        self.min_adjacent = rule.min_adjacent or 1
+        self.max_price = rule.max_price
+        self.name = rule.name
+
+    def matches_section(self, section: str) -> bool:
+        if not self.sections and not self.ranges:
+            return True
+        if section in self.sections:
+            return True
+        if self.ranges and section.isdigit():
+            number = int(section)
+            return any(low <= number <= high for low, high in self.ranges)
+        return False
+
+
+class AlertRuleIndex:
+    def __init__(self, state: Optional[SharedState] = None):
+        """
+        Alert rules in memory, indexed by event. The rules that apply to an (event, section) are
+        worked out once and cached until the rules change, so ingest only evaluates those.
+        Alerts are edge triggered: a rule fires when a section starts matching it, and again only
+        after the section stopped matching in between.
+
+        Every worker has its own index. Changes bump a version in the shared state, which the other
+        workers pick up in ``refresh``, and which sections match is kept in the shared state.
+
+        Args:
+            state: Shared state of the backend workers
+        """
+        self.state = state or MemorySharedState()
+        self.version = -1
+        self.rules: Dict[int, _CompiledRule] = {}
+        self.by_event: Dict[Optional[str], List[_CompiledRule]] = defaultdict(list)
+        self.cache: Dict[Tuple[str, str], List[_CompiledRule]] = {}
+        self.lock = threading.Lock()
+
+    def load(self, db: Session):
+        version = self.state.version(RULES_VERSION)
+        rules = db.query(AlertRule).filter(AlertRule.enabled).all()
+        with self.lock:
+            self.rules = {rule.id: _CompiledRule(rule) for rule in rules}
+            self.version = version
+            self._reindex()
+
+    def refresh(self, db: Session) -> bool:
+        """Reload the rules if another worker changed them. True if they were reloaded."""
+        if self.state.version(RULES_VERSION) == self.version:
+            return False
+        self.load(db)
+        return True
+
+    def add(self, rule: AlertRule):
+        with self.lock:
+            if rule.enabled:
+                self.rules[rule.id] = _CompiledRule(rule)
+            else:
+                self.rules.pop(rule.id, None)
+            self._reindex()
+        self._bump()
+
+    def remove(self, rule_id: int):
+        with self.lock:
+            self.rules.pop(rule_id, None)
+            self._reindex()
+        self.state.discard_prefix(MATCHING, f"{rule_id}\t")
+        self._bump()
+
+    def _bump(self):
+        version = self.state.bump(RULES_VERSION)
+        # Up to date unless another worker changed the rules in between
+        if version == self.version + 1:
+            self.version = version
+
+    def _reindex(self):
+        self.by_event = defaultdict(list)
+        for rule in self.rules.values():
+            self.by_event[rule.event_id].append(rule)
+        self.cache = {}
+
+    def covers(self, webhook_url: str, event_id: str, section: str) -> bool:
+        """
+        Whether a rule of ``webhook_url`` applies to this event and section. Such sections only get
+        rule alerts on that webhook, not the default alert for every new seat.
+        """
+        return any(rule.webhook_url == webhook_url for rule in self.rules_for(event_id, section))
+
+    def rules_for(self, event_id: str, section: str) -> List[_CompiledRule]:
+        key = (event_id, section)
+        rules = self.cache.get(key)
+        if rules is None:
+            with self.lock:
+                rules = [rule for rule in self.by_event.get(event_id, []) + self.by_event.get(None, [])
+                         if rule.matches_section(section)]
+                self.cache[key] = rules
+        return rules
+
+    def evaluate(self, event_id: str, section: str, rows: list) -> List[Tuple[_CompiledRule, SeatRun]]:
+        """Rules that started matching with this scrape of the section, each with its best run."""
+        rules = self.rules_for(event_id, section)
+        if not rules:
+            return []
+        arrays = SectionArrays.from_rows(rows)
+        runs_by_price: Dict[Optional[float], List[SeatRun]] = {}
+        fired = []
+        for rule in rules:
+            # Rules with the same price limit share one run-length pass
+            if rule.max_price not in runs_by_price:
+                runs_by_price[rule.max_price] = arrays.runs(rule.max_price)
+            runs = runs_by_price[rule.max_price]
+            key = f"{rule.id}\t{event_id}\t{section}"
+            if runs and runs[0].length >= rule.min_adjacent:
+                if self.state.add_member(MATCHING, key):
+                    fired.append((rule, runs[0]))
+            else:
+                self.state.discard_member(MATCHING, key)
+        return fired
@@ -32,3 +32,20 @@ class EmbedBuilder:
             "color": 16711680
         }
         return embed
+
+    def build_rule_embed(self, url, time, section, rule, run):
+        seats = run.first_seat if run.length == 1 else f"{run.first_seat} - {run.last_seat}"
+        price = f"${run.min_price:g}" if run.min_price == run.max_price else f"${run.min_price:g} - ${run.max_price:g}"
+        embed = {
+            "title": f"🎟️ {rule.name or 'Alert rule'} matched!",
+            "fields": [
+                {"name": "Event", "value": url},
+                {"name": "Time", "value": datetime.fromisoformat(time).strftime('%A, %B %d, %Y at %I:%M %p')},
+                {"name": "Section", "value": section},
+                {"name": "Row", "value": run.row},
+                {"name": "Seats", "value": f"{seats} ({run.length} adjacent)"},
+                {"name": "Price", "value": price},
+            ],
+            "color": 3066993
+        }
+        return embed
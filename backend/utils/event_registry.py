@@ -0,0 +1,99 @@
+import os
+import time
+from typing import List
+
+from sqlalchemy import and_, or_, select, update
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .models import EventLease
+
+# Leases a scraper doesn't renew within this many seconds can be claimed by another scraper
+LEASE_TTL = float(os.getenv("LEASE_TTL", 90))
+
+
+def load_event_list(db: Session, path: str = "event_list") -> int:
+    """
+    Register events from an event list file (url@webhook per line). Returns how many were added.
+    Every backend worker runs this on startup, so events another worker added in the meantime are skipped.
+    """
+    if not os.path.exists(path):
+        return 0
+
+    known = set(db.execute(select(EventLease.url)).scalars().all())
+    new_leases = {}
+    with open(path) as event_list:
+        for line in event_list:
+            if "@" not in line:
+                continue
+            url, webhook_url = line.strip().split("@", 1)
+            if url and webhook_url and url not in known and url not in new_leases:
+                new_leases[url] = {"url": url, "webhook_url": webhook_url, "owner": None, "expires_at": 0}
+    if not new_leases:
+        return 0
+
+    insert = postgresql.insert if db.bind.dialect.name == "postgresql" else sqlite.insert
+    result = db.execute(insert(EventLease).values(list(new_leases.values())).on_conflict_do_nothing(index_elements=["url"]))
+    db.commit()
+    return result.rowcount
+
+
+def _is_free(now: float):
+    return or_(EventLease.owner.is_(None), EventLease.expires_at < now)
+
+
+def claim_leases(db: Session, scraper_id: str, capacity: int, ttl: float = LEASE_TTL) -> List[EventLease]:
+    """
+    Lease up to ``capacity`` free events to ``scraper_id``. Every claim is a compare-and-set on the
+    row, so two scrapers claiming at the same time never get the same event.
+    """
+    if capacity <= 0:
+        return []
+
+    now = time.time()
+    candidates = db.execute(
+        select(EventLease.url).where(_is_free(now)).order_by(EventLease.expires_at, EventLease.url).limit(capacity * 2)
+    ).scalars().all()
+
+    claimed = []
+    for url in candidates:
+        if len(claimed) >= capacity:
+            break
+        result = db.execute(
+            update(EventLease)
+            .where(and_(EventLease.url == url, _is_free(now)))
+            .values(owner=scraper_id, expires_at=now + ttl, claimed_at=now)
+        )
+        if result.rowcount == 1:
+            claimed.append(url)
+    db.commit()
+
+    if not claimed:
+        return []
+    return db.execute(select(EventLease).where(EventLease.url.in_(claimed))).scalars().all()
+
+
+def renew_leases(db: Session, scraper_id: str, urls: List[str], ttl: float = LEASE_TTL) -> List[EventLease]:
+    """
+    Extend the leases ``scraper_id`` still holds. A lease that expired but hasn't been claimed by
+    anyone else yet is still renewed. Leases it lost are left alone and not returned.
+    """
+    db.execute(
+        update(EventLease)
+        .where(and_(EventLease.url.in_(urls), EventLease.owner == scraper_id))
+        .values(expires_at=time.time() + ttl)
+    )
+    db.commit()
+    return db.execute(
+        select(EventLease).where(and_(EventLease.url.in_(urls), EventLease.owner == scraper_id))
+    ).scalars().all()
+
+
+def release_leases(db: Session, scraper_id: str, urls: List[str]) -> int:
+    result = db.execute(
+        update(EventLease)
+        .where(and_(EventLease.url.in_(urls), EventLease.owner == scraper_id))
+        .values(owner=None, expires_at=0)
+    )
+    db.commit()
+    return result.rowcount
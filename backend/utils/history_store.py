@@ -0,0 +1,386 @@
+import atexit
+import json
+import os
+import queue
+import struct
+import threading
+import time
+import zlib
+from array import array
+from bisect import bisect_right
+from collections import defaultdict
+from os import getenv
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single backend worker only
+    fcntl = None
+
+from utils.logger import setup_logger
+
+# Keep an append-only history of every section's availability and prices
+HISTORY = getenv("HISTORY", "True") == "True"
+HISTORY_DIR = getenv("HISTORY_DIR", "./history")
+HISTORY_RETENTION_DAYS = float(getenv("HISTORY_RETENTION_DAYS", 30))
+# Segments are closed at this size and a new one is started
+HISTORY_SEGMENT_BYTES = int(getenv("HISTORY_SEGMENT_BYTES", 8 * 1024 * 1024))
+# Seconds between two retention passes
+HISTORY_COMPACT_INTERVAL = 3600
+# Snapshots waiting for the writer thread. Further ones are dropped
+HISTORY_QUEUE_SIZE = 10000
+
+LAYOUT = 0  # seat identifiers and labels of a section, in snapshot order
+SNAPSHOT = 1  # availability bits and price levels of a section
+# kind, timestamp, section length, payload length
+RECORD_HEADER = struct.Struct("<BdHI")
+
+logger = setup_logger("HistoryStore", logfile='./logs/fastapi.log')
+logger.propagate = False
+
+
+def _price(seat) -> float:
+    try:
+        return float(seat.priceNum)
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def encode_layout(seats: list) -> bytes:
+    return zlib.compress(json.dumps([[seat.seatIdentifier, seat.row, seat.seat] for seat in seats]).encode())
+
+
+def decode_layout(payload: bytes) -> List[list]:
+    return json.loads(zlib.decompress(payload))
+
+
+def encode_snapshot(seats: list) -> bytes:
+    """
+    One bit of availability per seat, then each seat's index into the section's distinct prices.
+    Both follow the order of the section's layout.
+    """
+    prices = sorted({_price(seat) for seat in seats})
+    levels = {price: level for level, price in enumerate(prices)}
+    bits = bytearray((len(seats) + 7) // 8)
+    for i, seat in enumerate(seats):
+        if seat.isAvailable:
+            bits[i >> 3] |= 1 << (i & 7)
+    level_type = "B" if len(prices) <= 256 else "H"
+    price_levels = array(level_type, (levels[_price(seat)] for seat in seats))
+    payload = (struct.pack("<IHc", len(seats), len(prices), level_type.encode())
+               + struct.pack(f"<{len(prices)}d", *prices) + bytes(bits) + price_levels.tobytes())
+    return zlib.compress(payload)
+
+
+def decode_snapshot(payload: bytes) -> Tuple[List[bool], List[float]]:
+    data = zlib.decompress(payload)
+    seat_count, price_count, level_type = struct.unpack_from("<IHc", data)
+    offset = struct.calcsize("<IHc")
+    prices = struct.unpack_from(f"<{price_count}d", data, offset)
+    offset += 8 * price_count
+    bits = data[offset:offset + (seat_count + 7) // 8]
+    offset += len(bits)
+    price_levels = array(level_type.decode())
+    price_levels.frombytes(data[offset:])
+    available = [bool(bits[i >> 3] & (1 << (i & 7))) for i in range(seat_count)]
+    return available, [prices[level] for level in price_levels]
+
+
+class _Segment:
+    def __init__(self, path: str):
+        self.name = os.path.basename(path)
+        self.file = open(path, "ab")
+        self.size = self.file.tell()
+        self.sections_with_layout = set()
+
+
+class HistoryStore:
+    def __init__(self, directory: str = HISTORY_DIR, retention_days: float = HISTORY_RETENTION_DAYS,
+                 segment_bytes: int = HISTORY_SEGMENT_BYTES, may_compact: Optional[Callable[[], bool]] = None):
+        """
+        Append-only history of section snapshots. Snapshots are only written when a section's
+        availability or prices changed, as a bit-packed, zlib-compressed record in the event's
+        current segment file. Each segment starts with the layout of every section it holds, so old
+        segments can be deleted as a whole. A per event index (section, time -> segment and offset)
+        finds the snapshot of a section at any time with one read.
+
+        All writes, index updates and retention run on one background thread. Several backend
+        workers can share the directory: each writes its own segments, index appends and retention
+        passes lock the index file, and reads pick up index lines other workers appended.
+
+        Args:
+            directory: Folder with one folder of segments per event
+            retention_days: Segments whose newest snapshot is older than this are deleted, unless they're
+                            still written to or hold the latest snapshot of a section
+            segment_bytes: Size at which a segment is closed
+            may_compact: Asked before each retention pass, so only one of several workers runs it
+        """
+        self.directory = directory
+        self.retention = retention_days * 86400
+        self.segment_bytes = segment_bytes
+        self.queue: queue.Queue = queue.Queue(maxsize=HISTORY_QUEUE_SIZE)
+        self.lock = threading.Lock()
+        # event -> (section, kind) -> [(timestamp, segment, offset)], in time order
+        self.index: Dict[str, Dict[Tuple[str, int], list]] = {}
+        # event -> bytes of its index file that are in self.index
+        self.index_sizes: Dict[str, int] = {}
+        self.may_compact = may_compact
+        # Writer thread only: last layout and snapshot written per (event, section), and open segments
+        self.last: Dict[Tuple[str, str], Tuple[bytes, bytes]] = {}
+        self.segments: Dict[str, _Segment] = {}
+        self.dropped = 0
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        os.makedirs(self.directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+
+    def stop(self):
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(10)
+
+    def record(self, event_id: str, section: str, rows: list, timestamp: Optional[float] = None):
+        """Queue the seats of ``rows`` for writing. Never blocks."""
+        try:
+            self.queue.put_nowait((timestamp or time.time(), str(event_id), section, rows))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning("History writer is behind. %d snapshots dropped so far", self.dropped)
+
+    def _event_dir(self, event_id: str) -> str:
+        return os.path.join(self.directory, event_id)
+
+    def _index_path(self, event_id: str) -> str:
+        return os.path.join(self._event_dir(event_id), "index.tsv")
+
+    @contextmanager
+    def _index_file_lock(self, event_id: str):
+        """Keeps other workers from appending to an event's index while it's written."""
+        if fcntl is None:
+            yield
+            return
+        os.makedirs(self._event_dir(event_id), exist_ok=True)
+        with open(os.path.join(self._event_dir(event_id), "index.lock"), "a") as lock_file:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _load_index(self, event_id: str, current: bool = False) -> Dict[Tuple[str, int], list]:
+        """
+        Index of an event, read from its index file the first time it's needed. With ``current``,
+        read again if the file changed, e.g. because another worker appended to it.
+        """
+        index_path = self._index_path(event_id)
+        with self.lock:
+            if event_id in self.index:
+                if not current:
+                    return self.index[event_id]
+                try:
+                    size = os.path.getsize(index_path)
+                except FileNotFoundError:
+                    size = 0
+                if size == self.index_sizes.get(event_id, 0):
+                    return self.index[event_id]
+            entries = defaultdict(list)
+            size = 0
+            if os.path.exists(index_path):
+                with open(index_path, "rb") as index_file:
+                    for line in index_file:
+                        # A line another worker is still appending
+                        if not line.endswith(b"\n"):
+                            break
+                        size += len(line)
+                        kind, timestamp, section, segment, offset = line.decode().rstrip("\n").split("\t")
+                        entries[(section, int(kind))].append((float(timestamp), segment, int(offset)))
+            self.index[event_id] = entries
+            self.index_sizes[event_id] = size
+            return entries
+
+    def _segment(self, event_id: str) -> _Segment:
+        segment = self.segments.get(event_id)
+        if segment is None or segment.size >= self.segment_bytes:
+            if segment is not None:
+                segment.file.close()
+            os.makedirs(self._event_dir(event_id), exist_ok=True)
+            segment = _Segment(os.path.join(self._event_dir(event_id), f"{time.time():.6f}-{os.getpid()}.seg"))
+            self.segments[event_id] = segment
+        return segment
+
+    def _append(self, segment: _Segment, kind: int, timestamp: float, section: str, payload: bytes) -> int:
+        section_bytes = section.encode()
+        offset = segment.size
+        record = RECORD_HEADER.pack(kind, timestamp, len(section_bytes), len(payload)) + section_bytes + payload
+        segment.file.write(record)
+        segment.size += len(record)
+        return offset
+
+    def _write(self, timestamp: float, event_id: str, section: str, rows: list, new_entries: list):
+        seats = [seat for row in rows for seat in row.seats]
+        layout, snapshot = encode_layout(seats), encode_snapshot(seats)
+        last_layout, last_snapshot = self.last.get((event_id, section), (None, None))
+        if layout == last_layout and snapshot == last_snapshot:
+            return
+
+        self._load_index(event_id)
+        segment = self._segment(event_id)
+        if layout != last_layout or section not in segment.sections_with_layout:
+            offset = self._append(segment, LAYOUT, timestamp, section, layout)
+            segment.sections_with_layout.add(section)
+            new_entries.append((event_id, section, LAYOUT, timestamp, segment.name, offset))
+        offset = self._append(segment, SNAPSHOT, timestamp, section, snapshot)
+        new_entries.append((event_id, section, SNAPSHOT, timestamp, segment.name, offset))
+        self.last[(event_id, section)] = (layout, snapshot)
+
+    def _commit(self, new_entries: list):
+        """Make the records written since the last commit visible: flush segments, then index them."""
+        for segment in self.segments.values():
+            segment.file.flush()
+        lines = defaultdict(list)
+        for event_id, section, kind, timestamp, segment_name, offset in new_entries:
+            lines[event_id].append(f"{kind}\t{timestamp!r}\t{section}\t{segment_name}\t{offset}\n")
+        for event_id, event_lines in lines.items():
+            data = "".join(event_lines).encode()
+            with self._index_file_lock(event_id), self.lock:
+                for line in event_lines:
+                    kind, timestamp, section, segment_name, offset = line.rstrip("\n").split("\t")
+                    self.index[event_id][(section, int(kind))].append((float(timestamp), segment_name, int(offset)))
+                # One write, so a reader never sees half of another worker's lines mixed in
+                index_fd = os.open(self._index_path(event_id), os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+                try:
+                    size = os.fstat(index_fd).st_size
+                    os.write(index_fd, data)
+                finally:
+                    os.close(index_fd)
+                # Other workers' lines in between mean the index has to be read again
+                if size == self.index_sizes.get(event_id, 0):
+                    self.index_sizes[event_id] = size + len(data)
+
+    def _run(self):
+        last_compaction = 0.0
+        while True:
+            item = self.queue.get()
+            new_entries = []
+            stopping = item is None
+            while item is not None:
+                try:
+                    self._write(*item, new_entries)
+                except Exception as e:
+                    logger.error("Couldn't write history for event %s section %s: %s", item[1], item[2], e)
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                stopping = item is None
+            self._commit(new_entries)
+
+            if stopping:
+                for segment in self.segments.values():
+                    segment.file.close()
+                self.segments.clear()
+                return
+            if time.monotonic() - last_compaction > HISTORY_COMPACT_INTERVAL:
+                last_compaction = time.monotonic()
+                try:
+                    if self.may_compact is None or self.may_compact():
+                        self._compact()
+                except Exception as e:
+                    logger.error("History retention pass failed: %s", e)
+
+    def _compact(self):
+        """Delete segments past the retention period and rewrite the index files without them."""
+        cutoff = time.time() - self.retention
+        if not os.path.isdir(self.directory):
+            return
+        for event_id in os.listdir(self.directory):
+            with self._index_file_lock(event_id):
+                self._compact_event(event_id, cutoff)
+
+    def _compact_event(self, event_id: str, cutoff: float):
+        entries = self._load_index(event_id, current=True)
+        newest: Dict[str, float] = {}
+        # Segments still written to, or holding the latest layout or snapshot of a section. A section
+        # that hasn't changed since is still in that state, so they are kept however old they are
+        active = set()
+        if event_id in self.segments:
+            active.add(self.segments[event_id].name)
+        with self.lock:
+            for records in entries.values():
+                for timestamp, segment_name, _ in records:
+                    newest[segment_name] = max(newest.get(segment_name, 0), timestamp)
+                if records:
+                    active.add(records[-1][1])
+        expired = {segment_name for segment_name, timestamp in newest.items()
+                   if timestamp < cutoff and segment_name not in active}
+        if not expired:
+            return
+
+        with self.lock:
+            for key in list(entries):
+                entries[key] = [record for record in entries[key] if record[1] not in expired]
+                if not entries[key]:
+                    del entries[key]
+            lines = [
+                f"{kind}\t{timestamp!r}\t{section}\t{segment_name}\t{offset}\n"
+                for (section, kind), records in entries.items() for timestamp, segment_name, offset in records
+            ]
+            index_path = self._index_path(event_id)
+            with open(f"{index_path}.tmp", "w") as index_file:
+                index_file.writelines(sorted(lines, key=lambda line: float(line.split("\t")[1])))
+            os.replace(f"{index_path}.tmp", index_path)
+            self.index_sizes[event_id] = os.path.getsize(index_path)
+        for segment_name in expired:
+            try:
+                os.remove(os.path.join(self._event_dir(event_id), segment_name))
+            except FileNotFoundError:
+                pass
+        logger.info("Deleted %d expired history segments of event %s", len(expired), event_id)
+
+    def _read(self, event_id: str, segment_name: str, offset: int) -> bytes:
+        with open(os.path.join(self._event_dir(event_id), segment_name), "rb") as segment_file:
+            segment_file.seek(offset)
+            _, _, section_length, payload_length = RECORD_HEADER.unpack(segment_file.read(RECORD_HEADER.size))
+            segment_file.seek(section_length, os.SEEK_CUR)
+            return segment_file.read(payload_length)
+
+    @staticmethod
+    def _latest(records: list, at: float) -> Optional[tuple]:
+        position = bisect_right(records, at, key=lambda record: record[0])
+        return records[position - 1] if position else None
+
+    def snapshot_times(self, event_id: str, section: str) -> List[float]:
+        entries = self._load_index(str(event_id), current=True)
+        with self.lock:
+            return [timestamp for timestamp, _, _ in entries.get((section, SNAPSHOT), [])]
+
+    def reconstruct(self, event_id: str, section: str, at: float) -> Optional[dict]:
+        """The seats of a section as of the last snapshot at or before ``at``. None if there is none."""
+        event_id = str(event_id)
+        entries = self._load_index(event_id, current=True)
+        with self.lock:
+            snapshot = self._latest(entries.get((section, SNAPSHOT), []), at)
+            layout = self._latest(entries.get((section, LAYOUT), []), snapshot[0]) if snapshot else None
+        if snapshot is None or layout is None:
+            return None
+
+        try:
+            seats = decode_layout(self._read(event_id, layout[1], layout[2]))
+            available, prices = decode_snapshot(self._read(event_id, snapshot[1], snapshot[2]))
+        except FileNotFoundError:
+            # Deleted by retention in the meantime
+            return None
+        return {
+            "event_id": event_id,
+            "section": section,
+            "timestamp": snapshot[0],
+            "seats": [
+                {"seatIdentifier": identifier, "row": row, "seat": seat, "isAvailable": is_available, "price": price}
+                for (identifier, row, seat), is_available, price in zip(seats, available, prices)
+            ],
+        }
@@ -0,0 +1,117 @@
+import atexit
+import gzip
+import heapq
+import json
+import os
+import queue
+import threading
+import time
+import zlib
+from os import getenv
+from typing import Iterator, List, Optional, Tuple, Union
+
+from utils.logger import setup_logger
+
+# Record every ingest and create-event body to this gzipped file, for benchmarks/replay.py. Empty disables it
+INGEST_RECORD_PATH = getenv("INGEST_RECORD_PATH", "")
+# Seconds between two flushes. A crash loses at most this much of the recording
+INGEST_RECORD_FLUSH_INTERVAL = 1
+# Bodies waiting for the writer thread. Further ones are dropped
+INGEST_RECORD_QUEUE_SIZE = 10000
+
+logger = setup_logger("IngestRecorder", logfile='./logs/fastapi.log')
+logger.propagate = False
+
+
+def worker_path(path: str, workers: int) -> str:
+    """Every worker of several records to its own file: recording.jsonl.gz -> recording.<pid>.jsonl.gz"""
+    if workers <= 1:
+        return path
+    directory, name = os.path.split(path)
+    stem, dot, rest = name.partition(".")
+    return os.path.join(directory, f"{stem}.{os.getpid()}{dot}{rest}")
+
+
+class IngestRecorder:
+    def __init__(self, path: str):
+        """
+        Records request bodies with their arrival time as gzipped JSON lines
+        (``{"t": <unix time>, "path": "/ingest", "body": {...}}``). Lines are compressed and written on
+        a background thread and flushed every INGEST_RECORD_FLUSH_INTERVAL seconds, so a recording
+        can be read while it's still being written. A restarted backend appends to the same file.
+
+        Args:
+            path: Gzipped recording to append to
+        """
+        self.path = path
+        self.queue: queue.Queue = queue.Queue(maxsize=INGEST_RECORD_QUEUE_SIZE)
+        self.dropped = 0
+        self.thread: Optional[threading.Thread] = None
+
+    def start(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self._run, name="ingest-recorder", daemon=True)
+        self.thread.start()
+        atexit.register(self.stop)
+        logger.info(f"Recording ingest bodies to {self.path}")
+
+    def stop(self):
+        if self.thread and self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join(10)
+
+    def record(self, path: str, body: Union[bytes, dict]):
+        """Queue a request body (raw JSON bytes or a dict). Never blocks."""
+        try:
+            self.queue.put_nowait((time.time(), path, body))
+        except queue.Full:
+            self.dropped += 1
+            if self.dropped % 100 == 1:
+                logger.warning("Ingest recorder is behind. %d bodies dropped so far", self.dropped)
+
+    @staticmethod
+    def _line(timestamp: float, path: str, body: Union[bytes, dict]) -> bytes:
+        if not isinstance(body, bytes):
+            body = json.dumps(body, separators=(",", ":")).encode()
+        # Raw bodies are valid JSON already (they were parsed), so they're written as they came
+        return b'{"t":%.6f,"path":%s,"body":%s}\n' % (timestamp, json.dumps(path).encode(), body)
+
+    def _run(self):
+        with gzip.open(self.path, "ab") as recording:
+            last_flush = time.monotonic()
+            while True:
+                try:
+                    item = self.queue.get(timeout=INGEST_RECORD_FLUSH_INTERVAL)
+                except queue.Empty:
+                    item = ()
+                if item is None:
+                    return
+                try:
+                    if item:
+                        recording.write(self._line(*item))
+                    if time.monotonic() - last_flush >= INGEST_RECORD_FLUSH_INTERVAL:
+                        recording.flush(zlib.Z_SYNC_FLUSH)
+                        last_flush = time.monotonic()
+                except Exception as e:
+                    logger.error(f"Recording failed: {e}")
+
+
+def _read(path: str) -> Iterator[Tuple[float, str, dict]]:
+    with gzip.open(path, "rb") as recording:
+        try:
+            for line in recording:
+                # A line that is still being written
+                if not line.endswith(b"\n"):
+                    break
+                entry = json.loads(line)
+                yield entry["t"], entry["path"], entry["body"]
+        except EOFError:
+            # The recording is still being written, or the backend was killed
+            pass
+
+
+def read_recordings(paths: List[str]) -> Iterator[Tuple[float, str, dict]]:
+    """(time, path, body) of every recorded request of ``paths`` (one per worker), in time order."""
+    return heapq.merge(*(_read(path) for path in paths), key=lambda entry: entry[0])
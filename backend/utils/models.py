@@ -1,7 +1,7 @@
 import json
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, Text, DateTime
+from sqlalchemy import Column, Integer, String, Boolean, Float, ForeignKey, Text, DateTime, Index
 from sqlalchemy.orm import relationship, declarative_base
 
 Base = declarative_base()
@@ -25,6 +25,59 @@ class Seat(Base):
 
     event = relationship("Event")
 
+class EventLease(Base):
+    """Event registry. Each event is leased to at most one scraper at a time."""
+    __tablename__ = "event_leases"
+    url = Column(String, primary_key=True)
+    webhook_url = Column(String, nullable=False)
+    owner = Column(String, nullable=True)  # scraper id holding the lease
+    expires_at = Column(Float, nullable=False, default=0)  # unix time. The lease is free once it has passed
+    claimed_at = Column(Float, nullable=True)
+
+class SectionRollup(Base):
+    """Availability of a section over one minute or one hour, updated on every ingest."""
+    __tablename__ = "section_rollups"
+    # Key order makes both "one section" and "all sections of an event" a single range scan
+    event_id = Column(String, primary_key=True)
+    resolution = Column(Integer, primary_key=True)  # bucket length in seconds
+    section = Column(String, primary_key=True)
+    bucket_start = Column(Integer, primary_key=True)  # unix time
+    available_first = Column(Integer, nullable=False)
+    available_last = Column(Integer, nullable=False)
+    available_min = Column(Integer, nullable=False)
+    available_max = Column(Integer, nullable=False)
+    min_price = Column(Float, nullable=True)  # cheapest available seat. None when nothing was available
+    max_block = Column(Integer, nullable=False)  # largest run of adjacent available seats in a row
+    samples = Column(Integer, nullable=False)
+
+    # Rows are stored in key order, so a range scan doesn't jump around the table
+    __table_args__ = {"sqlite_with_rowid": False}
+
+class AlertRule(Base):
+    """A webhook's subscription, e.g. at least 4 adjacent seats under $120 in sections 101-110."""
+    __tablename__ = "alert_rules"
+    id = Column(Integer, primary_key=True)
+    webhook_url = Column(String, nullable=False, index=True)
+    name = Column(String, nullable=True)
+    event_id = Column(String, nullable=True)  # None matches every event
+    sections = Column(String, nullable=True)  # "101-110, 201, GA". None matches every section
+    min_adjacent = Column(Integer, nullable=False, default=1)
+    max_price = Column(Float, nullable=True)  # only seats at or under this price count
+    enabled = Column(Boolean, nullable=False, default=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class OutboxMessage(Base):
+    """A Discord embed waiting to be sent. Written in the same transaction as the seats it is about."""
+    __tablename__ = "outbox"
+    id = Column(Integer, primary_key=True)  # send order per webhook
+    webhook_url = Column(String, nullable=False)
+    embed = Column(Text, nullable=False)  # JSON
+    created_at = Column(Float, nullable=False)
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(Float, nullable=False, default=0)  # unix time. Set after a failed attempt
+
+    __table_args__ = (Index("outbox_webhook", "webhook_url", "id"),)
+
 class RawEventData(Base):
     __tablename__ = "raw_event_data"
     id = Column(Integer, primary_key=True)
@@ -0,0 +1,69 @@
+import json
+import time
+from os import getenv
+from typing import List
+
+from sqlalchemy import delete, select, update
+from sqlalchemy.orm import Session
+
+from .models import OutboxMessage
+
+# Embeds sent in one Discord message (Discord takes at most 10)
+OUTBOX_BATCH_SIZE = 10
+# A message that failed this many times is dropped
+OUTBOX_MAX_ATTEMPTS = int(getenv("OUTBOX_MAX_ATTEMPTS", 10))
+# Seconds before the first retry. Doubles with every failed attempt, up to OUTBOX_MAX_RETRY_DELAY
+OUTBOX_RETRY_DELAY = float(getenv("OUTBOX_RETRY_DELAY", 2))
+OUTBOX_MAX_RETRY_DELAY = 300
+
+
+def enqueue(db: Session, webhook_url: str, embeds: list):
+    """Add embeds to the outbox in the caller's transaction. They're sent once it commits."""
+    now = time.time()
+    db.add_all(
+        OutboxMessage(webhook_url=webhook_url, embed=json.dumps(embed), created_at=now, attempts=0, next_attempt_at=0)
+        for embed in embeds
+    )
+
+
+def pending_webhooks(db: Session) -> List[str]:
+    return db.execute(select(OutboxMessage.webhook_url).distinct()).scalars().all()
+
+
+def next_batch(db: Session, webhook_url: str, limit: int = OUTBOX_BATCH_SIZE) -> List[OutboxMessage]:
+    """
+    Oldest messages of a webhook, to be sent together: the ones due for an attempt, in id order,
+    up to the first that still waits for its retry. Nothing overtakes a message waiting for its
+    retry, so a webhook's messages are delivered in order.
+    """
+    messages = db.execute(
+        select(OutboxMessage).where(OutboxMessage.webhook_url == webhook_url).order_by(OutboxMessage.id).limit(limit)
+    ).scalars().all()
+    now = time.time()
+    batch = []
+    for message in messages:
+        if message.next_attempt_at > now:
+            break
+        batch.append(message)
+    return batch
+
+
+def delivered(db: Session, ids: List[int]):
+    db.execute(delete(OutboxMessage).where(OutboxMessage.id.in_(ids)))
+    db.commit()
+
+
+def failed(db: Session, ids: List[int], attempts: int) -> bool:
+    """
+    Schedule a retry of a batch that couldn't be sent. ``attempts`` is the number of attempts
+    including this one. Returns False if the batch was dropped after too many attempts.
+    """
+    if attempts >= OUTBOX_MAX_ATTEMPTS:
+        delivered(db, ids)
+        return False
+    delay = min(OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), OUTBOX_MAX_RETRY_DELAY)
+    db.execute(
+        update(OutboxMessage).where(OutboxMessage.id.in_(ids)).values(attempts=attempts, next_attempt_at=time.time() + delay)
+    )
+    db.commit()
+    return True
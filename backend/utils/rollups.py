@@ -0,0 +1,103 @@
+import os
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import Row, and_, delete, func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from .alert_rules import SectionArrays
+from .models import SectionRollup
+
+MINUTE = 60
+HOUR = 3600
+RESOLUTIONS = {"minute": MINUTE, "hour": HOUR}
+# Minute rollups are deleted after this many days. Hour rollups are kept
+ROLLUP_MINUTE_RETENTION_DAYS = float(os.getenv("ROLLUP_MINUTE_RETENTION_DAYS", 7))
+# Columns of the rows query_rollups returns, and the ones that are served as time series
+ROLLUP_FIELDS = tuple(column.name for column in SectionRollup.__table__.columns)
+ROLLUP_SERIES = ("available_first", "available_last", "available_min", "available_max", "min_price", "max_block", "samples")
+# Queries spanning more than this many seconds use hour buckets unless a resolution is given
+AUTO_MINUTE_SPAN = 2 * 86400
+
+
+def section_stats(rows: list) -> Tuple[int, Optional[float], int]:
+    """Available seats, cheapest available price and largest run of adjacent available seats in a row."""
+    # The same run-length pass alert rules use, so a rollup's max_block is what a rule would see
+    arrays = SectionArrays.from_rows(rows)
+    prices = arrays.price[arrays.available & np.isfinite(arrays.price)]
+    runs = arrays.runs()
+    return (int(arrays.available.sum()), float(prices.min()) if prices.size else None,
+            runs[0].length if runs else 0)
+
+
+def _dialect(db: Session):
+    """Upsert statement and scalar min/max of the database in use."""
+    if db.bind.dialect.name == "postgresql":
+        return postgresql.insert, func.least, func.greatest
+    return sqlite.insert, func.min, func.max
+
+
+def upsert_rollups(db: Session, event_id: str, section: str, rows: list, timestamp: Optional[float] = None):
+    """
+    Fold one scrape of a section into its minute and hour buckets, one upsert per resolution. Runs
+    in a savepoint of the ingest transaction, so a failed rollup doesn't lose the ingest with it.
+    """
+    timestamp = timestamp or time.time()
+    available, min_price, max_block = section_stats(rows)
+    insert, least, greatest = _dialect(db)
+    with db.begin_nested():
+        for resolution in RESOLUTIONS.values():
+            statement = insert(SectionRollup).values(
+                event_id=event_id, section=section, resolution=resolution,
+                bucket_start=int(timestamp // resolution * resolution),
+                available_first=available, available_last=available, available_min=available, available_max=available,
+                min_price=min_price, max_block=max_block, samples=1,
+            )
+            new = statement.excluded
+            db.execute(statement.on_conflict_do_update(
+                index_elements=["event_id", "resolution", "section", "bucket_start"],
+                set_={
+                    "available_last": new.available_last,
+                    "available_min": least(SectionRollup.available_min, new.available_min),
+                    "available_max": greatest(SectionRollup.available_max, new.available_max),
+                    # NULL means nothing was available. Either side may be NULL
+                    "min_price": least(func.coalesce(SectionRollup.min_price, new.min_price),
+                                       func.coalesce(new.min_price, SectionRollup.min_price)),
+                    "max_block": greatest(SectionRollup.max_block, new.max_block),
+                    "samples": SectionRollup.samples + 1,
+                },
+            ))
+
+
+def query_rollups(db: Session, event_id: str, start: float, end: float, resolution: Optional[str] = None,
+                  section: Optional[str] = None) -> Tuple[int, List[Row]]:
+    """Buckets of an event (or one section) between ``start`` and ``end``. Returns the resolution used and the buckets."""
+    if resolution is None:
+        resolution = "minute" if end - start <= AUTO_MINUTE_SPAN else "hour"
+    seconds = RESOLUTIONS[resolution]
+    conditions = [
+        SectionRollup.event_id == event_id,
+        SectionRollup.resolution == seconds,
+        SectionRollup.bucket_start >= int(start // seconds * seconds),
+        SectionRollup.bucket_start <= end,
+    ]
+    if section is not None:
+        conditions.append(SectionRollup.section == section)
+    # Plain rows rather than ORM objects: a month of buckets is thousands of them
+    rollups = db.execute(
+        select(*SectionRollup.__table__.columns).where(and_(*conditions))
+        .order_by(SectionRollup.section, SectionRollup.bucket_start)
+    ).all()
+    return seconds, rollups
+
+
+def prune_rollups(db: Session, retention_days: float = ROLLUP_MINUTE_RETENTION_DAYS) -> int:
+    """Delete minute buckets past their retention. Returns how many were deleted."""
+    result = db.execute(delete(SectionRollup).where(and_(
+        SectionRollup.resolution == MINUTE,
+        SectionRollup.bucket_start < time.time() - retention_days * 86400,
+    )))
+    db.commit()
+    return result.rowcount
@@ -1,4 +1,4 @@
-from pydantic import BaseModel, RootModel
+from pydantic import BaseModel, ConfigDict, Field, RootModel
 from typing import Optional, Any, Dict
 from datetime import datetime
 
@@ -31,6 +31,9 @@ class SeatingPayload(BaseModel):
     section: str
     rows: List[Row]
     event_id: str
+    # Increases with every scrape of the section. Payloads at or below the last accepted one are stale
+    sequence: Optional[int] = None
+    scraped_at: Optional[float] = None  # unix time the seats were read from the page
     
 class EventCreateRequest(BaseModel):
     url: str
@@ -40,6 +43,47 @@ class EventCreateRequest(BaseModel):
 class EventResponse(BaseModel):
     event_id: str
     url: str
+class LeaseClaimRequest(BaseModel):
+    scraper_id: str
+    capacity: int  # number of additional events the scraper can take on
+    ttl: Optional[float] = None
+
+class LeaseRenewRequest(BaseModel):
+    scraper_id: str
+    urls: List[str]
+    ttl: Optional[float] = None
+
+class LeaseReleaseRequest(BaseModel):
+    scraper_id: str
+    urls: List[str]
+
+class Lease(BaseModel):
+    url: str
+    webhook_url: str
+    expires_at: float
+
+class LeaseClaimResponse(BaseModel):
+    leases: List[Lease]
+
+class LeaseRenewResponse(BaseModel):
+    renewed: List[Lease]
+    lost: List[str]  # leases that expired and were taken over, or were released
+
+class AlertRuleCreate(BaseModel):
+    webhook_url: str
+    name: Optional[str] = None
+    event_id: Optional[str] = None  # every event when left out
+    sections: Optional[str] = None  # e.g. "101-110, 201". Every section when left out
+    min_adjacent: int = Field(1, ge=1)
+    max_price: Optional[float] = None
+    enabled: bool = True
+
+class AlertRuleResponse(AlertRuleCreate):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: int
+    created_at: datetime
+
 # used only for debug
 class RawData(RootModel[Any]):
     pass
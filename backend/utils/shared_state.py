@@ -0,0 +1,235 @@
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import defaultdict
+from os import getenv
+from typing import Dict, Optional, Tuple
+
+from utils.logger import setup_logger
+
+# Number of uvicorn worker processes the backend runs
+BACKEND_WORKERS = int(getenv("BACKEND_WORKERS", 1))
+# Where workers keep the state they share: "memory" (one worker only) or "sqlite"
+SHARED_STATE = getenv("SHARED_STATE", "memory" if BACKEND_WORKERS == 1 else "sqlite")
+SHARED_STATE_PATH = getenv("SHARED_STATE_PATH", "./shared_state.db")
+
+logger = setup_logger("SharedState", logfile='./logs/fastapi.log')
+logger.propagate = False
+
+
+class SharedState(ABC):
+    """
+    State that has to be the same for every backend worker: leases that make one worker
+    responsible for something (e.g. dispatching a webhook), Discord rate limits, sets and version
+    counters. Methods are blocking and thread safe, so async code calls them
+    through ``asyncio.to_thread`` where they may wait on other workers.
+    """
+
+    @abstractmethod
+    def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """Take or renew the lease ``name`` for ``ttl`` seconds. False if someone else holds it."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def release(self, name: str, owner: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_rate_limit(self, webhook_url: str) -> Tuple[Optional[int], float]:
+        """Requests left and unix time the limit resets at, as last reported by Discord."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def set_rate_limit(self, webhook_url: str, remaining: Optional[int], reset_at: float):
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_member(self, name: str, member: str) -> bool:
+        """Add to the set ``name``. True if it wasn't in it yet."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def discard_member(self, name: str, member: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    def discard_prefix(self, name: str, prefix: str):
+        """Remove every member of the set ``name`` that starts with ``prefix``."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def version(self, name: str) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    def bump(self, name: str) -> int:
+        """Increment the version counter ``name``, so other workers know to reload what it stands for."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def advance(self, name: str, version: int) -> bool:
+        """Raise the version counter ``name`` to ``version``. False, leaving it alone, if it's already there or past it."""
+        raise NotImplementedError
+
+
+class MemorySharedState(SharedState):
+    """Shared state of a single worker process."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.leases: Dict[str, Tuple[str, float]] = {}
+        self.rate_limits: Dict[str, Tuple[Optional[int], float]] = {}
+        self.sets: Dict[str, set] = defaultdict(set)
+        self.versions: Dict[str, int] = defaultdict(int)
+
+    def acquire(self, name, owner, ttl):
+        now = time.time()
+        with self.lock:
+            holder, expires_at = self.leases.get(name, (None, 0))
+            if holder not in (None, owner) and expires_at >= now:
+                return False
+            self.leases[name] = (owner, now + ttl)
+            return True
+
+    def release(self, name, owner):
+        with self.lock:
+            if self.leases.get(name, (None, 0))[0] == owner:
+                del self.leases[name]
+
+    def get_rate_limit(self, webhook_url):
+        with self.lock:
+            return self.rate_limits.get(webhook_url, (None, 0))
+
+    def set_rate_limit(self, webhook_url, remaining, reset_at):
+        with self.lock:
+            self.rate_limits[webhook_url] = (remaining, reset_at)
+
+    def add_member(self, name, member):
+        with self.lock:
+            if member in self.sets[name]:
+                return False
+            self.sets[name].add(member)
+            return True
+
+    def discard_member(self, name, member):
+        with self.lock:
+            self.sets[name].discard(member)
+
+    def discard_prefix(self, name, prefix):
+        with self.lock:
+            self.sets[name] = {member for member in self.sets[name] if not member.startswith(prefix)}
+
+    def version(self, name):
+        with self.lock:
+            return self.versions[name]
+
+    def bump(self, name):
+        with self.lock:
+            self.versions[name] += 1
+            return self.versions[name]
+
+    def advance(self, name, version):
+        with self.lock:
+            if self.versions[name] >= version:
+                return False
+            self.versions[name] = version
+            return True
+
+
+class SqliteSharedState(SharedState):
+    def __init__(self, path: str = SHARED_STATE_PATH):
+        """
+        Shared state of the worker processes on one machine, in a SQLite database in WAL mode.
+        Every operation is a single statement.
+
+        Args:
+            path: Database file. Every worker has to use the same one
+        """
+        self.path = path
+        self.local = threading.local()
+        self._connection().executescript("""
+            CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS rate_limits (
+                webhook_url TEXT PRIMARY KEY, remaining INTEGER, reset_at REAL NOT NULL);
+            CREATE TABLE IF NOT EXISTS members (name TEXT NOT NULL, member TEXT NOT NULL, PRIMARY KEY (name, member));
+            CREATE TABLE IF NOT EXISTS versions (name TEXT PRIMARY KEY, version INTEGER NOT NULL);
+        """)
+
+    def _connection(self) -> sqlite3.Connection:
+        """One connection per thread, in autocommit mode."""
+        connection = getattr(self.local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            self.local.connection = connection
+        return connection
+
+    def acquire(self, name, owner, ttl):
+        now = time.time()
+        cursor = self._connection().execute(
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.owner = excluded.owner OR leases.expires_at < ?",
+            (name, owner, now + ttl, now),
+        )
+        return cursor.rowcount == 1
+
+    def release(self, name, owner):
+        self._connection().execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, owner))
+
+    def get_rate_limit(self, webhook_url):
+        row = self._connection().execute(
+            "SELECT remaining, reset_at FROM rate_limits WHERE webhook_url = ?", (webhook_url,)
+        ).fetchone()
+        return (row[0], row[1]) if row else (None, 0)
+
+    def set_rate_limit(self, webhook_url, remaining, reset_at):
+        self._connection().execute(
+            "INSERT OR REPLACE INTO rate_limits (webhook_url, remaining, reset_at) VALUES (?, ?, ?)",
+            (webhook_url, remaining, reset_at),
+        )
+
+    def add_member(self, name, member):
+        cursor = self._connection().execute("INSERT OR IGNORE INTO members (name, member) VALUES (?, ?)", (name, member))
+        return cursor.rowcount == 1
+
+    def discard_member(self, name, member):
+        self._connection().execute("DELETE FROM members WHERE name = ? AND member = ?", (name, member))
+
+    def discard_prefix(self, name, prefix):
+        # substr instead of LIKE, so prefixes may contain % and _
+        self._connection().execute(
+            "DELETE FROM members WHERE name = ? AND substr(member, 1, ?) = ?", (name, len(prefix), prefix)
+        )
+
+    def version(self, name):
+        row = self._connection().execute("SELECT version FROM versions WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else 0
+
+    def bump(self, name):
+        return self._connection().execute(
+            "INSERT INTO versions (name, version) VALUES (?, 1) "
+            "ON CONFLICT (name) DO UPDATE SET version = version + 1 RETURNING version",
+            (name,),
+        ).fetchone()[0]
+
+    def advance(self, name, version):
+        cursor = self._connection().execute(
+            "INSERT INTO versions (name, version) VALUES (?, ?) "
+            "ON CONFLICT (name) DO UPDATE SET version = excluded.version WHERE excluded.version > versions.version",
+            (name, version),
+        )
+        return cursor.rowcount == 1
+
+
+def create_shared_state(kind: str = SHARED_STATE) -> SharedState:
+    if kind == "sqlite":
+        return SqliteSharedState()
+    if kind != "memory":
+        raise ValueError(f"Unknown SHARED_STATE {kind!r}. Use 'memory' or 'sqlite'")
+    if BACKEND_WORKERS > 1:
+        logger.warning("SHARED_STATE=memory with %d workers: each worker dispatches and rate limits on its own",
+                       BACKEND_WORKERS)
+    return MemorySharedState()
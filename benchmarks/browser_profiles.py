@@ -0,0 +1,107 @@
+"""
+Compares spawn latency, bandwidth and memory of the browser profiles in
+scraper/helpers/browser_profiles.py.
+
+Each profile gets a fresh browser with a single context (no proxy). ``--tabs`` tabs are
+spawned concurrently on the event page, the same way spawn_tab does it, and timed until
+the manifest map (or the ticket type tabs) shows up.
+
+Usage:
+    python -m benchmarks.browser_profiles <event_url> [--tabs 5] [--profiles default lean] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import statistics
+import time
+
+import psutil
+from playwright.async_api import async_playwright, TimeoutError
+
+from scraper.helpers.browser_profiles import BROWSER_PROFILES, BrowserProfile
+
+
+def chromium_rss() -> int:
+    """RSS of every process spawned by this one (playwright driver and chromium)."""
+    total = 0
+    for child in psutil.Process().children(recursive=True):
+        try:
+            total += child.memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return total
+
+
+async def spawn_and_time(context, event_url: str) -> float:
+    page = await context.new_page()
+    started = time.perf_counter()
+    await page.goto(event_url)
+    try:
+        await page.wait_for_selector('img[usemap="#EtixOnlineManifestMap"]', timeout=3000)
+    except TimeoutError:
+        await page.wait_for_selector('ul[id="ticket-type"]')
+    return time.perf_counter() - started
+
+
+async def bench_profile(playwright, profile: BrowserProfile, event_url: str, tabs: int, headless: bool) -> dict:
+    baseline_rss = chromium_rss()
+    browser = await playwright.chromium.launch(headless=headless, args=profile.launch_args)
+    context = await browser.new_context(**profile.context_options)
+    if profile.route_handler:
+        await context.route("**/*", profile.route_handler)
+
+    size_futures = []
+    context.on("requestfinished", lambda request: size_futures.append(asyncio.ensure_future(request.sizes())))
+    blocked = []
+    context.on("requestfailed", lambda request: blocked.append(request.url))
+
+    latencies = await asyncio.gather(*(spawn_and_time(context, event_url) for _ in range(tabs)))
+    sizes = await asyncio.gather(*size_futures, return_exceptions=True)
+    bytes_received = sum(
+        size["responseBodySize"] + size["responseHeadersSize"]
+        for size in sizes if isinstance(size, dict)
+    )
+    rss = chromium_rss() - baseline_rss
+
+    await browser.close()
+    return {
+        "profile": profile.name,
+        "tabs": tabs,
+        "spawn_latency_p50_s": statistics.median(latencies),
+        "spawn_latency_max_s": max(latencies),
+        "requests": len(size_futures),
+        "requests_blocked": len(blocked),
+        "bytes_received": bytes_received,
+        "bytes_per_tab": bytes_received // tabs,
+        "rss_mb": rss / (1024 * 1024),
+        "rss_mb_per_tab": rss / (1024 * 1024) / tabs,
+    }
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("event_url")
+    parser.add_argument("--tabs", type=int, default=5)
+    parser.add_argument("--profiles", nargs="+", default=list(BROWSER_PROFILES))
+    parser.add_argument("--headed", action="store_true")
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    args = parser.parse_args()
+
+    results = []
+    async with async_playwright() as playwright:
+        for name in args.profiles:
+            result = await bench_profile(playwright, BROWSER_PROFILES[name], args.event_url, args.tabs, not args.headed)
+            results.append(result)
+            print(
+                f"{name:>8}: spawn p50 {result['spawn_latency_p50_s']:.2f}s (max {result['spawn_latency_max_s']:.2f}s) | "
+                f"{result['bytes_per_tab'] / 1024:.0f}KB/tab over {result['requests']} requests "
+                f"({result['requests_blocked']} blocked) | {result['rss_mb_per_tab']:.0f}MB/tab"
+            )
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump(results, file, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,162 @@
+"""
+End-to-end load test of the scraper and the backend against the local mock site
+(benchmarks/mock_site.py), without touching the ticketing site, proxies or Discord.
+
+The mock site runs in this process and a backend is started on a temporary database. A
+BrowserManager then scrapes every mock event over a direct connection and posts to the
+backend, which sends its alerts to the mock Discord webhooks. After ``--warmup`` seconds the
+run measures for ``--duration`` seconds:
+
+- refreshes/sec: section manifests the mock site served
+- alert latency: from a seat opening on the mock site to its alert reaching the mock webhook (p50, p99)
+- memory per tab: RSS of the browsers divided by the tabs open
+
+Scraper settings are passed through the environment before the scraper is imported. A .env
+file wins over them (load_dotenv(override=True)), so leave BACKEND_BASEURL, MANIFEST_IMAGE_PREFIX,
+DIRECT_CONNECTION, EVENT_SOURCE, DEBUG_UI and CHECKPOINTS out of it for this run.
+
+Usage:
+    python -m benchmarks.e2e_load [--events 3] [--sections 20] [--browsers 1] [--events-per-browser 5]
+                                  [--warmup 60] [--duration 120] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from aiohttp import web
+
+from benchmarks.lease_simulation import wait_for_backend
+from benchmarks.mock_site import CHART_PATH, add_site_arguments, site_from_arguments
+
+
+def start_backend(workdir: str, event_list: str, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'events.db')}",
+        "EVENT_LIST_PATH": event_list,
+        "HISTORY_DIR": os.path.join(workdir, "history"),
+        "SHARED_STATE_PATH": os.path.join(workdir, "shared_state.db"),
+        "DEBUG": "False",
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.backend_main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+
+
+async def run(args) -> dict:
+    site = site_from_arguments(args)
+    site_url = f"http://127.0.0.1:{args.site_port}"
+    backend_url = f"http://127.0.0.1:{args.backend_port}"
+    runner = web.AppRunner(site.app())
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.site_port).start()
+
+    os.environ.update({
+        "BACKEND_BASEURL": backend_url,
+        "MANIFEST_IMAGE_PREFIX": f"{site_url}{CHART_PATH}",
+        "DIRECT_CONNECTION": "True",
+        "EVENT_SOURCE": "file",
+        "DEBUG_UI": "False",
+        "CHECKPOINTS": "False",
+    })
+    from benchmarks.browser_profiles import chromium_rss
+    from scraper.managers.browser_manager import BrowserManager
+    from scraper.managers.proxy_prober import DIRECT_PROXY
+    from utils.headless_ui import HeadlessUI
+
+    workdir = tempfile.mkdtemp(prefix="e2e_load_")
+    events = site.event_list(site_url)
+    event_list = os.path.join(workdir, "event_list")
+    with open(event_list, "w") as f:
+        for url, webhook_url in events.items():
+            f.write(f"{url}@{webhook_url}\n")
+
+    os.makedirs("logs", exist_ok=True)
+    backend = start_backend(workdir, event_list, args.backend_port)
+    manager = None
+    try:
+        await asyncio.to_thread(wait_for_backend, backend_url)
+        baseline_rss = chromium_rss()
+        manager = BrowserManager(args.browsers, args.events_per_browser, events=events,
+                                 proxies=[dict(DIRECT_PROXY)], debug_ui=HeadlessUI())
+        started = time.monotonic()
+        await manager.initialize()
+        print(f"Started {len(manager.active_browsers)} browsers in {time.monotonic() - started:.1f}s, "
+              f"warming up for {args.warmup}s")
+        await asyncio.sleep(args.warmup)
+
+        # Only alerts about seats opened during the window count towards latency
+        manifests_before = site.stats.manifest_pages
+        site.stats.alert_latencies.clear()
+        opened_before = site.stats.seats_opened
+        rate_limited_before = site.stats.discord_rate_limited
+        window_started = time.monotonic()
+        tab_samples, rss_samples = [], []
+        while time.monotonic() - window_started < args.duration:
+            await asyncio.sleep(min(5, args.duration))
+            status = manager.status()
+            tab_samples.append(status["tabs"])
+            rss_samples.append(chromium_rss() - baseline_rss)
+        elapsed = time.monotonic() - window_started
+
+        summary = site.summary()
+        tabs = max(tab_samples) if tab_samples else 0
+        rss = max(rss_samples) if rss_samples else 0
+        return {
+            "events": len(events),
+            "sections_per_event": args.sections,
+            "seats_per_section": args.rows * args.seats_per_row,
+            "browsers": len(manager.active_browsers),
+            "duration_s": round(elapsed, 1),
+            "refreshes_per_s": round((site.stats.manifest_pages - manifests_before) / elapsed, 2),
+            "seats_opened": site.stats.seats_opened - opened_before,
+            "alerts_timed": summary["alerts_timed"],
+            "alert_latency_p50_s": summary["alert_latency_p50_s"],
+            "alert_latency_p99_s": summary["alert_latency_p99_s"],
+            "discord_rate_limited": site.stats.discord_rate_limited - rate_limited_before,
+            "tabs": tabs,
+            "rss_mb": rss / (1024 * 1024),
+            "rss_mb_per_tab": rss / (1024 * 1024) / tabs if tabs else None,
+        }
+    finally:
+        if manager is not None:
+            await manager.shutdown()
+            for browser_instance in manager.active_browsers:
+                try:
+                    await browser_instance.browser.close()
+                except Exception:
+                    pass
+            if manager.playwright:
+                await manager.playwright.stop()
+        backend.terminate()
+        backend.wait()
+        await runner.cleanup()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_site_arguments(parser)
+    parser.add_argument("--browsers", type=int, default=1, help="Max browsers")
+    parser.add_argument("--events-per-browser", type=int, default=5)
+    parser.add_argument("--warmup", type=float, default=60, help="Seconds to let every section load before measuring")
+    parser.add_argument("--duration", type=float, default=120, help="Seconds to measure for")
+    parser.add_argument("--site-port", type=int, default=8800)
+    parser.add_argument("--backend-port", type=int, default=4200)
+    parser.add_argument("--output", help="Write the results as json to this file")
+    args = parser.parse_args()
+
+    result = asyncio.run(run(args))
+    print(json.dumps(result, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
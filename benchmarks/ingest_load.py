@@ -0,0 +1,278 @@
+"""
+Benchmarks POST /ingest with synthetic SeatingPayloads.
+
+Every section of ``--events`` events gets ``--rows`` x ``--seats-per-row`` seats. Each payload
+of a section flips ``--churn`` of its seats between available and sold, so it produces new
+seats, alerts and deletions the way a real on-sale does. Payloads are posted at every
+``--concurrency`` level, each level for ``--requests`` requests, and never two of the same
+section at once (so none is rejected as stale unless something is wrong).
+
+Two modes:
+
+- inprocess: the FastAPI app is called through httpx's ASGITransport, without a server in between
+- http: a uvicorn backend is started and called over localhost
+
+Each mode runs on its own temporary database. The results per level are p50/p99 latency,
+throughput, how much the database and the history grew, and the alerts produced (embeds added
+to the outbox). Alerts are pointed at a webhook that can't be reached and retried a day later,
+so they stay in the outbox to be counted.
+
+Usage:
+    python -m benchmarks.ingest_load [--mode inprocess http] [--concurrency 1 4 16] [--requests 500]
+                                     [--events 5] [--sections 20] [--rows 10] [--seats-per-row 20] [--churn 0.02]
+                                     [--rules 0] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+import httpx
+
+from benchmarks.lease_simulation import wait_for_backend
+
+WEBHOOK_URL = "http://127.0.0.1:9/benchmark-webhook"
+PRICE_LEVELS = {"L1": 45.0, "L2": 85.0, "L3": 120.0, "L4": 250.0}
+
+
+class SyntheticSection:
+    def __init__(self, event_id: str, section: str, rows: int, seats_per_row: int, availability: float,
+                 churn: float, rng: random.Random):
+        """
+        The seats of one section, changing a bit with every payload.
+
+        Args:
+            event_id: Event the section belongs to
+            section: Section name
+            rows: Rows in the section
+            seats_per_row: Seats per row
+            availability: Share of seats available at the start
+            churn: Share of seats flipped between available and sold per payload
+            rng: Random source
+        """
+        self.event_id = event_id
+        self.section = section
+        self.churn = churn
+        self.rng = rng
+        self.sequence = 0
+        levels = list(PRICE_LEVELS)
+        self.rows = []
+        for r in range(rows):
+            row_name = chr(ord("A") + r % 26) * (r // 26 + 1)
+            level = levels[min(len(levels) - 1, (rows - 1 - r) * len(levels) // rows)]
+            seats = []
+            for s in range(seats_per_row):
+                seats.append({
+                    "rowIndex": r, "seatIndex": s, "row": row_name, "seat": str(s + 1),
+                    "seatIdentifier": f"{row_name}-{s + 1}", "status": "X", "currentStatus": "X", "realStatus": "X",
+                    "isAvailable": False, "note": "", "holdComment": "", "priceLevelId": level,
+                    "price": f"${PRICE_LEVELS[level]:.2f}", "priceNum": PRICE_LEVELS[level],
+                    "priceCode": {"id": "1", "name": "Standard", "description": "Standard"},
+                })
+                self._set(seats[-1], rng.random() < availability)
+            self.rows.append({"row": row_name, "seats": seats})
+        self.seats = [seat for row in self.rows for seat in row["seats"]]
+
+    @staticmethod
+    def _set(seat: dict, available: bool):
+        status = "O" if available else "X"
+        seat.update(isAvailable=available, status=status, currentStatus=status, realStatus=status)
+
+    def next_payload(self) -> dict:
+        for seat in self.rng.sample(self.seats, max(1, int(len(self.seats) * self.churn))):
+            self._set(seat, not seat["isAvailable"])
+        self.sequence += 1
+        return {"event_id": self.event_id, "section": self.section, "rows": self.rows,
+                "sequence": self.sequence, "scraped_at": time.time()}
+
+
+def disk_usage(db_path: str, history_dir: str) -> Tuple[int, int]:
+    """Bytes of the database (with its WAL) and of the history."""
+    db_bytes = sum(os.path.getsize(path) for path in (db_path, db_path + "-wal") if os.path.exists(path))
+    history_bytes = sum(
+        os.path.getsize(os.path.join(directory, name))
+        for directory, _, names in os.walk(history_dir) for name in names
+    )
+    return db_bytes, history_bytes
+
+
+def outbox_embeds(db_path: str) -> int:
+    with sqlite3.connect(db_path) as connection:
+        return connection.execute("SELECT count(*) FROM outbox").fetchone()[0]
+
+
+def backend_env(workdir: str) -> Dict[str, str]:
+    event_list = os.path.join(workdir, "event_list")
+    open(event_list, "w").close()
+    return {
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'events.db')}",
+        "EVENT_LIST_PATH": event_list,
+        "HISTORY_DIR": os.path.join(workdir, "history"),
+        "SHARED_STATE_PATH": os.path.join(workdir, "shared_state.db"),
+        "DEBUG": "False",
+        # The benchmark webhook can't be reached. Its alerts wait in the outbox to be counted
+        "OUTBOX_RETRY_DELAY": "86400",
+    }
+
+
+async def setup_events(client: httpx.AsyncClient, args, rng: random.Random) -> List[SyntheticSection]:
+    sections = []
+    for i in range(args.events):
+        response = await client.post("/create-event", json={
+            "url": f"https://www.etix.com/ticket/p/{20000000 + i}/bench-event-{i}",
+            "time": "2026-11-20T20:00:00",
+            "webhook_url": WEBHOOK_URL,
+        })
+        response.raise_for_status()
+        event_id = response.json()["event_id"]
+        sections.extend(
+            SyntheticSection(event_id, str(101 + s), args.rows, args.seats_per_row, args.availability, args.churn, rng)
+            for s in range(args.sections)
+        )
+    for i in range(args.rules):
+        response = await client.post("/alert-rules", json={
+            "webhook_url": WEBHOOK_URL,
+            "name": f"bench-rule-{i}",
+            "sections": f"{101 + i % args.sections}-{101 + args.sections}",
+            "min_adjacent": 2 + i % 4,
+            "max_price": list(PRICE_LEVELS.values())[i % len(PRICE_LEVELS)],
+        })
+        response.raise_for_status()
+    return sections
+
+
+async def run_level(client: httpx.AsyncClient, sections: List[SyntheticSection], concurrency: int,
+                    requests: int) -> dict:
+    idle = asyncio.Queue()
+    for section in sections:
+        idle.put_nowait(section)
+    latencies, statuses, new_seats = [], {}, 0
+    remaining = requests
+
+    async def worker():
+        nonlocal remaining, new_seats
+        while remaining > 0:
+            remaining -= 1
+            # A section is only posted by one worker at a time, so its payloads arrive in order
+            section = await idle.get()
+            payload = section.next_payload()
+            started = time.perf_counter()
+            response = await client.post("/ingest", json=payload)
+            latencies.append(time.perf_counter() - started)
+            idle.put_nowait(section)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            if response.status_code == 200:
+                new_seats += int(response.json()["message"].split()[0])
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(sections)))))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(len(latencies) / elapsed, 1),
+        "latency_p50_ms": round(statistics.median(latencies) * 1000, 2),
+        "latency_p99_ms": round(latencies[int(len(latencies) * 0.99)] * 1000, 2),
+        "new_seats": new_seats,
+    }
+
+
+async def bench_mode(client: httpx.AsyncClient, workdir: str, args) -> List[dict]:
+    db_path = os.path.join(workdir, "events.db")
+    history_dir = os.path.join(workdir, "history")
+    sections = await setup_events(client, args, random.Random(args.seed))
+    # The first payload of every section inserts all its seats. Not part of any level
+    await run_level(client, sections, max(args.concurrency), len(sections))
+    levels = []
+    for concurrency in args.concurrency:
+        db_before, history_before = disk_usage(db_path, history_dir)
+        embeds_before = outbox_embeds(db_path)
+        level = await run_level(client, sections, concurrency, args.requests)
+        # History is written in the background
+        await asyncio.sleep(1)
+        db_after, history_after = disk_usage(db_path, history_dir)
+        level.update(
+            db_growth_bytes=db_after - db_before,
+            history_growth_bytes=history_after - history_before,
+            alerts=outbox_embeds(db_path) - embeds_before,
+        )
+        print(json.dumps(level))
+        levels.append(level)
+    return levels
+
+
+async def bench_inprocess(args) -> List[dict]:
+    workdir = tempfile.mkdtemp(prefix="ingest_load_inprocess_")
+    # Read when the backend is imported
+    os.environ.update(backend_env(workdir))
+    from backend.backend_main import app
+
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://backend", timeout=60) as client:
+        return await bench_mode(client, workdir, args)
+
+
+async def bench_http(args) -> List[dict]:
+    workdir = tempfile.mkdtemp(prefix="ingest_load_http_")
+    base_url = f"http://127.0.0.1:{args.port}"
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.backend_main:app", "--port", str(args.port), "--log-level", "warning"],
+        env={**os.environ, **backend_env(workdir)},
+    )
+    try:
+        await asyncio.to_thread(wait_for_backend, base_url)
+        limits = httpx.Limits(max_connections=max(args.concurrency))
+        async with httpx.AsyncClient(base_url=base_url, timeout=60, limits=limits) as client:
+            return await bench_mode(client, workdir, args)
+    finally:
+        backend.terminate()
+        backend.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", nargs="+", choices=["inprocess", "http"], default=["inprocess", "http"])
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 4, 16], help="Requests in flight per level")
+    parser.add_argument("--requests", type=int, default=500, help="Requests per level")
+    parser.add_argument("--events", type=int, default=5)
+    parser.add_argument("--sections", type=int, default=20, help="Sections per event")
+    parser.add_argument("--rows", type=int, default=10, help="Rows per section")
+    parser.add_argument("--seats-per-row", type=int, default=20)
+    parser.add_argument("--availability", type=float, default=0.2, help="Share of seats available at the start")
+    parser.add_argument("--churn", type=float, default=0.02, help="Share of seats flipped per payload")
+    parser.add_argument("--rules", type=int, default=0, help="Alert rules to create for the events' webhook")
+    parser.add_argument("--port", type=int, default=4300, help="Port of the backend in http mode")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the results as json to this file")
+    args = parser.parse_args()
+
+    os.makedirs("logs", exist_ok=True)
+    results = {
+        "config": {
+            "events": args.events, "sections": args.sections, "seats_per_section": args.rows * args.seats_per_row,
+            "churn": args.churn, "rules": args.rules, "requests_per_level": args.requests,
+        },
+    }
+    # http first: in-process mode imports the backend into this process
+    for mode in sorted(args.mode):
+        print(f"Benchmarking {mode} ingest")
+        results[mode] = asyncio.run(bench_http(args) if mode == "http" else bench_inprocess(args))
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Runs the event leasing flow with several scraper processes on one host.
+
+A backend is started on a temporary database and event list, then ``--scrapers`` processes
+claim and renew leases the way BrowserManager does with EVENT_SOURCE=lease (no browsers are
+launched). Halfway through, one scraper is killed without releasing its leases. The run checks
+that no event is ever held by two scrapers and measures how long the killed scraper's events
+stay uncovered before its peers take them over.
+
+Usage:
+    python -m benchmarks.lease_simulation [--events 30] [--scrapers 3] [--capacity 20] [--ttl 6] [--duration 40]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+
+def run_scraper(scraper_id: str, base_url: str, capacity: int, renew_interval: float, holdings):
+    """A scraper that only holds leases. ``holdings`` is a shared dict of scraper id -> held urls."""
+    from scraper.managers.lease_client import LeaseClient
+
+    async def main():
+        client = LeaseClient(scraper_id, base_url)
+        while True:
+            await client.renew()
+            await client.claim(capacity - len(client.leases))
+            holdings[scraper_id] = sorted(client.leases)
+            await asyncio.sleep(renew_interval)
+
+    asyncio.run(main())
+
+
+def wait_for_backend(base_url: str, timeout: float = 30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/leases", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.3)
+    raise RuntimeError("Backend didn't come up")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=30)
+    parser.add_argument("--scrapers", type=int, default=3)
+    parser.add_argument("--capacity", type=int, default=20, help="Events each scraper can hold")
+    parser.add_argument("--ttl", type=float, default=6, help="Lease ttl in seconds")
+    parser.add_argument("--duration", type=float, default=40)
+    parser.add_argument("--port", type=int, default=4100)
+    parser.add_argument("--output", help="Write the results as json to this file")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="lease_sim_")
+    event_list = os.path.join(workdir, "event_list")
+    with open(event_list, "w") as f:
+        for i in range(args.events):
+            f.write(f"https://www.etix.com/ticket/p/{10000000 + i}/sim-event-{i}@https://discord.invalid/webhook/{i}\n")
+
+    base_url = f"http://127.0.0.1:{args.port}"
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'events.db')}",
+        "EVENT_LIST_PATH": event_list,
+        "LEASE_TTL": str(args.ttl),
+        "DEBUG": "True",
+    }
+    os.makedirs("logs", exist_ok=True)
+    backend = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.backend_main:app", "--port", str(args.port), "--log-level", "warning"],
+        env=env,
+    )
+    mp = multiprocessing.get_context("spawn")
+    scrapers = {}
+    try:
+        wait_for_backend(base_url)
+        manager = mp.Manager()
+        holdings = manager.dict()
+        renew_interval = args.ttl / 3
+        for i in range(args.scrapers):
+            scraper_id = f"sim-scraper-{i}"
+            process = mp.Process(target=run_scraper, args=(scraper_id, base_url, args.capacity, renew_interval, holdings))
+            process.start()
+            scrapers[scraper_id] = process
+
+        started = time.monotonic()
+        killed, killed_at, killed_events, recovered_at = None, None, [], None
+        double_held = 0
+        max_uncovered = 0
+        while time.monotonic() - started < args.duration:
+            time.sleep(0.5)
+            leases = httpx.get(f"{base_url}/leases").json()
+            owners = [lease["owner"] for lease in leases]
+            uncovered = sum(1 for owner in owners if owner is None)
+
+            held = [url for scraper_id, urls in holdings.items() if scraper_id != killed for url in urls]
+            double_held = max(double_held, len(held) - len(set(held)))
+
+            if killed is None and time.monotonic() - started > args.duration / 2:
+                killed = next(iter(scrapers))
+                killed_events = list(holdings.get(killed, []))
+                scrapers[killed].kill()
+                killed_at = time.monotonic()
+                print(f"Killed {killed} holding {len(killed_events)} events")
+            elif killed and recovered_at is None:
+                max_uncovered = max(max_uncovered, uncovered)
+                owner_of = {lease["url"]: lease["owner"] for lease in leases}
+                if killed_events and all(owner_of.get(url) not in (None, killed) for url in killed_events):
+                    recovered_at = time.monotonic()
+                    print(f"Events of {killed} taken over after {recovered_at - killed_at:.1f}s")
+
+        results = {
+            "events": args.events,
+            "scrapers": args.scrapers,
+            "ttl": args.ttl,
+            "holdings": {scraper_id: len(urls) for scraper_id, urls in holdings.items() if scraper_id != killed},
+            "double_held_max": double_held,
+            "killed_events": len(killed_events),
+            "takeover_seconds": round(recovered_at - killed_at, 2) if recovered_at else None,
+            "max_uncovered_during_takeover": max_uncovered,
+        }
+        print(json.dumps(results, indent=2))
+        if args.output:
+            with open(args.output, "w") as f:
+                json.dump(results, f, indent=2)
+    finally:
+        for process in scrapers.values():
+            process.kill()
+        backend.terminate()
+        backend.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+"""
+A local stand-in for the ticketing site and for Discord, to load test the scraper and the
+backend without touching either.
+
+The site serves synthetic events the way the scraper expects them: an event page with the
+``EtixOnlineManifestMap`` image map, the ``imageMapfrm`` form, ``isGASection`` and
+``chooseSection``, and a showManifest page per section with ``rowSeatStatus``, ``rowNames``,
+``priceInfos`` and the rest of the arrays the seat script reads. Seats open and close at random
+every ``--churn-interval`` seconds, and the time each seat opened is kept to measure how long
+it takes until its alert reaches the mock Discord webhook.
+
+The mock Discord webhook (``/api/webhooks/<id>/<token>``) answers with Discord's rate limit
+headers, and with 429 and ``Retry-After`` once a webhook sends more than ``--discord-limit``
+messages per ``--discord-window`` seconds.
+
+Point the scraper at it with MANIFEST_IMAGE_PREFIX=<site>/etix/viewable_chart/ and
+DIRECT_CONNECTION=True. benchmarks/e2e_load.py does all of that.
+
+Usage:
+    python -m benchmarks.mock_site [--port 8800] [--events 3] [--sections 20] [--rows 10] [--seats-per-row 20]
+                                   [--event-list event_list.mock]
+"""
+import argparse
+import asyncio
+import base64
+import json
+import random
+import statistics
+import time
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from aiohttp import web
+
+MANIFEST_PATH = "/ticket/mvc/legacyOnlineSale/performance/sale/showManifest"
+CHART_PATH = "/etix/viewable_chart/"
+# 1x1 transparent png, the manifest map image
+CHART_IMAGE = base64.b64decode(
+    "iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAQAAAC1HAwCAAAAC0lEQVR42mNkYAAAAAYAAjCB0C8AAAAASUVORK5CYII="
+)
+PRICE_LEVELS = {"L1": 45.0, "L2": 85.0, "L3": 120.0, "L4": 250.0}
+PRICE_CODE = "1"
+
+EVENT_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>{title}</title></head>
+<body>
+<h1>{title}</h1>
+<div class="time">{time}</div>
+<ul id="ticket-type"><li class="ui-state-active ui-tabs-selected"><a href="#">Seating Chart</a></li></ul>
+<img src="{chart}" usemap="#EtixOnlineManifestMap" width="800" height="600">
+<map name="EtixOnlineManifestMap">
+{areas}
+</map>
+<form id="imageMapfrm" method="POST" action="{manifest_path}">
+<input type="hidden" name="performance_id" value="{event_id}">
+<input type="hidden" name="current_selection_method" value="byManifest">
+<input type="hidden" name="selection" value="">
+</form>
+<script>
+var gaSections = {ga_sections};
+function isGASection(section) {{ return gaSections.indexOf(String(section)) >= 0; }}
+function chooseSection(section) {{
+  var form = document.getElementById('imageMapfrm');
+  form.elements['selection'].value = section;
+  form.submit();
+}}
+</script>
+</body>
+</html>
+"""
+
+MANIFEST_PAGE = """<!DOCTYPE html>
+<html>
+<head><title>Section {section}</title></head>
+<body>
+<div id="seatingChart"></div>
+<script>
+var rowlessSection = false;
+var rowNames = {row_names};
+var rowSeatStatus = {status};
+var rowSeatCurrentStatus = {status};
+var rowSeatRealStatus = {status};
+var rowSeatName = {seat_names};
+var rowSeatNote = {empty};
+var rowSeatHoldComment = {empty};
+var rowPriceLevelID = {price_levels};
+var priceCodeIds = {price_code_ids};
+var priceCodeIdNameMap = {price_code_names};
+var priceCodeIdDescMap = {price_code_names};
+var priceCodeName = {price_code_names};
+var priceCodePriceLevels = {price_code_levels};
+var priceInfos = {price_infos};
+</script>
+</body>
+</html>
+"""
+
+
+@dataclass
+class MockSection:
+    name: str
+    row_names: List[str]
+    seat_names: List[List[str]]
+    status: List[List[str]]  # "O" available, "X" sold
+    price_levels: List[List[str]]
+    ga: bool = False
+
+    @property
+    def available(self) -> bool:
+        return any("O" in row for row in self.status)
+
+
+@dataclass
+class MockEvent:
+    event_id: str
+    slug: str
+    time: datetime
+    sections: Dict[str, MockSection]
+
+
+@dataclass
+class Stats:
+    started: float = field(default_factory=time.time)
+    event_pages: int = 0
+    manifest_pages: int = 0
+    seats_opened: int = 0
+    discord_messages: int = 0
+    discord_embeds: int = 0
+    discord_rate_limited: int = 0
+    # Seconds from a seat opening to its alert arriving, for alerts about a single seat
+    alert_latencies: List[float] = field(default_factory=list)
+
+
+class MockSite:
+    def __init__(self, events: int = 3, sections: int = 20, rows: int = 10, seats_per_row: int = 20,
+                 ga_sections: int = 1, availability: float = 0.2, churn_interval: float = 5, churn_seats: int = 1,
+                 discord_limit: int = 5, discord_window: float = 2, seed: Optional[int] = None):
+        """
+        Synthetic events and a mock Discord webhook, served by one aiohttp app.
+
+        Args:
+            events: Number of events
+            sections: Sections per event, GA sections included
+            rows: Rows per section
+            seats_per_row: Seats per row
+            ga_sections: Sections per event that are general admission
+            availability: Share of seats available at the start
+            churn_interval: Seconds between two rounds of churn
+            churn_seats: Seats of every section that open or close in each round
+            discord_limit: Messages a webhook may send per ``discord_window`` seconds
+            discord_window: Length of a rate limit window in seconds
+            seed: Seed of the generated events and churn
+        """
+        self.random = random.Random(seed)
+        self.churn_interval = churn_interval
+        self.churn_seats = churn_seats
+        self.discord_limit = discord_limit
+        self.discord_window = discord_window
+        self.stats = Stats()
+        # (event id, section, seat identifier) -> unix time it opened
+        self.opened_at: Dict[Tuple[str, str, str], float] = {}
+        # webhook id -> unix times of its recent messages
+        self.webhook_calls: Dict[str, List[float]] = defaultdict(list)
+        self.events: Dict[str, MockEvent] = {}
+        for i in range(events):
+            event_id = str(90000000 + i)
+            self.events[event_id] = MockEvent(
+                event_id=event_id,
+                slug=f"mock-event-{i}",
+                time=datetime.now().replace(hour=20, minute=0, second=0, microsecond=0) + timedelta(days=30 + i),
+                sections={
+                    str(101 + s): self._section(str(101 + s), rows, seats_per_row, availability, s < ga_sections)
+                    for s in range(sections)
+                },
+            )
+        self.churn_task: Optional[asyncio.Task] = None
+
+    def _section(self, name: str, rows: int, seats_per_row: int, availability: float, ga: bool) -> MockSection:
+        levels = list(PRICE_LEVELS)
+        row_names = [chr(ord("A") + r) if r < 26 else f"A{chr(ord('A') + r - 26)}" for r in range(rows)]
+        return MockSection(
+            name=name,
+            row_names=row_names,
+            seat_names=[[str(s + 1) for s in range(seats_per_row)] for _ in range(rows)],
+            status=[["O" if self.random.random() < availability else "X" for _ in range(seats_per_row)] for _ in range(rows)],
+            # Cheaper towards the back
+            price_levels=[[levels[min(len(levels) - 1, (rows - 1 - r) * len(levels) // rows)]] * seats_per_row
+                          for r in range(rows)],
+            ga=ga,
+        )
+
+    def event_urls(self, base_url: str) -> List[str]:
+        return [f"{base_url}/ticket/p/{event.event_id}/{event.slug}" for event in self.events.values()]
+
+    def event_list(self, base_url: str) -> Dict[str, str]:
+        """Event url -> mock webhook url, one webhook per event."""
+        return {
+            url: f"{base_url}/api/webhooks/{i}/mock-token"
+            for i, url in enumerate(self.event_urls(base_url))
+        }
+
+    def churn(self):
+        """Open or close ``churn_seats`` random seats in every section."""
+        now = time.time()
+        for event in self.events.values():
+            for section in event.sections.values():
+                if section.ga:
+                    continue
+                for _ in range(self.churn_seats):
+                    r = self.random.randrange(len(section.row_names))
+                    s = self.random.randrange(len(section.seat_names[r]))
+                    key = (event.event_id, section.name, f"{section.row_names[r]}-{section.seat_names[r][s]}")
+                    if section.status[r][s] == "X":
+                        section.status[r][s] = "O"
+                        self.opened_at[key] = now
+                        self.stats.seats_opened += 1
+                    else:
+                        section.status[r][s] = "X"
+                        self.opened_at.pop(key, None)
+
+    async def churn_loop(self):
+        while True:
+            await asyncio.sleep(self.churn_interval)
+            self.churn()
+
+    async def start_churn(self, app: web.Application):
+        self.churn_task = asyncio.create_task(self.churn_loop())
+
+    async def stop_churn(self, app: web.Application):
+        if self.churn_task:
+            self.churn_task.cancel()
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/ticket/p/{event_id}/{slug}", self.event_page)
+        app.router.add_route("*", MANIFEST_PATH, self.manifest_page)
+        app.router.add_get(CHART_PATH + "{name}", self.chart_image)
+        app.router.add_post("/api/webhooks/{webhook_id}/{token}", self.webhook)
+        app.router.add_get("/mock/stats", self.stats_page)
+        app.on_startup.append(self.start_churn)
+        app.on_cleanup.append(self.stop_churn)
+        return app
+
+    async def event_page(self, request: web.Request) -> web.Response:
+        event = self.events.get(request.match_info["event_id"])
+        if event is None:
+            raise web.HTTPNotFound()
+        self.stats.event_pages += 1
+        areas = "\n".join(
+            f'<area name="{section.name}" status="{"Available" if section.available else "SoldOut"}" shape="rect" '
+            f'coords="{i * 10},0,{i * 10 + 9},9" href="javascript:chooseSection(\'{section.name}\')">'
+            for i, section in enumerate(event.sections.values())
+        )
+        html = EVENT_PAGE.format(
+            title=event.slug,
+            time=event.time.strftime("%A, %B %d, %Y %I:%M %p").replace(" 0", " "),
+            chart=f"{request.scheme}://{request.host}{CHART_PATH}{event.event_id}.png",
+            areas=areas,
+            manifest_path=MANIFEST_PATH,
+            event_id=event.event_id,
+            ga_sections=json.dumps([name for name, section in event.sections.items() if section.ga]),
+        )
+        return web.Response(text=html, content_type="text/html")
+
+    async def manifest_page(self, request: web.Request) -> web.Response:
+        # chooseSection POSTs the form. Accept the fields as query parameters as well
+        fields = dict(request.query)
+        if request.method == "POST":
+            fields.update(await request.post())
+        event = self.events.get(str(fields.get("performance_id", "")))
+        section = event.sections.get(str(fields.get("selection", ""))) if event else None
+        if section is None:
+            raise web.HTTPNotFound()
+        self.stats.manifest_pages += 1
+        html = MANIFEST_PAGE.format(
+            section=section.name,
+            row_names=json.dumps(section.row_names),
+            status=json.dumps(section.status),
+            seat_names=json.dumps(section.seat_names),
+            empty=json.dumps([[""] * len(row) for row in section.status]),
+            price_levels=json.dumps(section.price_levels),
+            price_code_ids=json.dumps([PRICE_CODE]),
+            price_code_names=json.dumps({PRICE_CODE: "Standard"}),
+            price_code_levels=json.dumps({PRICE_CODE: list(PRICE_LEVELS)}),
+            price_infos=json.dumps([
+                {"keyId": f"{PRICE_CODE}&{level}", "ticketPriceStr": f"${price:.2f}", "ticketPriceNum": price}
+                for level, price in PRICE_LEVELS.items()
+            ]),
+        )
+        return web.Response(text=html, content_type="text/html")
+
+    async def chart_image(self, request: web.Request) -> web.Response:
+        return web.Response(body=CHART_IMAGE, content_type="image/png")
+
+    async def webhook(self, request: web.Request) -> web.Response:
+        now = time.time()
+        webhook_id = request.match_info["webhook_id"]
+        calls = [called_at for called_at in self.webhook_calls[webhook_id] if called_at > now - self.discord_window]
+        self.webhook_calls[webhook_id] = calls
+        reset_at = (calls[0] if calls else now) + self.discord_window
+        headers = {
+            "X-RateLimit-Limit": str(self.discord_limit),
+            "X-RateLimit-Reset": f"{reset_at:.3f}",
+            "X-RateLimit-Reset-After": f"{reset_at - now:.3f}",
+            "X-RateLimit-Bucket": webhook_id,
+        }
+        if len(calls) >= self.discord_limit:
+            self.stats.discord_rate_limited += 1
+            retry_after = reset_at - now
+            headers.update({"X-RateLimit-Remaining": "0", "Retry-After": f"{retry_after:.3f}"})
+            return web.json_response({"message": "You are being rate limited.", "retry_after": retry_after,
+                                      "global": False}, status=429, headers=headers)
+
+        calls.append(now)
+        headers["X-RateLimit-Remaining"] = str(self.discord_limit - len(calls))
+        embeds = (await request.json()).get("embeds", [])
+        self.stats.discord_messages += 1
+        self.stats.discord_embeds += len(embeds)
+        for embed in embeds:
+            latency = self.alert_latency(embed, now)
+            if latency is not None:
+                self.stats.alert_latencies.append(latency)
+        return web.Response(status=204, headers=headers)
+
+    def alert_latency(self, embed: dict, received_at: float) -> Optional[float]:
+        """Seconds since the seat of a single seat alert opened. None for other alerts."""
+        fields = {f.get("name"): str(f.get("value")) for f in embed.get("fields", [])}
+        if not {"Event", "Section", "Row", "Seat"} <= fields.keys():
+            return None
+        event_id = next((part for part in fields["Event"].split("/") if part.isdigit()), None)
+        opened_at = self.opened_at.get((event_id, fields["Section"], f"{fields['Row']}-{fields['Seat']}"))
+        return received_at - opened_at if opened_at else None
+
+    def summary(self) -> dict:
+        latencies = sorted(self.stats.alert_latencies)
+        elapsed = time.time() - self.stats.started
+        return {
+            "elapsed_s": round(elapsed, 1),
+            "event_pages": self.stats.event_pages,
+            "manifest_pages": self.stats.manifest_pages,
+            "seats_opened": self.stats.seats_opened,
+            "discord_messages": self.stats.discord_messages,
+            "discord_embeds": self.stats.discord_embeds,
+            "discord_rate_limited": self.stats.discord_rate_limited,
+            "alerts_timed": len(latencies),
+            "alert_latency_p50_s": round(statistics.median(latencies), 3) if latencies else None,
+            "alert_latency_p99_s": round(latencies[int(len(latencies) * 0.99)], 3) if latencies else None,
+        }
+
+    async def stats_page(self, request: web.Request) -> web.Response:
+        return web.json_response(self.summary())
+
+
+def add_site_arguments(parser: argparse.ArgumentParser):
+    parser.add_argument("--events", type=int, default=3)
+    parser.add_argument("--sections", type=int, default=20, help="Sections per event")
+    parser.add_argument("--rows", type=int, default=10, help="Rows per section")
+    parser.add_argument("--seats-per-row", type=int, default=20)
+    parser.add_argument("--ga-sections", type=int, default=1, help="GA sections per event")
+    parser.add_argument("--availability", type=float, default=0.2, help="Share of seats available at the start")
+    parser.add_argument("--churn-interval", type=float, default=5, help="Seconds between two rounds of churn")
+    parser.add_argument("--churn-seats", type=int, default=1, help="Seats per section that open or close each round")
+    parser.add_argument("--discord-limit", type=int, default=5, help="Messages per webhook per rate limit window")
+    parser.add_argument("--discord-window", type=float, default=2, help="Rate limit window in seconds")
+    parser.add_argument("--seed", type=int, default=None)
+
+
+def site_from_arguments(args: argparse.Namespace) -> MockSite:
+    return MockSite(
+        events=args.events, sections=args.sections, rows=args.rows, seats_per_row=args.seats_per_row,
+        ga_sections=args.ga_sections, availability=args.availability, churn_interval=args.churn_interval,
+        churn_seats=args.churn_seats, discord_limit=args.discord_limit, discord_window=args.discord_window,
+        seed=args.seed,
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    add_site_arguments(parser)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8800)
+    parser.add_argument("--event-list", help="Write an event list (url@webhook per line) for the scraper to this file")
+    args = parser.parse_args()
+
+    site = site_from_arguments(args)
+    base_url = f"http://{args.host}:{args.port}"
+    if args.event_list:
+        with open(args.event_list, "w") as event_list:
+            for url, webhook_url in site.event_list(base_url).items():
+                event_list.write(f"{url}@{webhook_url}\n")
+    print(f"Serving {len(site.events)} events on {base_url}. MANIFEST_IMAGE_PREFIX={base_url}{CHART_PATH}")
+    web.run_app(site.app(), host=args.host, port=args.port, print=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Replays a recording of ingest traffic (INGEST_RECORD_PATH) into a backend, to profile and
+regression test ingest, alerts and dispatch on the traffic of a real on-sale.
+
+Requests are sent with the timing they were recorded with, ``--speed`` times faster, or as fast
+as ``--concurrency`` allows with ``--speed max``. Payloads of one section are sent one after the
+other, in recorded order. Recordings of several backend workers are merged by time.
+
+Without ``--backend-url`` a backend is started on a temporary database with DEBUG=True, so
+alerts are only printed. A backend given with ``--backend-url`` sends alerts to the recorded
+webhooks unless ``--webhook-url`` replaces them (e.g. with the mock Discord of benchmarks/mock_site.py),
+and it has to be fresh: payloads it has already seen are rejected as stale.
+
+Usage:
+    python -m benchmarks.replay recording.jsonl.gz [more recordings] [--speed 1|10|max] [--concurrency 32]
+                                [--backend-url http://localhost:4000] [--webhook-url URL] [--output results.json]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import List, Optional
+
+import httpx
+
+from backend.utils.ingest_recorder import read_recordings
+from benchmarks.lease_simulation import wait_for_backend
+
+
+def start_backend(port: int) -> subprocess.Popen:
+    workdir = tempfile.mkdtemp(prefix="replay_")
+    event_list = os.path.join(workdir, "event_list")
+    open(event_list, "w").close()
+    env = {
+        **os.environ,
+        "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'events.db')}",
+        "EVENT_LIST_PATH": event_list,
+        "HISTORY_DIR": os.path.join(workdir, "history"),
+        "SHARED_STATE_PATH": os.path.join(workdir, "shared_state.db"),
+        "DEBUG": "True",
+        "INGEST_RECORD_PATH": "",
+    }
+    # DEBUG prints every alert instead of sending it
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.backend_main:app", "--port", str(port), "--log-level", "warning"],
+        env=env, stdout=subprocess.DEVNULL,
+    )
+
+
+async def replay(paths: List[str], base_url: str, speed: Optional[float], concurrency: int,
+                 webhook_url: Optional[str]) -> dict:
+    """Send the recorded requests. ``speed`` None sends them as fast as possible."""
+    semaphore = asyncio.Semaphore(concurrency)
+    section_locks = defaultdict(asyncio.Lock)
+    latencies = defaultdict(list)
+    statuses = defaultdict(lambda: defaultdict(int))
+    max_lag = 0.0
+    tasks = set()
+
+    async def send(client: httpx.AsyncClient, path: str, body: dict):
+        try:
+            started = time.perf_counter()
+            try:
+                response = await client.post(path, json=body)
+                status = str(response.status_code)
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies[path].append(time.perf_counter() - started)
+            statuses[path][status] += 1
+        finally:
+            semaphore.release()
+
+    async def send_in_order(client: httpx.AsyncClient, path: str, body: dict):
+        async with section_locks[(body.get("event_id"), body.get("section"))]:
+            await send(client, path, body)
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60,
+                                 limits=httpx.Limits(max_connections=concurrency)) as client:
+        first_recorded, started = None, time.monotonic()
+        for recorded_at, path, body in read_recordings(paths):
+            if first_recorded is None:
+                first_recorded = recorded_at
+            if speed is not None:
+                due = started + (recorded_at - first_recorded) / speed
+                delay = due - time.monotonic()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                max_lag = max(max_lag, time.monotonic() - due)
+            await semaphore.acquire()
+            if path == "/create-event":
+                if webhook_url:
+                    body = {**body, "webhook_url": webhook_url}
+                # Ingests of the event need it to exist
+                await send(client, path, body)
+                continue
+            task = asyncio.create_task(send_in_order(client, path, body))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        if tasks:
+            await asyncio.wait(tasks)
+        elapsed = time.monotonic() - started
+
+    recorded_span = (recorded_at - first_recorded) if first_recorded is not None else 0
+    results = {
+        "speed": speed or "max",
+        "recorded_span_s": round(recorded_span, 1),
+        "duration_s": round(elapsed, 1),
+        "requests": sum(len(values) for values in latencies.values()),
+        "throughput_rps": round(sum(len(values) for values in latencies.values()) / elapsed, 1) if elapsed else None,
+        "max_lag_s": round(max_lag, 3) if speed is not None else None,
+        "paths": {},
+    }
+    for path, values in latencies.items():
+        values.sort()
+        results["paths"][path] = {
+            "requests": len(values),
+            "statuses": dict(statuses[path]),
+            "latency_p50_ms": round(statistics.median(values) * 1000, 2),
+            "latency_p99_ms": round(values[int(len(values) * 0.99)] * 1000, 2),
+        }
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("recordings", nargs="+", help="Recordings to merge and replay")
+    parser.add_argument("--speed", default="1", help="1 (as recorded), 10 (ten times faster) or max")
+    parser.add_argument("--concurrency", type=int, default=32, help="Requests in flight at most")
+    parser.add_argument("--backend-url", help="Backend to replay into. Starts a temporary one when not given")
+    parser.add_argument("--webhook-url", help="Replace the webhook of every recorded event with this one")
+    parser.add_argument("--port", type=int, default=4400, help="Port of the temporary backend")
+    parser.add_argument("--output", help="Write the results as json to this file")
+    args = parser.parse_args()
+    speed = None if args.speed == "max" else float(args.speed)
+
+    os.makedirs("logs", exist_ok=True)
+    # One line per request otherwise
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    backend = None
+    base_url = args.backend_url
+    if not base_url:
+        base_url = f"http://127.0.0.1:{args.port}"
+        backend = start_backend(args.port)
+    try:
+        wait_for_backend(base_url)
+        results = asyncio.run(replay(args.recordings, base_url, speed, args.concurrency, args.webhook_url))
+    finally:
+        if backend:
+            backend.terminate()
+            backend.wait()
+
+    print(json.dumps(results, indent=2))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
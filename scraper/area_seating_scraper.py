@@ -2,25 +2,32 @@ import asyncio
 import datetime
 import os
 import random
+import time
 from os import getenv
 import re
+from typing import TYPE_CHECKING, Callable, Optional
+from urllib.parse import urlencode
 from dotenv import load_dotenv
 
-from utils.debug_ui import DebugUI
 from utils.priority_semaphore import PrioritySemaphore
 from scraper.managers.proxy_manager import ProxyManager
 
 load_dotenv(override=True)
 
+if TYPE_CHECKING:
+    from utils.debug_ui import DebugUI
+
 from playwright.async_api import Page, TimeoutError, Browser
 from playwright._impl._errors import TargetClosedError
 
 from scraper.helpers.capsolver import Capsolver
+from utils.failure_snapshots import FailureSnapshots
 from utils.logger import setup_logger
 
 script_dir = os.path.dirname(__file__)
 ticket_data_adjacent_path = os.path.join(script_dir, "helpers/scripts/ticketDataAdjacentShowManifest.js")
 get_recaptcha_callback_path = os.path.join(script_dir,"helpers/scripts/getRecaptchaCallback.js")
+get_section_navigation_data_path = os.path.join(script_dir, "helpers/scripts/getSectionNavigationData.js")
 
 
 DEBUG=True if getenv("DEBUG") == "True" else False
@@ -31,12 +38,38 @@ ERROR_URL2 = "https://www.etix.com/ticket/online2z/flowError.jsp"
 INITIAL_LOADING_PRIORITY = 9
 TAB_RELOAD_PRIORITY = 11
 MAIN_RELOAD_PRIORITY = 10
+# Replacing a dead section goes ahead of initial loading and of live refreshes
+RESPAWN_PRIORITY = 8
+
+# A section is respawned right away when its tab dies, unless it was already respawned this recently
+RESPAWN_COOLDOWN = 30
+
+# "direct" POSTs new tabs straight to their section manifest, "landing" goes through the event page first
+SPAWN_MODE = getenv("SPAWN_MODE", "direct")
+DIRECT_SPAWN_TIMEOUT = int(getenv("DIRECT_SPAWN_TIMEOUT", 15000))
+# Sections of all events that can be spawning at the same time during startup
+SECTION_SPAWN_CONCURRENCY = int(getenv("SECTION_SPAWN_CONCURRENCY", 16))
+# Direct spawning is turned off for an event after this many failures in a row
+DIRECT_SPAWN_MAX_FAILURES = 3
 
 async def get_available_area_numbers(page):
     area_elements = await page.query_selector_all('map[name="EtixOnlineManifestMap"] > area[status="Available"]')
     return [await element.get_attribute('name') for element in area_elements]  # or extract some attribute if available
 
 
+async def get_section_navigation_data(page: Page, base_url: str) -> Optional[dict]:
+    """The form action and fields that open a section manifest of this event."""
+    match = re.search(r'/p/(\d+)', base_url)
+    with open(get_section_navigation_data_path, "r") as navigation_script:
+        return await page.evaluate(navigation_script.read(), match.group(1) if match else None)
+
+async def get_ga_sections(page: Page, areas: list[str]) -> list[str]:
+    """Areas that are general admission, checked in one go on the event page."""
+    return await page.evaluate(
+        "areas => typeof isGASection === 'function' ? areas.filter(area => isGASection(area)) : []",
+        areas
+    )
+
 async def scrape_section_data(tab: Page, section: str):
     with open(ticket_data_adjacent_path, "r") as data_scraper_script:
         seat_data =  await tab.evaluate(data_scraper_script.read(), section )
@@ -57,7 +90,9 @@ async def wait_for_window_property(page: Page, prop_name: str, timeout=5000):
     )
 
 class AreaSeatingScraper:
-    def __init__(self,browser, page: Page, data_callback, proxy_manager: ProxyManager, base_url, debug_ui, network_sem, callback):
+    def __init__(self,browser, page: Page, data_callback, proxy_manager: ProxyManager, base_url, debug_ui, network_sem, callback,
+                 spawn_sem: Optional[asyncio.Semaphore] = None, checkpoint: Optional[dict] = None,
+                 save_checkpoint: Optional[Callable[..., None]] = None):
         self.last_rate_limit_time = None
         self.browser: Browser = browser
         self.page = page
@@ -66,7 +101,7 @@ class AreaSeatingScraper:
         self.tabs: dict[str, Page] = {}
         self.timed_out = False
         self.logger = setup_logger("AreaSeatingScraper")
-        self.debug_ui: DebugUI = debug_ui
+        self.debug_ui: "DebugUI" = debug_ui
         self.logger.propagate = False
         self.data_callback = data_callback
         self.proxy_manager = proxy_manager
@@ -74,67 +109,205 @@ class AreaSeatingScraper:
         self.ready_areas = []
         self.initial_loading_complete_dict: dict[str, bool] = {}
         self.initial_loading_complete_callback = callback
+        self.spawn_sem = spawn_sem or asyncio.Semaphore(SECTION_SPAWN_CONCURRENCY)
         self.initial_spawning_complete = False # spawning is just for spawning the tabs. initial loading is different
-        self.section_blacklist = [] # sections that should not be respawned
+        checkpoint = checkpoint or {}
+        self.section_blacklist = list(checkpoint.get("ga_sections", [])) # sections that should not be respawned
+        # Available areas of the last checkpoint. Spawned right away instead of waiting for the event page
+        self.known_areas: list[str] = list(checkpoint.get("areas", []))
+        self.save_checkpoint = save_checkpoint or (lambda **fields: None)
         self.spawn_target_closed_errors: dict[str, int] ={}
         self.quit_flag = False
         self.seats_not_found_counter: dict[str, int] = {}
         self.respawning_areas: list[str] = []
+        self.last_respawn: dict[str, float] = {}
+        self.section_navigation: Optional[dict] = checkpoint.get("section_navigation")
+        self.direct_spawn_failures = 0
+        event_match = re.search(r'/([\d]+)/', base_url)
+        self.event_key = event_match.group(1) if event_match else base_url
+        self.failure_snapshots = FailureSnapshots()
+        # Sequence number of the last scrape of each section
+        self.sequences: dict[str, int] = {}
+
+    def next_sequence(self, area_number) -> int:
+        """
+        Sequence number for a new scrape of ``area_number``. Based on the time in microseconds, so it
+        keeps increasing when the section moves to a new scraper or the scraper restarts.
+        """
+        sequence = max(self.sequences.get(area_number, 0) + 1, time.time_ns() // 1000)
+        self.sequences[area_number] = sequence
+        return sequence
+
+    def log_fields(self, area_number) -> dict:
+        """Structured fields for log records about ``area_number``."""
+        return {"event": self.event_key, "section": area_number}
 
     async def respawn_tab(self, area_number):
+        if area_number not in self.respawning_areas:
+            self.respawning_areas.append(area_number)
+        self.last_respawn[area_number] = time.monotonic()
+        try:
+            # Respawns take a tab from the warm pool instead of creating a context and a page
+            await self.spawn_tab(area_number, priority=RESPAWN_PRIORITY, warm=True)
+        finally:
+            self.respawning_areas.remove(area_number)
+
+    def schedule_respawn(self, area_number):
+        """Respawn a section as soon as its tab dies instead of waiting for the main loop to notice."""
+        if (self.quit_flag or area_number in self.respawning_areas or area_number in self.section_blacklist
+                or area_number not in self.prev_available_area_numbers
+                or time.monotonic() - self.last_respawn.get(area_number, 0) < RESPAWN_COOLDOWN):
+            # The main loop picks it up on its next pass
+            return
         self.respawning_areas.append(area_number)
-        await self.spawn_tab(area_number)
-        self.respawning_areas.remove(area_number)
+        asyncio.create_task(self.respawn_tab(area_number), name=f"respawn_tab_{area_number}:{self.base_url}")
+
+    async def recycle_tab(self, area_number):
+        """
+        Replace the tab of a section with a fresh one. The old tab keeps being monitored
+        until the new one has loaded the manifest, so the section never goes uncovered.
+        """
+        old_tab = self.tabs.get(area_number)
+        if old_tab is None or area_number in self.respawning_areas:
+            return
 
-    async def spawn_tab(self, area_number):
+        self.logger.info(f"Recycling tab for area {area_number}")
+        self.debug_ui.update_status(self.base_url,area_number,"Recycling tab" )
+        # Keeps the main loop from respawning the area while the old tab is being swapped out
+        self.respawning_areas.append(area_number)
+        try:
+            await self.spawn_tab(area_number, replacing=old_tab)
+        finally:
+            self.respawning_areas.remove(area_number)
+
+        if self.tabs.get(area_number) is old_tab:
+            # Replacement failed. Keep the old tab and allow another attempt later
+            self.proxy_manager.register_recycle_handler(old_tab, lambda: self.recycle_tab(area_number))
+
+    def _release_area(self, area_number, tab: Page) -> bool:
+        """
+        Forget ``tab`` as the tab of ``area_number``. Returns True if a recycled replacement
+        has already taken its place, in which case the caller should keep monitoring.
+        """
+        current = self.tabs.get(area_number)
+        if current is tab:
+            self.tabs.pop(area_number)
+            return False
+        return current is not None
+
+    async def spawn_tab(self, area_number, replacing: Optional[Page] = None,
+                        priority: int = INITIAL_LOADING_PRIORITY, warm: bool = False):
 
         try:
-            new_tab: Page = await self.proxy_manager.create_tab()
+            if warm:
+                new_tab: Page = await self.proxy_manager.acquire_tab()
+            else:
+                new_tab: Page = await self.proxy_manager.create_tab()
 
-            async with self.network_sem.priority(INITIAL_LOADING_PRIORITY):
+            if SPAWN_MODE == "direct" and self.section_navigation:
+                if replacing is None:
+                    self.tabs[area_number] = new_tab
+                if await self.navigate_directly_to_section(new_tab, area_number, priority):
+                    self.direct_spawn_failures = 0
+                    await self.start_monitoring(new_tab, area_number, replacing)
+                    return
+                self.direct_spawn_failures += 1
+                if self.direct_spawn_failures >= DIRECT_SPAWN_MAX_FAILURES:
+                    self.logger.warning(f"Direct spawning keeps failing for {self.base_url}. Using the event page from now on")
+                    self.section_navigation = None
+                self.debug_ui.update_status(self.base_url,area_number,"Direct spawn failed. Loading event page" )
+
+            async with self.network_sem.priority(priority):
                     await new_tab.goto(self.base_url) 
                     await new_tab.wait_for_load_state("domcontentloaded")
                     # url changes to a common URL when seating chart isn't displayed on first load. So 
                     # cant use self.page.url
-                    await self.debug_ui.update_status(self.base_url,area_number,f"Waiting till initial loading complete..." )
+                    self.debug_ui.update_status(self.base_url,area_number,"Waiting till initial loading complete..." )
                     try:
-                        await self.debug_ui.update_status(self.base_url,area_number,f"Initial loading: checking for map " )
+                        self.debug_ui.update_status(self.base_url,area_number,"Initial loading: checking for map " )
                         await new_tab.wait_for_selector('img[usemap="#EtixOnlineManifestMap"]', timeout=3000) 
                     except TimeoutError:
                         try:
                             #await new_tab.screenshot(path=f"./no_map/{random.randint(0,1000)}.jpg", full_page=True)
-                            await self.debug_ui.update_status(self.base_url,area_number,f"Initial loading: no map, checking for ticket type " )
+                            self.debug_ui.update_status(self.base_url,area_number,"Initial loading: no map, checking for ticket type " )
                             await new_tab.wait_for_selector('ul[id="ticket-type"]')
                         except TimeoutError as e:
                             self.logger.error(f"Error in spawn_tab for area {area_number}: {e}")
-                            await self.debug_ui.update_status(self.base_url,area_number,f"Error in monitor_tab for area {str(e)[:50]}..." )
+                            self.debug_ui.update_status(self.base_url,area_number,f"Error in monitor_tab for area {str(e)[:50]}..." )
                             await self.proxy_manager.close_tab(new_tab)
-                            if new_tab in self.tabs.values():
-                                self.tabs.pop(area_number)
+                            self._release_area(area_number, new_tab)
                             return
-                    self.tabs[area_number] = new_tab
+                    if replacing is None:
+                        # A replacement only takes over the area once its manifest is loaded
+                        self.tabs[area_number] = new_tab
 
             # DO NOT PUT THIS SNIPPET INSIDE NETWORK_SEM. IT WILL HANG. 
             # navigate_to_seating_manifest already uses network sem
-            await self.navigate_to_seating_manifest(new_tab, area_number)
+            await self.navigate_to_seating_manifest(new_tab, area_number, replacing, priority)
 
         except TargetClosedError:
             if self.browser.is_connected():
                 if self.proxy_manager.check_context_status(new_tab):
-                    await self.debug_ui.update_status(self.base_url,area_number,f"Initial load fail. Page crashed" )
+                    self.debug_ui.update_status(self.base_url,area_number,"Initial load fail. Page crashed" )
                     return
                 else:
-                    await self.debug_ui.update_status(self.base_url,area_number,f"Initial load fail. Context crashed" )
+                    self.debug_ui.update_status(self.base_url,area_number,"Initial load fail. Context crashed" )
                     self.quit_flag = True
                     return
             else:
-                await self.debug_ui.update_status(self.base_url,area_number,f"Initial load fail. browser crashed" )
+                self.debug_ui.update_status(self.base_url,area_number,"Initial load fail. browser crashed" )
                 self.quit_flag = True
                 return
 
+    async def stop(self):
+        """Stop the main loop and every monitor loop, and close all section tabs."""
+        self.quit_flag = True
+        tabs = list(self.tabs.values())
+        self.tabs.clear()
+        for tab in tabs:
+            await self.proxy_manager.close_tab(tab)
+
+    async def spawn_initial_tab(self, area_number):
+        # Keeps the main loop from respawning the area while it is still waiting for its first tab
+        self.respawning_areas.append(area_number)
+        try:
+            async with self.spawn_sem:
+                await self.spawn_tab(area_number)
+        finally:
+            self.respawning_areas.remove(area_number)
+
+    def checkpoint_sections(self):
+        self.save_checkpoint(areas=list(self.prev_available_area_numbers), ga_sections=list(self.section_blacklist),
+                             section_navigation=self.section_navigation)
+
+    async def resume_known_areas(self):
+        """
+        Spawn the sections of the last checkpoint in parallel, without waiting for the event page,
+        reading the areas again or checking them for GA. The main loop then only spawns what changed since.
+        """
+        if self.initial_spawning_complete or not self.known_areas:
+            return
+        self.logger.info(f"Resuming {len(self.known_areas)} sections from checkpoint. {self.base_url}")
+        self.debug_ui.update_status(self.base_url,"main", f"Resuming {len(self.known_areas)} sections from checkpoint")
+        spawns = [
+            asyncio.create_task(self.spawn_initial_tab(area_number))
+            for area_number in self.known_areas if area_number not in self.section_blacklist
+        ]
+        asyncio.create_task(self.report_initial_loading(spawns))
+        self.prev_available_area_numbers = list(self.known_areas)
+        self.initial_spawning_complete = True
+
+    async def report_initial_loading(self, spawns: list[asyncio.Task]):
+        """Calls the initial loading callback once every section found on the first pass has been spawned."""
+        await asyncio.gather(*spawns, return_exceptions=True)
+        self.logger.info(f"Initial loading complete: {len(self.ready_areas)} sections ready. {self.base_url}")
+        self.debug_ui.update_status(self.base_url,"main", "Initial loading complete")
+        self.initial_loading_complete_callback()
+
     async def run(self):
 
-        await self.debug_ui.update_status(self.base_url,"main", "Waiting till loading finish..")
+        await self.resume_known_areas()
+        self.debug_ui.update_status(self.base_url,"main", "Waiting till loading finish..")
         await self.page.wait_for_load_state("networkidle")
 
         while not self.quit_flag:
@@ -143,53 +316,74 @@ class AreaSeatingScraper:
 
             available_areas = await get_available_area_numbers(self.page)
 
+            if SPAWN_MODE == "direct" and self.direct_spawn_failures < DIRECT_SPAWN_MAX_FAILURES:
+                section_navigation = self.section_navigation
+                try:
+                    self.section_navigation = await get_section_navigation_data(self.page, self.base_url)
+                except Exception as e:
+                    self.logger.warning(f"Couldn't read section navigation data for {self.base_url}: {e}")
+                    self.section_navigation = None
+                if self.section_navigation != section_navigation:
+                    self.checkpoint_sections()
+
             for area_number in available_areas:
                 if (area_number not in self.tabs.keys() and self.initial_spawning_complete 
                     and area_number not in self.section_blacklist and area_number not in self.respawning_areas):
                     # probably was closed due to some exception and not in section blacklist and not currently being restarted.
                     # Should restart
                     self.logger.warning(f"Respawning previously closed tab {area_number}")
-                    asyncio.create_task(self.respawn_tab(area_number))
+                    self.schedule_respawn(area_number)
                     #await self.spawn_tab(area_number)
 
             if available_areas != self.prev_available_area_numbers:
                 self.logger.info(f"{len(available_areas)} available sections found.")
-                await self.debug_ui.update_status(self.base_url,"main", f"{len(available_areas)} available sections found.")
+                self.debug_ui.update_status(self.base_url,"main", f"{len(available_areas)} available sections found.")
 
                 # if new areas were found available, only spawn new tabs for the new areas.
                 diff = list(set(available_areas) - set(self.prev_available_area_numbers))
                 self.logger.info(f"Found new areas: {diff}")
-                await self.debug_ui.update_status(self.base_url,"main", f"Found new areas: {diff}")
+                self.debug_ui.update_status(self.base_url,"main", f"Found new areas: {diff}")
 
-                for area_number in diff:
-                    asyncio.create_task(self.spawn_tab(area_number))
+                # GA sections are ruled out here instead of spawning a tab for each of them
+                for area_number in await get_ga_sections(self.page, diff):
+                    self.logger.info(f"{area_number} is a ga section. Adding to section blacklist...")
+                    self.debug_ui.update_status(self.base_url,area_number,"GA section. Adding to section blacklist" )
+                    self.section_blacklist.append(area_number)
+
+                spawns = [
+                    asyncio.create_task(self.spawn_initial_tab(area_number))
+                    for area_number in diff if area_number not in self.section_blacklist
+                ]
+                if not self.initial_spawning_complete:
+                    asyncio.create_task(self.report_initial_loading(spawns))
 
 
                 self.prev_available_area_numbers = available_areas
                 self.initial_spawning_complete = True
+                self.checkpoint_sections()
 
 
             elif not available_areas:
                 self.logger.info("No available areas. Refreshing...")
-                await self.debug_ui.update_status(self.base_url,"main", f"No available areas. Refreshing...")
+                self.debug_ui.update_status(self.base_url,"main", "No available areas. Refreshing...")
             else:
                 self.logger.info("No new available areas. Refreshing...")
-                await self.debug_ui.update_status(self.base_url,"main", f"No available areas. Refreshing...")
+                self.debug_ui.update_status(self.base_url,"main", "No available areas. Refreshing...")
 
             sleep_time = random.uniform(30, 60)
-            await self.debug_ui.update_status(self.base_url,"main", f"Sleeping for {str(sleep_time)[:5]}s...")
+            self.debug_ui.update_status(self.base_url,"main", f"Sleeping for {str(sleep_time)[:5]}s...")
             await asyncio.sleep(sleep_time)
 
             async with self.network_sem.priority(MAIN_RELOAD_PRIORITY):
                 await self.page.reload()
-                await self.debug_ui.update_status(self.base_url,"main", "Waiting till reloading finish..")
+                self.debug_ui.update_status(self.base_url,"main", "Waiting till reloading finish..")
                 await self.page.wait_for_load_state("networkidle")
         else:
             self.logger.error(f"AreaSeatingScraper quit because of critical error: {self.base_url}")
 
     async def reload_tab_and_monitor(self, area_number: str):
         while not self.quit_flag:
-            #await self.debug_ui.update_status(self.base_url,"open tabs", str(self.tabs.keys()))
+            #self.debug_ui.update_status(self.base_url,"open tabs", str(self.tabs.keys()))
             if area_number not in self.ready_areas:
                 await asyncio.sleep(1)
                 continue
@@ -212,96 +406,111 @@ class AreaSeatingScraper:
                     await wait_for_window_property(tab, 'rowSeatStatus', timeout=3000)
                 except TimeoutError:
                     # Probably an error page
-                    self.logger.warning(f"Didn't get any seat data {area_number}, {self.base_url}, {tab.url}")
+                    self.logger.warning("Didn't get any seat data. url: %s", tab.url, extra=self.log_fields(area_number))
                     if ERROR_URL in tab.url or ERROR_URL2 in tab.url:
-                        await self.debug_ui.update_status(self.base_url,area_number,f"Flowerror detected when reloading... Quitting page" )
-                        self.logger.warning(f"Flowerror detected when reloading... Quitting page {area_number}, {self.base_url}" )
+                        self.debug_ui.update_status(self.base_url,area_number,"Flowerror detected when reloading... Quitting page" )
+                        self.logger.warning("Flowerror detected when reloading... Quitting page", extra=self.log_fields(area_number))
                         await self.proxy_manager.close_tab(tab)
-                        self.tabs.pop(area_number)
+                        if self._release_area(area_number, tab):
+                            continue
+                        self.schedule_respawn(area_number)
                         return
 
                     elif area_number in self.seats_not_found_counter:
                         if await tab.locator("text=Error Code: 400").is_visible():
                             # Some types of events get code 400 when refreshing seating chart page. So we have to respawn
-                            self.logger.error(f"Error 400 in tab {area_number}")
-                            await self.debug_ui.update_status(self.base_url,area_number,f"Error code 400: Respawning" )
+                            self.logger.error("Error 400 in tab", extra=self.log_fields(area_number))
+                            self.debug_ui.update_status(self.base_url,area_number,"Error code 400: Respawning" )
                             await self.proxy_manager.close_tab(tab)
-                            if area_number in self.tabs: self.tabs.pop(area_number)
+                            if self._release_area(area_number, tab):
+                                continue
+                            self.schedule_respawn(area_number)
                             return
                         if self.seats_not_found_counter[area_number] >= 3:
                             # Didn't find the rowSeatStatus property and not in an ERROR_URL. Should restart page
-                            await self.debug_ui.update_status(self.base_url,area_number,f"Didn't find rowSeatStatus property 3 times, restarting" )
-                            self.logger.warning(f"Didn't find rowSeatStatus property 3 times, restarting. {area_number}, {self.base_url}" )
-
+                            self.debug_ui.update_status(self.base_url,area_number,"Didn't find rowSeatStatus property 3 times, restarting" )
+                            self.logger.warning("Didn't find rowSeatStatus property 3 times, restarting", extra=self.log_fields(area_number))
 
-                            content =await tab.content()
 
-                            match = re.search(r'/([\d]+)/', self.base_url)
-                            with open(f"./fails/{match.group(1)}_{area_number}.html", 'w') as file:
-                                file.write(content)
+                            if self.failure_snapshots.should_capture(self.event_key, area_number):
+                                self.failure_snapshots.capture(self.event_key, area_number, "rowSeatStatus missing",
+                                                               tab.url, await tab.content())
 
                             await self.proxy_manager.close_tab(tab)
-                            self.tabs.pop(area_number)
                             del self.seats_not_found_counter[area_number] # resetting counter
+                            if self._release_area(area_number, tab):
+                                continue
+                            self.schedule_respawn(area_number)
                             return
                         else:
                             self.seats_not_found_counter[area_number] += 1
-                            await self.debug_ui.update_status(self.base_url,area_number,f"Incrementing seats not found counter" )
-                            self.logger.warning(f"Incrementing seats not found counter, {area_number} {self.base_url}" )
+                            self.debug_ui.update_status(self.base_url,area_number,"Incrementing seats not found counter" )
+                            self.logger.warning("Incrementing seats not found counter", extra=self.log_fields(area_number))
                     else:
                         self.seats_not_found_counter[area_number] = 1
-                        await self.debug_ui.update_status(self.base_url,area_number,f"Incrementing seats not found counter" )
-                        self.logger.warning(f"Incrementing seats not found counter, {area_number} {self.base_url}" )
+                        self.debug_ui.update_status(self.base_url,area_number,"Incrementing seats not found counter" )
+                        self.logger.warning("Incrementing seats not found counter", extra=self.log_fields(area_number))
 
                     continue
+                scraped_at = time.time()
+                sequence = self.next_sequence(area_number)
                 seats = await scrape_section_data(tab, area_number)
-                self.logger.info(f"Extracted data for section {area_number}")
-                await self.debug_ui.update_status(self.base_url,area_number,"Extracted data" )
+                self.logger.info("Extracted data", extra=self.log_fields(area_number))
+                self.debug_ui.update_status(self.base_url,area_number,"Extracted data" )
                 if isinstance(seats, dict) and 'adjacentSeats' in seats.keys():
                     # event_id will be appended to payload upstream
-                    asyncio.create_task(self.data_callback({"rows":seats['adjacentSeats'], 'section': area_number}))
-                    self.logger.info(f"Sent data to backend")
-                    await self.debug_ui.update_status(self.base_url,area_number,"Sent data to backend" )
-                else: self.logger.info("Didn't find anything")
+                    asyncio.create_task(self.data_callback({"rows":seats['adjacentSeats'], 'section': area_number,
+                                                            "sequence": sequence, "scraped_at": scraped_at}))
+                    self.logger.info("Sent data to backend", extra=self.log_fields(area_number))
+                    self.debug_ui.update_status(self.base_url,area_number,"Sent data to backend" )
+                else: self.logger.info("Didn't find anything", extra=self.log_fields(area_number))
 
                 # Moving reload down here to accomodate events that are error 400 prone
-                self.logger.info(f"Reloading area {area_number} for updates..")
-                await self.debug_ui.update_status(self.base_url,area_number,"Reloading area for updates.." )
+                self.logger.info("Reloading area for updates..", extra=self.log_fields(area_number))
+                self.debug_ui.update_status(self.base_url,area_number,"Reloading area for updates.." )
                 async with self.network_sem.priority(TAB_RELOAD_PRIORITY):
                     try:
                         await tab.reload()
                     except TimeoutError:
-                        self.logger.error(f"Got timeout error in reload. Try reducing the concurrency semaphore.\n"
-                                          f"Section: {area_number}, event: {self.base_url}.")
-                        await self.debug_ui.update_status(self.base_url, area_number, f"Got timeout error in reload."
-                                                    f"Try reducing the concurrency semaphore.")
+                        self.logger.error("Got timeout error in reload. Try reducing the concurrency semaphore.",
+                                          extra=self.log_fields(area_number))
+                        self.debug_ui.update_status(self.base_url, area_number, "Got timeout error in reload."
+                                                    "Try reducing the concurrency semaphore.")
                         continue # try going for another round
             except TargetClosedError:
+                if self.tabs.get(area_number) not in (tab, None):
+                    # The tab was recycled while in use. Carry on with its replacement
+                    continue
                 if self.browser.is_connected():
                     if self.proxy_manager.check_context_status(tab):
-                        await self.debug_ui.update_status(self.base_url,area_number,f"reload fail. Page crashed" )
-                        self.logger.warning(f"Page crashed. Respawning")
-                        await self.debug_ui.update_status(self.base_url,area_number,f"Page crashed. Respawning" )
+                        self.debug_ui.update_status(self.base_url,area_number,"reload fail. Page crashed" )
+                        self.logger.warning("Page crashed. Respawning", extra=self.log_fields(area_number))
+                        self.debug_ui.update_status(self.base_url,area_number,"Page crashed. Respawning" )
                         await self.proxy_manager.close_tab(tab)
-                        if area_number in self.tabs: self.tabs.pop(area_number)
+                        self._release_area(area_number, tab)
+                        self.schedule_respawn(area_number)
                         return
                     else:
-                        await self.debug_ui.update_status(self.base_url,area_number,f"reload fail. Context crashed" )
+                        self.debug_ui.update_status(self.base_url,area_number,"reload fail. Context crashed" )
                         self.quit_flag = True
                         return
                 else:
-                    await self.debug_ui.update_status(self.base_url,area_number,f"reload fail. browser crashed" )
+                    self.debug_ui.update_status(self.base_url,area_number,"reload fail. browser crashed" )
                     self.quit_flag = True
                     return
 
             except Exception as e:
-                self.logger.error(f"Error in tab {area_number}: {e}")
-                await self.debug_ui.update_status(self.base_url,area_number,f"Error in tab {str(e)[:50]}..." )
+                if self.tabs.get(area_number) not in (tab, None):
+                    # The tab was recycled while in use. Carry on with its replacement
+                    continue
+                self.logger.error("Error in tab: %s", e, extra=self.log_fields(area_number))
+                self.debug_ui.update_status(self.base_url,area_number,f"Error in tab {str(e)[:50]}..." )
                 await self.proxy_manager.close_tab(tab)
-                if area_number in self.tabs: self.tabs.pop(area_number)
+                self._release_area(area_number, tab)
+                self.schedule_respawn(area_number)
                 return
 
-    async def seating_chart_selected(self, tab: Page):
+    async def seating_chart_selected(self, tab: Page, priority: int = INITIAL_LOADING_PRIORITY):
 
         try:
             await tab.wait_for_selector('img[usemap="#EtixOnlineManifestMap"]', timeout=3000) 
@@ -326,31 +535,32 @@ class AreaSeatingScraper:
                         for other_li in lis:
                             a = await other_li.query_selector("a:has-text('Seating Chart')")
                             if a:
-                                async with self.network_sem.priority(INITIAL_LOADING_PRIORITY):
+                                async with self.network_sem.priority(priority):
                                     await a.click()
                                     await tab.wait_for_selector('img[usemap="#EtixOnlineManifestMap"]', timeout=3000) 
                                     #await tab.wait_for_load_state('networkidle')
                                 break
                     break
 
-    async def navigate_to_seating_manifest(self, tab: Page, area_number: str):
+    async def navigate_to_seating_manifest(self, tab: Page, area_number: str, replacing: Optional[Page] = None,
+                                           priority: int = INITIAL_LOADING_PRIORITY):
         # setting up event handler to check for rate limits
 
         try:
             # Some pages don't load the manifest automatically. You need to navigate to it
-            await self.seating_chart_selected(tab)
+            await self.seating_chart_selected(tab, priority)
 
 
-            async with self.network_sem.priority(INITIAL_LOADING_PRIORITY):
+            async with self.network_sem.priority(priority):
                 await wait_for_function(tab, "isGASection")
                 if await tab.evaluate(f"isGASection('{area_number}')"):
                     #this is a general admission section
                     self.logger.info("This is a ga section. Adding to section blacklist...")
-                    await self.debug_ui.update_status(self.base_url,area_number,f"GA section. Adding to section blacklist" )
+                    self.debug_ui.update_status(self.base_url,area_number,"GA section. Adding to section blacklist" )
                     self.section_blacklist.append(area_number)
+                    self.checkpoint_sections()
                     await self.proxy_manager.close_tab(tab)
-                    if tab in self.tabs.values():
-                        self.tabs.pop(area_number)
+                    self._release_area(area_number, tab)
                     return
                 async with tab.expect_navigation() as _:
                     await wait_for_function(tab, 'chooseSection')
@@ -358,7 +568,7 @@ class AreaSeatingScraper:
 
                     await tab.evaluate(f"chooseSection('{area_number}')")
 
-                    await self.debug_ui.update_status(self.base_url,area_number,f"Chosen section" )
+                    self.debug_ui.update_status(self.base_url,area_number,"Chosen section" )
                     self.logger.info(f"Chosen section {area_number}")
 
                     # Check for CAPTCHA after selection
@@ -367,52 +577,119 @@ class AreaSeatingScraper:
 
             self.logger.info(f"Selected section {area_number}")
 
-            await self.debug_ui.update_status(self.base_url,area_number,f"Waiting till loading manifest" )
+            self.debug_ui.update_status(self.base_url,area_number,"Waiting till loading manifest" )
 
             await tab.wait_for_selector("div[id='seatingChart']")
 
-            await self.debug_ui.update_status(self.base_url,area_number,f"Manifest loaded" )
+            self.debug_ui.update_status(self.base_url,area_number,"Manifest loaded" )
             self.logger.info("Selection complete")
-            self.ready_areas.append(area_number)
-
-            # Block unnecessary resource types
-            async def route_intercept(route, request):
-                if request.resource_type in ['document']:
-                    await route.continue_()
-                else:
-                    await route.abort()
 
-            await tab.route("**/*", route_intercept)
-
-            self.initial_loading_complete_dict[area_number] = True
-            asyncio.create_task(self.reload_tab_and_monitor(area_number),name=f"reload_tab_and_monitor_{area_number}:{self.base_url}")
+            await self.start_monitoring(tab, area_number, replacing)
 
         except TargetClosedError:
             if self.browser.is_connected():
-                await self.debug_ui.update_status(self.base_url,area_number,f"Initial load fail. Browser crashed" )
+                self.debug_ui.update_status(self.base_url,area_number,"Initial load fail. Browser crashed" )
                 self.quit_flag = True
             elif self.proxy_manager.check_context_status(tab):
-                await self.debug_ui.update_status(self.base_url,area_number,f"Initial load fail. Context crashed" )
+                self.debug_ui.update_status(self.base_url,area_number,"Initial load fail. Context crashed" )
                 self.quit_flag = True
             else:
-                self.logger.warning(f"Page crashed. Respawning")
-                await self.debug_ui.update_status(self.base_url,area_number,f"Page crashed. Respawning" )
+                self.logger.warning("Page crashed. Respawning")
+                self.debug_ui.update_status(self.base_url,area_number,"Page crashed. Respawning" )
                 await self.proxy_manager.close_tab(tab)
-                if area_number in self.tabs: self.tabs.pop(area_number)
+                self._release_area(area_number, tab)
                 return
         except Exception as e:
             self.logger.error(f"Error in monitor_tab for area {area_number}: {e}")
-            await self.debug_ui.update_status(self.base_url,area_number,f"Error in monitor_tab for area {str(e)[:50]}..." )
+            self.debug_ui.update_status(self.base_url,area_number,f"Error in monitor_tab for area {str(e)[:50]}..." )
+            await self.proxy_manager.close_tab(tab)
+            self._release_area(area_number, tab)
+            return
+
+    async def navigate_directly_to_section(self, tab: Page, area_number: str,
+                                           priority: int = INITIAL_LOADING_PRIORITY) -> bool:
+        """
+        Open the section manifest in a single request by POSTing the event's manifest form,
+        like navigateSeatingChart.js does, without loading the event page first.
+        Returns False if the manifest didn't load, so the caller can fall back to the event page.
+        """
+        action = self.section_navigation["action"]
+        form_data = urlencode({**self.section_navigation["fields"], "selection": area_number})
+
+        # goto can only GET. Every navigation of this tab to the manifest url, reloads included,
+        # is sent as the form POST chooseSection would have made
+        async def post_section_form(route, request):
+            if request.resource_type == "document":
+                await route.continue_(method="POST", post_data=form_data,
+                                      headers={**request.headers, "content-type": "application/x-www-form-urlencoded"})
+            else:
+                await route.fallback()
+
+        is_manifest_url = lambda url: url == action
+        try:
+            await tab.route(is_manifest_url, post_section_form)
+            async with self.network_sem.priority(priority):
+                self.debug_ui.update_status(self.base_url,area_number,"Opening manifest directly" )
+                await tab.goto(action, referer=self.base_url)
+                try:
+                    await tab.wait_for_selector("div[id='seatingChart']", timeout=DIRECT_SPAWN_TIMEOUT)
+                except TimeoutError:
+                    if not await self.check_for_captcha(tab, area_number):
+                        raise
+                    await self.handle_captcha(tab, area_number)
+                    await tab.wait_for_selector("div[id='seatingChart']", timeout=DIRECT_SPAWN_TIMEOUT)
+
+            self.debug_ui.update_status(self.base_url,area_number,"Manifest loaded (direct)" )
+            self.logger.info(f"Opened manifest of section {area_number} directly")
+            return True
+        except TargetClosedError:
+            raise
+        except Exception as e:
+            self.logger.warning(f"Direct spawn failed for area {area_number} ({self.base_url}): {e}")
+            try:
+                await tab.unroute(is_manifest_url, post_section_form)
+            except TargetClosedError:
+                raise
+            except Exception:
+                pass
+            return False
+
+    async def start_monitoring(self, tab: Page, area_number: str, replacing: Optional[Page] = None):
+        """Hand a tab that has its section manifest loaded over to the monitor loop."""
+        if self.quit_flag:
+            # Stopped while this tab was loading
             await self.proxy_manager.close_tab(tab)
-            if tab in self.tabs.values():
-                self.tabs.pop(area_number)
+            self._release_area(area_number, tab)
             return
 
+        # Block unnecessary resource types. Documents fall through to earlier routes of the tab
+        async def route_intercept(route, request):
+            if request.resource_type in ['document']:
+                await route.fallback()
+            else:
+                await route.abort()
+
+        await tab.route("**/*", route_intercept)
+        self.proxy_manager.register_recycle_handler(tab, lambda: self.recycle_tab(area_number))
+
+        if replacing is not None:
+            monitor_running = area_number in self.tabs
+            self.tabs[area_number] = tab
+            await self.proxy_manager.close_tab(replacing)
+            self.debug_ui.update_status(self.base_url,area_number,"Tab recycled" )
+            if monitor_running:
+                # The running monitor loop picks up the fresh tab on its next pass
+                return
+
+        self.ready_areas.append(area_number)
+        self.initial_loading_complete_dict[area_number] = True
+        asyncio.create_task(self.reload_tab_and_monitor(area_number),name=f"reload_tab_and_monitor_{area_number}:{self.base_url}")
+
     async def handle_captcha(self, tab: Page, area_number: str):
         """Handle CAPTCHA detection and wait for resolution"""
 
         self.logger.warning(f"CAPTCHA detected! Pausing operations in {area_number}")
-        await self.debug_ui.update_status(self.base_url,area_number,f"CAPTCHA detected! Pausing operations." )
+        self.debug_ui.update_status(self.base_url,area_number,"CAPTCHA detected! Pausing operations." )
 
         try:
             # waiting for the main captcha body to show up
@@ -423,7 +700,7 @@ class AreaSeatingScraper:
                 #await asyncio.sleep(30)
                 async with Capsolver(getenv("CAPSOLVER_API_KEY")) as capsolver:
                     self.logger.info("Trying to solve captcha..")
-                    await self.debug_ui.update_status(self.base_url,area_number,f"Trying to solve captcha.." )
+                    self.debug_ui.update_status(self.base_url,area_number,"Trying to solve captcha.." )
                     try:
                         # need to solve captcha within 2 minutes. Otherwise it is an illegal solve
                         solution = await asyncio.wait_for(
@@ -440,16 +717,16 @@ class AreaSeatingScraper:
                                 await tab.evaluate(
                                     f"solution => {results[0]['callback']}(solution)", solution)
 
-                            self.logger.info(f"Solved captcha!")
-                            await self.debug_ui.update_status(self.base_url,area_number,f"Solved captcha!" )
+                            self.logger.info("Solved captcha!")
+                            self.debug_ui.update_status(self.base_url,area_number,"Solved captcha!" )
                         else:
                             self.logger.info("Failed to solve captcha")
-                            await self.debug_ui.update_status(self.base_url,area_number,f"Failed to solve captcha" )
+                            self.debug_ui.update_status(self.base_url,area_number,"Failed to solve captcha" )
                     
                     except asyncio.TimeoutError:
-                        self.debug_ui.update_status(self.base_url, area_number, f"Failed to solve captcha within 2 minutes.."
-                                                    f" Closing tab and respawning.")
-                        self.logger.info(f"Failed to solve captcha within 2 minutes.."
+                        self.debug_ui.update_status(self.base_url, area_number, "Failed to solve captcha within 2 minutes.."
+                                                    " Closing tab and respawning.")
+                        self.logger.info("Failed to solve captcha within 2 minutes.."
                                                     f" Closing tab and respawning. area: {area_number}")
 
                         await self.proxy_manager.close_tab(tab)
@@ -461,10 +738,10 @@ class AreaSeatingScraper:
                 await tab.wait_for_selector('div#seatingChart')
 
                 self.logger.info("CAPTCHA appears to be resolved")
-                await self.debug_ui.update_status(self.base_url,area_number,f"CAPTCHA appears to be resolved" )
+                self.debug_ui.update_status(self.base_url,area_number,"CAPTCHA appears to be resolved" )
             except Exception as e:
                 self.logger.error(f"Error waiting for CAPTCHA resolution: {e}. \n Clearing tab {area_number}..")
-                await self.debug_ui.update_status(self.base_url,area_number,f"Error waiting for CAPTCHA resolution: {e}. \n Clearing tab.." )
+                self.debug_ui.update_status(self.base_url,area_number,f"Error waiting for CAPTCHA resolution: {e}. \n Clearing tab.." )
                 if ERROR_URL in tab.url or ERROR_URL2 in tab.url:
                     self.logger.error(f"URL: {tab.url}")
                 await self.proxy_manager.close_tab(tab)
@@ -472,34 +749,34 @@ class AreaSeatingScraper:
                     self.tabs.pop(area_number)
             finally:
                 self.logger.info("Resuming operations..")
-                await self.debug_ui.update_status(self.base_url,area_number,f"Resuming operations.." )
+                self.debug_ui.update_status(self.base_url,area_number,"Resuming operations.." )
         except TimeoutError:
             self.logger.info(f"Captcha wasn't fully launched. Resuming operations on {area_number}")
-            await self.debug_ui.update_status(self.base_url,area_number,f"Captcha wasn't fully launched. Resuming operations" )
+            self.debug_ui.update_status(self.base_url,area_number,"Captcha wasn't fully launched. Resuming operations" )
 
     async def check_for_captcha(self, page: Page, area_number: str) -> bool:
         """Check if a CAPTCHA is present on the page"""
 
-        self.logger.info(f"Checking for captcha in {area_number}")
-        await self.debug_ui.update_status(self.base_url,area_number,f"Checking for captcha" )
+        self.logger.info("Checking for captcha", extra=self.log_fields(area_number))
+        self.debug_ui.update_status(self.base_url,area_number,"Checking for captcha" )
         try:
             element = await page.wait_for_selector('iframe[src*="recaptcha.net"]',timeout=5000, state="attached")
             if element:
-                self.logger.info(f"Found captcha in {area_number}")
-                await self.debug_ui.update_status(self.base_url,area_number,f"Found captcha" )
+                self.logger.info("Found captcha", extra=self.log_fields(area_number))
+                self.debug_ui.update_status(self.base_url,area_number,"Found captcha" )
                 return True
             else:
-                self.logger.info(f"No captcha found in area {area_number}")
-                await self.debug_ui.update_status(self.base_url,area_number,f"No captcha found" )
+                self.logger.info("No captcha found", extra=self.log_fields(area_number))
+                self.debug_ui.update_status(self.base_url,area_number,"No captcha found" )
             return False
         except TimeoutError:
-            self.logger.info("Recaptcha check timed out. Seems to be no captcha")
-            await self.debug_ui.update_status(self.base_url,area_number,f"Recaptcha check timed out. Seems to be no captcha" )
+            self.logger.info("Recaptcha check timed out. Seems to be no captcha", extra=self.log_fields(area_number))
+            self.debug_ui.update_status(self.base_url,area_number,"Recaptcha check timed out. Seems to be no captcha" )
             return False
         except TargetClosedError:
             # pass on TargetClosedError to top level error handlers
             raise TargetClosedError
         except Exception as e:
-            self.logger.error(f"Error checking for CAPTCHA: {e}")
-            await self.debug_ui.update_status(self.base_url,area_number,f"Error checking for CAPTCHA: {str(e)[:50]}..." )
+            self.logger.error("Error checking for CAPTCHA: %s", e, extra=self.log_fields(area_number))
+            self.debug_ui.update_status(self.base_url,area_number,f"Error checking for CAPTCHA: {str(e)[:50]}..." )
             return False
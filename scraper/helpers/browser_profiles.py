@@ -0,0 +1,95 @@
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from dotenv import load_dotenv
+from playwright.async_api import Request, Route
+
+load_dotenv(override=True)
+
+# Requests to this prefix mean the event page shows its manifest map. Changed for local test sites
+MANIFEST_IMAGE_PREFIX = getenv("MANIFEST_IMAGE_PREFIX", "https://cdn.etix.com/etix/viewable_chart/")
+
+# Resource types needed to render the event page, find the manifest map and run isGASection / chooseSection
+LEAN_ALLOWED_RESOURCE_TYPES = {"document", "script", "xhr", "fetch"}
+
+# Scripts that are never needed to find or select a section
+LEAN_BLOCKED_HOSTS = (
+    "google-analytics.com",
+    "googletagmanager.com",
+    "doubleclick.net",
+    "facebook.net",
+    "facebook.com",
+    "hotjar.com",
+    "newrelic.com",
+    "nr-data.net",
+    "clarity.ms",
+    "tiktok.com",
+)
+
+LEAN_LAUNCH_ARGS = [
+    "--disable-gpu",
+    "--disable-dev-shm-usage",
+    "--disable-extensions",
+    "--disable-background-networking",
+    "--disable-component-update",
+    "--disable-default-apps",
+    "--disable-sync",
+    "--no-first-run",
+    "--mute-audio",
+    "--disable-breakpad",
+    "--disable-client-side-phishing-detection",
+    "--disable-software-rasterizer",
+    "--disable-features=Translate,MediaRouter,OptimizationHints,InterestFeedContentSuggestions,AutofillServerCommunication",
+]
+
+LEAN_CONTEXT_OPTIONS = {
+    "viewport": {"width": 1024, "height": 768},
+    "device_scale_factor": 1,
+    "service_workers": "block",
+    "reduced_motion": "reduce",
+}
+
+
+async def lean_route_intercept(route: Route, request: Request):
+    """
+    Allowlist router used from the very first request of a context. Keeps documents, scripts
+    and api calls, plus the manifest image the map is detected with.
+    """
+    url = request.url
+    if url.startswith(MANIFEST_IMAGE_PREFIX):
+        await route.continue_()
+    elif request.resource_type not in LEAN_ALLOWED_RESOURCE_TYPES:
+        await route.abort()
+    elif any(host in url for host in LEAN_BLOCKED_HOSTS):
+        await route.abort()
+    else:
+        await route.continue_()
+
+
+@dataclass
+class BrowserProfile:
+    name: str
+    launch_args: List[str] = field(default_factory=list)
+    context_options: Dict[str, Any] = field(default_factory=dict)
+    # Installed on every context, so it also applies to the first navigation of each tab
+    route_handler: Optional[Callable[[Route, Request], Awaitable[None]]] = None
+
+
+BROWSER_PROFILES = {
+    "default": BrowserProfile(name="default"),
+    "lean": BrowserProfile(
+        name="lean",
+        launch_args=LEAN_LAUNCH_ARGS,
+        context_options=LEAN_CONTEXT_OPTIONS,
+        route_handler=lean_route_intercept,
+    ),
+}
+
+
+def get_browser_profile(name: Optional[str] = None) -> BrowserProfile:
+    """Profile selected by name, or by the BROWSER_PROFILE environment variable."""
+    name = name or getenv("BROWSER_PROFILE", "default")
+    if name not in BROWSER_PROFILES:
+        raise ValueError(f"Unknown browser profile {name}. Choose one of {list(BROWSER_PROFILES)}")
+    return BROWSER_PROFILES[name]
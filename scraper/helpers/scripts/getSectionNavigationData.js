@@ -0,0 +1,24 @@
+performanceId => {
+    // Collects what navigateSeatingChart.js submits to open a section manifest, so a new tab
+    // can POST straight to showManifest without loading the event page first.
+    const existingForm = document.getElementById('imageMapfrm');
+
+    if (existingForm) {
+        const fields = {};
+        for (const element of existingForm.elements) {
+            if (!element.name || element.type === 'submit' || element.type === 'button') continue;
+            fields[element.name] = element.value;
+        }
+        return { action: existingForm.action, fields: fields };
+    }
+
+    // Same defaults navigateSeatingChart.js uses when the page has no imageMapfrm
+    const pathId = window.location.pathname.split('/')[3];
+    return {
+        action: new URL('/ticket/mvc/legacyOnlineSale/performance/sale/showManifest', window.location.origin).href,
+        fields: {
+            performance_id: /^\d+$/.test(pathId || '') ? pathId : performanceId,
+            current_selection_method: 'byManifest'
+        }
+    };
+}
@@ -0,0 +1,132 @@
+import asyncio
+import statistics
+import time
+from os import getenv
+from typing import TYPE_CHECKING, Dict, Optional
+
+from dotenv import load_dotenv
+from playwright.async_api import Browser, CDPSession
+
+from utils.logger import setup_logger
+
+if TYPE_CHECKING:
+    from scraper.managers.browser_manager import BrowserManager
+
+load_dotenv(override=True)
+
+AUTOSCALE = getenv("AUTOSCALE", "False") == "True"
+MIN_BROWSERS = int(getenv("MIN_BROWSERS", 1))
+AUTOSCALE_INTERVAL = float(getenv("AUTOSCALE_INTERVAL", 30))
+# No scaling action within this many seconds of the previous one, so new browsers can settle first
+AUTOSCALE_COOLDOWN = float(getenv("AUTOSCALE_COOLDOWN", 300))
+
+# Scale out when any of these is crossed
+MAX_TABS_PER_BROWSER = int(getenv("MAX_TABS_PER_BROWSER", 150))
+MAX_CDP_LATENCY = float(getenv("MAX_CDP_LATENCY", 1.5))  # seconds, median over browsers
+MAX_CRASHES_PER_BROWSER = int(getenv("MAX_CRASHES_PER_BROWSER", 5))  # renderer crashes per window
+CRASH_WINDOW = 600
+
+# Scale in when the remaining browsers would stay under this share of MAX_TABS_PER_BROWSER
+SCALE_IN_TAB_RATIO = 0.5
+# Longest time a retiring browser keeps its events while their new browsers load them
+RETIRE_TIMEOUT = 600
+
+
+class BrowserAutoscaler:
+    def __init__(self, manager: "BrowserManager"):
+        """
+        Adds a browser when tabs per browser, CDP latency or renderer crashes cross their
+        thresholds, and retires the least loaded browser when the others can take over its
+        events comfortably. Retired browsers are drained: their events are started elsewhere
+        and only stopped once they have loaded there.
+        """
+        self.manager = manager
+        self.cdp_sessions: Dict[Browser, CDPSession] = {}
+        self.last_action = time.monotonic()
+
+        self.logger = setup_logger("BrowserAutoscaler", logfile='./logs/browser_manager.log')
+        self.logger.propagate = False
+
+    async def _cdp_latency(self, browser: Browser) -> Optional[float]:
+        """Round trip of a trivial CDP command. Grows when chromium or the event loop is overloaded."""
+        try:
+            if browser not in self.cdp_sessions:
+                self.cdp_sessions[browser] = await browser.new_browser_cdp_session()
+            started = time.perf_counter()
+            await asyncio.wait_for(self.cdp_sessions[browser].send("Browser.getVersion"), timeout=30)
+            return time.perf_counter() - started
+        except Exception as e:
+            self.logger.warning(f"CDP latency probe failed: {e}")
+            self.cdp_sessions.pop(browser, None)
+            return None
+
+    async def measure(self) -> dict:
+        browsers = [b for b in self.manager.active_browsers if not b.retiring and b.proxy_manager]
+        now = time.monotonic()
+        latencies = await asyncio.gather(*(self._cdp_latency(b.browser) for b in browsers))
+        tabs = {b.slot: b.proxy_manager.total_tabs for b in browsers}
+        crashes = {
+            b.slot: sum(1 for crashed_at in b.proxy_manager.crash_times if now - crashed_at < CRASH_WINDOW)
+            for b in browsers
+        }
+        known_latencies = [latency for latency in latencies if latency is not None]
+        # Forget sessions of browsers that are gone
+        alive = {b.browser for b in self.manager.active_browsers}
+        for browser in list(self.cdp_sessions):
+            if browser not in alive:
+                self.cdp_sessions.pop(browser)
+
+        return {
+            "browsers": len(browsers),
+            "tabs": tabs,
+            "total_tabs": sum(tabs.values()),
+            "cdp_latency": statistics.median(known_latencies) if known_latencies else None,
+            "crashes": crashes,
+        }
+
+    def _scale_out_reason(self, metrics: dict) -> Optional[str]:
+        if metrics["browsers"] and metrics["total_tabs"] / metrics["browsers"] > MAX_TABS_PER_BROWSER:
+            return f"{metrics['total_tabs'] / metrics['browsers']:.0f} tabs per browser"
+        if metrics["cdp_latency"] is not None and metrics["cdp_latency"] > MAX_CDP_LATENCY:
+            return f"CDP latency {metrics['cdp_latency']:.2f}s"
+        crashing = [slot for slot, crashes in metrics["crashes"].items() if crashes > MAX_CRASHES_PER_BROWSER]
+        if crashing:
+            return f"renderer crashes on {crashing}"
+        return None
+
+    def _can_scale_in(self, metrics: dict) -> bool:
+        if metrics["browsers"] <= MIN_BROWSERS:
+            return False
+        if metrics["cdp_latency"] is not None and metrics["cdp_latency"] > MAX_CDP_LATENCY / 2:
+            return False
+        if any(metrics["crashes"].values()):
+            return False
+        return metrics["total_tabs"] / (metrics["browsers"] - 1) < MAX_TABS_PER_BROWSER * SCALE_IN_TAB_RATIO
+
+    async def tick(self):
+        metrics = await self.measure()
+        self.logger.info(f"Load: {metrics}")
+        if time.monotonic() - self.last_action < AUTOSCALE_COOLDOWN:
+            return
+
+        reason = self._scale_out_reason(metrics)
+        if reason:
+            if metrics["browsers"] >= self.manager.max_browsers:
+                self.logger.warning(f"Overloaded ({reason}) but already at {self.manager.max_browsers} browsers")
+                return
+            self.logger.info(f"Adding a browser: {reason}")
+            self.last_action = time.monotonic()
+            await self.manager.add_browser()
+        elif self._can_scale_in(metrics):
+            least_loaded = min(metrics["tabs"], key=metrics["tabs"].get)
+            self.logger.info(f"Retiring {least_loaded}: {metrics['total_tabs']} tabs fit on fewer browsers")
+            self.last_action = time.monotonic()
+            await self.manager.retire_browser(self.manager.browsers_by_slot[least_loaded])
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(AUTOSCALE_INTERVAL)
+            try:
+                await self.tick()
+            except Exception as e:
+                self.logger.error(f"Autoscaler tick failed: {e}")
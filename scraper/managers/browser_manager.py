@@ -1,17 +1,76 @@
 import asyncio
 import re
-from dataclasses import dataclass
-from typing import List, Dict, Callable, Optional
+import time
+from dataclasses import dataclass, field
+from os import getenv
+from typing import List, Dict, Optional
 import logging
+from dotenv import load_dotenv
 from playwright.async_api import async_playwright, Browser, Playwright
-from scraper.managers.event_manager import EventManager
-from utils.debug_ui import DebugUI
+from scraper.area_seating_scraper import SECTION_SPAWN_CONCURRENCY
+from scraper.managers.event_manager import EventManager, EVENT_LANDING_CONCURRENCY
+from utils.checkpoint_store import CHECKPOINTS, CheckpointStore
+from utils.headless_ui import HeadlessUI
 from utils.logger import setup_logger
 from utils.priority_semaphore import PrioritySemaphore
+from utils.startup_report import StartupReport
 from scraper.managers.proxy_manager import ProxyManager
+from scraper.managers.memory_watchdog import MemoryWatchdog
+from scraper.managers.sharding import ConsistentHashRing
+from scraper.managers.autoscaler import AUTOSCALE, RETIRE_TIMEOUT, BrowserAutoscaler
+from scraper.managers.lease_client import EVENT_SOURCE, LEASE_RENEW_INTERVAL, LeaseClient
+from scraper.managers.proxy_prober import DIRECT_PROXY
+from scraper.helpers.browser_profiles import get_browser_profile
 
+load_dotenv(override=True)
 
 HEADLESS_MODE = True
+# The textual debug ui. Disable it on servers, Textual isn't even imported then
+DEBUG_UI = getenv("DEBUG_UI", "True") == "True"
+BROWSER_LAUNCH_CONCURRENCY = int(getenv("BROWSER_LAUNCH_CONCURRENCY", 3))
+# Expected number of tabs of an event whose sections haven't been counted yet
+DEFAULT_EVENT_WEIGHT = 20
+# How often events are rebalanced as their real section counts become known (seconds)
+REBALANCE_INTERVAL = float(getenv("REBALANCE_INTERVAL", 600))
+# Events claimed from the backend when EVENT_SOURCE=lease. 0 uses max_browsers * events_per_browser
+LEASE_CAPACITY = int(getenv("LEASE_CAPACITY", 0))
+# Connect without proxies instead of reading proxy_list, e.g. for a local test site
+DIRECT_CONNECTION = getenv("DIRECT_CONNECTION", "False") == "True"
+
+
+def read_proxy_list(path: str = "proxy_list") -> List[Dict[str, str]]:
+    if DIRECT_CONNECTION:
+        return [dict(DIRECT_PROXY)]
+    proxies = []
+    with open(path) as proxy_list:
+        for proxy in proxy_list.readlines():
+            pattern = r"(\d.+):(\w+):(\w+)"
+            matches = re.search(pattern, proxy)
+            proxies.append({
+                "server": f'http://{matches.group(1)}',
+                "username": matches.group(2),
+                "password": matches.group(3)
+            })
+    return proxies
+
+
+def read_event_list(path: str = "event_list") -> Dict[str, str]:
+    """Event url -> webhook url. Lines without a webhook are skipped."""
+    events = {}
+    with open(path) as event_list:
+        for line in event_list:
+            event, webhook_url = line.strip().split("@")
+            if webhook_url:
+                events[event] = webhook_url
+    return events
+
+
+def create_debug_ui():
+    if not DEBUG_UI:
+        return HeadlessUI()
+    from utils.debug_ui import DebugUI
+    return DebugUI()
+
 @dataclass
 class BrowserInstance:
     playwright_instance: Playwright
@@ -20,27 +79,75 @@ class BrowserInstance:
     tasks: List[asyncio.Task]
     event_urls: dict[str, str]
     proxies: List[str]
+    # Position of the browser on the hash rings. A respawned browser takes over the slot of the dead one
+    slot: str = ""
+    event_managers: Dict[str, EventManager] = field(default_factory=dict)
+    event_tasks: Dict[str, asyncio.Task] = field(default_factory=dict)
+    loaded_events: set[str] = field(default_factory=set)
+    # Being drained by the autoscaler. Closed once its events run elsewhere
+    retiring: bool = False
 
 class BrowserManager:
-    def __init__(self, max_browsers: int = 3, events_per_browser: int = 5):
+    def __init__(self, max_browsers: int = 3, events_per_browser: int = 5,
+                 events: Optional[Dict[str, str]] = None, proxies: Optional[List[Dict[str, str]]] = None,
+                 debug_ui=None, scraper_id: Optional[str] = None):
+        """
+        Args:
+            max_browsers: Upper bound on browsers launched
+            events_per_browser: Used to work out how many browsers the events need
+            events: Event url -> webhook url to scrape. Read from event_list when not given
+            proxies: Proxies to use. Read from proxy_list when not given
+            debug_ui: UI to report to. Defaults to the one selected by DEBUG_UI
+            scraper_id: Name used for event leases when EVENT_SOURCE=lease
+        """
         self.max_browsers = max_browsers
         self.events_per_browser = events_per_browser
         self.active_browsers: List[BrowserInstance] = []
-        self.all_events: dict[str, str] = {}
-        self.all_proxies: List[str] = []
+        self.all_events: dict[str, str] = dict(events) if events is not None else {}
+        self.all_proxies: List[str] = list(proxies) if proxies is not None else []
+        self.events_given = events is not None
+        self.proxies_given = proxies is not None
+        # Events are leased from the backend instead of read from event_list
+        self.lease_client = LeaseClient(scraper_id) if EVENT_SOURCE == "lease" and events is None else None
         self.logger = setup_logger("BrowserManager", logfile='./logs/browser_manager.log')
         self.network_sem = PrioritySemaphore(8)
-        self.debug_ui = DebugUI()
+        self.debug_ui = debug_ui or create_debug_ui()
         self.loading_lock = asyncio.Semaphore(1)
         self.num_browsers: int = 0 
         self.playwright = None
+        self.browser_profile = get_browser_profile()
+        self.startup_report = StartupReport()
+        # Each startup stage gets its own bound, so later stages start as soon as the first items are through
+        self.launch_sem = asyncio.Semaphore(BROWSER_LAUNCH_CONCURRENCY)
+        self.landing_sem = asyncio.Semaphore(EVENT_LANDING_CONCURRENCY)
+        self.spawn_sem = asyncio.Semaphore(SECTION_SPAWN_CONCURRENCY)
+        self.checkpoint_store = CheckpointStore() if CHECKPOINTS else None
+        # Events and proxies are sharded over browser slots with consistent hashing, so a browser
+        # joining or leaving only moves the events and proxies it gains or loses
+        self.event_ring = ConsistentHashRing()
+        self.proxy_ring = ConsistentHashRing()
+        self.event_owner: Dict[str, str] = {}
+        self.proxy_owner: Dict[tuple, str] = {}
+        self.event_weights: Dict[str, float] = {}
+        self.browsers_by_slot: Dict[str, BrowserInstance] = {}
+        self.slot_counter = 0
+        self.autoscaler = BrowserAutoscaler(self)
+        self.memory_watchdog = MemoryWatchdog(
+            lambda: [(b.browser, b.proxy_manager) for b in self.active_browsers]
+        )
 
     async def initialize(self):
         # Load proxies and event URLs
-        await self._load_proxies()
-        await self._load_event_urls()
+        if not self.proxies_given:
+            await self._load_proxies()
+        if self.lease_client:
+            self.all_events.update(await self.lease_client.claim(self.event_capacity))
+        elif not self.events_given:
+            await self._load_event_urls()
+        self.startup_report.expect_events(self.all_events.keys())
         self.playwright = await async_playwright().start()
         asyncio.create_task(self.debug_ui.run_async())
+        asyncio.create_task(self.memory_watchdog.run())
         
         # Calculate how many browsers we actually need
         num_browsers = min(
@@ -49,38 +156,183 @@ class BrowserManager:
         )
         self.num_browsers = num_browsers
         
-        # Start all browsers and distribute events immediately
-        for _ in range(num_browsers):
-            browser = await self._spawn_browser()
-            if browser:
-                await self._dispatch_events_to_browser(browser)
-        
+        slots = [self._new_slot() for _ in range(num_browsers)]
+        self._plan()
+
+        # Start all browsers in parallel. Each one gets its events as soon as it is up
+        launched = await asyncio.gather(*(self._launch_slot(slot) for slot in slots))
+        if not all(launched):
+            for slot, browser_instance in zip(slots, launched):
+                if browser_instance is None:
+                    self._remove_slot(slot)
+            await self.rebalance()
+        asyncio.create_task(self._rebalance_loop())
+        if AUTOSCALE:
+            asyncio.create_task(self.autoscaler.run())
+        if self.lease_client:
+            asyncio.create_task(self._lease_loop())
+
+    def _new_slot(self) -> str:
+        slot = f"browser-{self.slot_counter}"
+        self.slot_counter += 1
+        self.event_ring.add_node(slot)
+        self.proxy_ring.add_node(slot)
+        return slot
+
+    def _remove_slot(self, slot: str):
+        self.event_ring.remove_node(slot)
+        self.proxy_ring.remove_node(slot)
+        self.browsers_by_slot.pop(slot, None)
+
+    async def _launch_slot(self, slot: str) -> Optional[BrowserInstance]:
+        try:
+            browser_instance = await self._spawn_browser(slot)
+        except Exception as e:
+            self.logger.error(f"Couldn't launch browser for {slot}: {e}")
+            browser_instance = None
+        if browser_instance:
+            self.startup_report.browser_ready()
+            self._dispatch_events_to_browser(browser_instance)
+        return browser_instance
+
+    @staticmethod
+    def _proxy_key(proxy: Dict[str, str]) -> tuple:
+        return (proxy["server"], proxy.get("username"), proxy.get("password"))
+
+    def _event_weight(self, event_url: str) -> float:
+        """Expected tabs of an event: its sections plus the event page, once it has been read."""
+        for browser_instance in self.active_browsers:
+            manager = browser_instance.event_managers.get(event_url)
+            if manager and manager.section_count:
+                self.event_weights[event_url] = manager.section_count + 1
+        return self.event_weights.get(event_url, DEFAULT_EVENT_WEIGHT)
+
+    def _plan(self):
+        """Work out which slot owns which events and proxies. Current owners are kept wherever possible."""
+        event_weights = {event_url: self._event_weight(event_url) for event_url in self.all_events}
+        event_plan = self.event_ring.assign(event_weights, self.event_owner)
+        self.event_owner = {event_url: slot for slot, event_urls in event_plan.items() for event_url in event_urls}
+
+        proxy_plan = self.proxy_ring.assign({self._proxy_key(proxy): 1 for proxy in self.all_proxies}, self.proxy_owner)
+        self.proxy_owner = {proxy_key: slot for slot, proxy_keys in proxy_plan.items() for proxy_key in proxy_keys}
+
+    async def rebalance(self):
+        """Recompute the assignment with the latest section counts and move what has to move."""
+        self._plan()
+        for browser_instance in list(self.active_browsers):
+            if not browser_instance.retiring:
+                self._dispatch_events_to_browser(browser_instance)
+
+    async def _rebalance_loop(self):
+        while True:
+            await asyncio.sleep(REBALANCE_INTERVAL)
+            await self.rebalance()
+
+    @property
+    def event_capacity(self) -> int:
+        return LEASE_CAPACITY or self.max_browsers * (self.events_per_browser or 1)
+
+    async def _lease_loop(self):
+        """Keep leases alive, let go of events taken over by another scraper and claim more while there is room."""
+        while True:
+            await asyncio.sleep(LEASE_RENEW_INTERVAL)
+            lost, reachable = await self.lease_client.renew()
+            for event_url in lost:
+                self.logger.warning(f"Lost lease on {event_url}. Stopping it")
+                await self.remove_event(event_url)
+
+            if reachable:
+                claimed = await self.lease_client.claim(self.event_capacity - len(self.all_events))
+                if claimed:
+                    self.logger.info(f"Claimed {len(claimed)} more events")
+                    self.all_events.update(claimed)
+                    self.startup_report.expect_events(claimed.keys())
+                    await self.rebalance()
+
+    async def retire_browser(self, browser_instance: BrowserInstance):
+        """
+        Drain a browser and close it. Its events and proxies move to the other browsers first,
+        and it keeps scraping each event until the new browser has loaded it.
+        """
+        if browser_instance.retiring:
+            return
+        browser_instance.retiring = True
+        self._remove_slot(browser_instance.slot)
+        await self.rebalance()
+        asyncio.create_task(self._close_when_drained(browser_instance))
+
+    async def _close_when_drained(self, browser_instance: BrowserInstance):
+        deadline = time.monotonic() + RETIRE_TIMEOUT
+        while browser_instance.event_managers and time.monotonic() < deadline:
+            await asyncio.sleep(5)
+
+        for event_url in list(browser_instance.event_managers):
+            self.logger.warning(f"{event_url} didn't finish moving off {browser_instance.slot} in time. Stopping it anyway")
+            await self._stop_event(browser_instance, event_url)
+        for task in browser_instance.tasks:
+            task.cancel()
+        if browser_instance.proxy_manager:
+            browser_instance.proxy_manager.close()
+        if browser_instance in self.active_browsers:
+            self.active_browsers.remove(browser_instance)
+        self.logger.info(f"Closing retired browser {browser_instance.slot}")
+        try:
+            await browser_instance.browser.close()
+        except Exception as e:
+            self.logger.warning(f"Error while closing {browser_instance.slot}: {e}")
+
+    async def remove_event(self, event_url: str):
+        """Stop scraping an event everywhere."""
+        self.all_events.pop(event_url, None)
+        self.event_owner.pop(event_url, None)
+        self.startup_report.forget_event(event_url)
+        for browser_instance in list(self.active_browsers):
+            browser_instance.event_urls.pop(event_url, None)
+            if event_url in browser_instance.event_managers:
+                await self._stop_event(browser_instance, event_url)
+
+    async def shutdown(self):
+        """Hand leased events back, so other scrapers can take them over right away."""
+        if self.lease_client:
+            await self.lease_client.release()
+
+    async def add_browser(self) -> Optional[BrowserInstance]:
+        """Launch one more browser and move its share of events and proxies over to it."""
+        slot = self._new_slot()
+        self._plan()
+        browser_instance = await self._launch_slot(slot)
+        if browser_instance is None:
+            self._remove_slot(slot)
+        await self.rebalance()
+        return browser_instance
+
     async def _load_proxies(self):
-        with open("proxy_list") as proxy_list:
-            proxies = proxy_list.readlines()
-            for proxy in proxies:
-                pattern = r"(\d.+):(\w+):(\w+)"
-                matches = re.search(pattern, proxy)
-                self.all_proxies.append({
-                    "server": f'http://{matches.group(1)}',
-                    "username": matches.group(2),
-                    "password": matches.group(3)
-                })
+        self.all_proxies.extend(read_proxy_list())
     
     async def _load_event_urls(self):
-        with open("event_list") as event_list:
-            for line in event_list:
-                event, webhook_url = line.strip().split("@")
-                if webhook_url:
-                    self.all_events[event] = webhook_url
+        self.all_events.update(read_event_list())
+
+    def status(self) -> dict:
+        """Summary of what this manager is running, used for heartbeats and aggregated status."""
+        return {
+            "browsers": len(self.active_browsers),
+            "events": sum(len(b.event_managers) for b in self.active_browsers),
+            "events_loaded": sum(len(b.loaded_events) for b in self.active_browsers),
+            "sections": sum(
+                manager.section_count for b in self.active_browsers for manager in b.event_managers.values()
+            ),
+            "tabs": sum(b.proxy_manager.total_tabs for b in self.active_browsers if b.proxy_manager),
+            "startup": self.startup_report.summary(),
+        }
     
-    async def _spawn_browser(self) -> BrowserInstance:
-        if len(self.active_browsers) >= self.max_browsers:
+    async def _spawn_browser(self, slot: str) -> BrowserInstance:
+        if len([b for b in self.active_browsers if not b.retiring]) >= self.max_browsers:
             self.logger.warning("Max browsers reached, not spawning new one")
             return None
             
-        self.logger.info("Launching new browser...")
-        browser = await self.playwright.chromium.launch(headless=HEADLESS_MODE)
+        self.logger.info(f"Launching new browser for {slot} with the {self.browser_profile.name} profile...")
+        async with self.launch_sem:
+            browser = await self.playwright.chromium.launch(headless=HEADLESS_MODE, args=self.browser_profile.launch_args)
         
         # proxy manager is setup later when dispatching events 
 
@@ -90,99 +342,130 @@ class BrowserManager:
             browser=browser,
             proxy_manager=None,
             tasks=[],
-            event_urls=[],
-            proxies=[]
+            event_urls={},
+            proxies=[],
+            slot=slot,
         )
         
         # Setup disconnect handler
         browser.on("disconnected", lambda: self._handle_browser_disconnect(browser_instance))
         
         self.active_browsers.append(browser_instance)
+        self.browsers_by_slot[slot] = browser_instance
         return browser_instance
     
     def _handle_browser_disconnect(self, browser_instance: BrowserInstance):
-        self.logger.error(f"Browser disconnected with {browser_instance.event_urls} events\n respawning...")
+        if browser_instance.retiring:
+            # Closed on purpose by the autoscaler
+            if browser_instance in self.active_browsers:
+                self.active_browsers.remove(browser_instance)
+            return
+
+        self.logger.error(f"Browser {browser_instance.slot} disconnected with {list(browser_instance.event_urls)} events\n respawning...")
         
         # Remove from active browsers
-        self.active_browsers.remove(browser_instance)
+        if browser_instance in self.active_browsers:
+            self.active_browsers.remove(browser_instance)
+        if self.browsers_by_slot.get(browser_instance.slot) is browser_instance:
+            self.browsers_by_slot.pop(browser_instance.slot)
         
         # Cancel all ongoing tasks for this browser
         for task in browser_instance.tasks:
             task.cancel()
+        if browser_instance.proxy_manager:
+            browser_instance.proxy_manager.close()
         
-        # Respawn with the same event URLs
-        asyncio.create_task(self._respawn_browser(browser_instance.event_urls, browser_instance.proxies))
+        # Respawn in the same slot, so the same events and proxies come back up and nothing else moves
+        asyncio.create_task(self._respawn_browser(browser_instance.slot))
     
-    async def _respawn_browser(self, event_urls: List[str], proxies: List[str]):
-        new_browser = await self._spawn_browser() # new browser doesn't come with event_urls
+    async def _respawn_browser(self, slot: str):
+        new_browser = await self._launch_slot(slot)
         if new_browser:
-            new_browser.event_urls = event_urls
-            await self._dispatch_events_to_browser(new_browser, event_urls, proxies)
-        self.logger.info(f"Browser respawned with events {event_urls}")
-    
-    async def _dispatch_events_to_browser(self, browser_instance: BrowserInstance, event_urls: dict[str, str] = {}, proxies: List[str] = []):
-        if not self.all_events.keys() and not event_urls:
+            self.logger.info(f"Browser {slot} respawned with events {list(new_browser.event_urls)}")
             return
-            
-        if event_urls: # this is a respawn. Just respawn all the event_urls in the browser
-            browser_instance.event_urls = event_urls
-            browser_instance.proxies.extend(proxies)
-            browser_instance.proxy_manager = ProxyManager(browser_instance.browser,self.debug_ui, proxies) 
-            for event_url in event_urls:
-                task = asyncio.create_task(self._run_event_manager(
-                    browser_instance.browser,
-                    event_url, 
-                    browser_instance.proxy_manager,
-                    lambda url=event_url: self.logger.info(f"Initial loading complete! {url}")
-                ))
-                browser_instance.tasks.append(task)
 
-            return
-        
-        # Calculate how many events to assign to this browser
-        if self.events_per_browser is None:
-            # Distribute events evenly across all browsers
-            events_per_browser = len(self.all_events.keys()) // self.num_browsers + 1
+        # The slot is gone. Its events and proxies are spread over the remaining browsers
+        self.logger.error(f"Couldn't respawn {slot}. Moving its events to the other browsers")
+        self._remove_slot(slot)
+        await self.rebalance()
+    
+    def _dispatch_events_to_browser(self, browser_instance: BrowserInstance):
+        """
+        Bring a browser in line with the current plan: hand over proxies and start the events
+        its slot owns. Events moving away keep running until their new browser has loaded them.
+        """
+        slot = browser_instance.slot
+        # A direct connection isn't a limited resource. Every browser gets it
+        proxies = [proxy for proxy in self.all_proxies
+                   if self.proxy_owner.get(self._proxy_key(proxy)) == slot or proxy["server"] == DIRECT_PROXY["server"]]
+        if browser_instance.proxy_manager is None:
+            browser_instance.proxy_manager = ProxyManager(browser_instance.browser, self.debug_ui, list(proxies),
+                                                          profile=self.browser_profile, network_sem=self.network_sem)
         else:
-            events_per_browser = self.events_per_browser
+            browser_instance.proxy_manager.add_proxies([proxy for proxy in proxies if proxy not in browser_instance.proxies])
+            browser_instance.proxy_manager.remove_proxies([proxy for proxy in browser_instance.proxies if proxy not in proxies])
+        browser_instance.proxies = proxies
 
-        # Calculate how many proxies to assign to this browser
-        proxies_per_browser = len(self.all_proxies) // self.num_browsers + 1
-            
-        events_to_dispatch = dict(list(self.all_events.items())[:events_per_browser])
-        self.all_event_urls = dict(list(self.all_events.items())[events_per_browser:])
-
-        proxies_to_dispatch = self.all_proxies[:proxies_per_browser]
-        self.all_proxies = self.all_proxies[proxies_per_browser:]
-
-        browser_instance.event_urls = events_to_dispatch
-        browser_instance.proxies.extend(proxies_to_dispatch)
-
-        browser_instance.proxy_manager = ProxyManager(browser_instance.browser, self.debug_ui, proxies_to_dispatch) 
-        for event_url in events_to_dispatch:
-            task = asyncio.create_task(self._run_event_manager(
-                browser_instance.browser,
-                event_url, 
-                browser_instance.proxy_manager,
-                events_to_dispatch[event_url],
-                lambda url=event_url: self.logger.info(f"Initial loading complete! {url}")
-            ))
-            browser_instance.tasks.append(task)
-    
-    async def _run_event_manager(self,browser:Browser, event_url: str, proxy_manager: ProxyManager,webhook_url, callback: Callable):
+        browser_instance.event_urls = {
+            event_url: webhook_url for event_url, webhook_url in self.all_events.items()
+            if self.event_owner.get(event_url) == slot
+        }
+        for event_url, webhook_url in browser_instance.event_urls.items():
+            if event_url in browser_instance.event_managers:
+                if event_url in browser_instance.loaded_events:
+                    self._stop_event_elsewhere(event_url, browser_instance)
+                continue
+            self._start_event(browser_instance, event_url, webhook_url)
+
+    def _start_event(self, browser_instance: BrowserInstance, event_url: str, webhook_url: str):
         manager = EventManager(
             event_url,
             webhook_url,
-            browser,
-            proxy_manager,
+            browser_instance.browser,
+            browser_instance.proxy_manager,
             self.debug_ui,
             self.network_sem,
-            callback
+            lambda: self._event_loaded(browser_instance, event_url),
+            landing_sem=self.landing_sem,
+            spawn_sem=self.spawn_sem,
+            startup_report=self.startup_report,
+            checkpoint_store=self.checkpoint_store,
         )
-        return await manager.run()
+        task = asyncio.create_task(manager.run(), name=f"event_manager:{event_url}")
+        browser_instance.event_managers[event_url] = manager
+        browser_instance.event_tasks[event_url] = task
+        browser_instance.tasks.append(task)
+
+    def _event_loaded(self, browser_instance: BrowserInstance, event_url: str):
+        browser_instance.loaded_events.add(event_url)
+        self.startup_report.event_loaded(event_url)
+        if self.event_owner.get(event_url) == browser_instance.slot:
+            # Make before break: the previous browser only lets go once the new one has every section up
+            self._stop_event_elsewhere(event_url, browser_instance)
+
+    def _stop_event_elsewhere(self, event_url: str, keep: BrowserInstance):
+        for browser_instance in self.active_browsers:
+            if browser_instance is not keep and event_url in browser_instance.event_managers:
+                self.logger.info(f"Moved {event_url} from {browser_instance.slot} to {keep.slot}")
+                asyncio.create_task(self._stop_event(browser_instance, event_url))
+
+    async def _stop_event(self, browser_instance: BrowserInstance, event_url: str):
+        manager = browser_instance.event_managers.pop(event_url, None)
+        task = browser_instance.event_tasks.pop(event_url, None)
+        browser_instance.loaded_events.discard(event_url)
+        if task:
+            task.cancel()
+            if task in browser_instance.tasks:
+                browser_instance.tasks.remove(task)
+        if manager:
+            try:
+                await manager.stop()
+            except Exception as e:
+                self.logger.warning(f"Error while stopping {event_url}: {e}")
 
 async def main():
-    manager = BrowserManager(max_browsers=3, events_per_browser=5)
+    manager = BrowserManager(max_browsers=int(getenv("MAX_BROWSERS", 3)),
+                             events_per_browser=int(getenv("EVENTS_PER_BROWSER", 5)))
     await manager.initialize()
     
     # Keep main running while there are active tasks
@@ -5,7 +5,6 @@ from os import getenv
 import random
 
 from scraper.area_seating_scraper import AreaSeatingScraper
-from utils.debug_ui import DebugUI
 from utils.logger import setup_logger
 import httpx
 from playwright.async_api import  Page, Request, Browser
@@ -13,17 +12,28 @@ import aiohttp
 from dotenv import load_dotenv
 
 from playwright._impl._errors import TargetClosedError
+from typing import TYPE_CHECKING, Optional
 
 load_dotenv(override=True)
 
 from utils.priority_semaphore import PrioritySemaphore
 from scraper.managers.proxy_manager import ProxyManager
+from scraper.helpers.browser_profiles import MANIFEST_IMAGE_PREFIX
+from utils.checkpoint_store import CheckpointStore
+
+if TYPE_CHECKING:
+    from utils.debug_ui import DebugUI
+    from utils.startup_report import StartupReport
 
 EVENT_URL = "https://www.etix.com/ticket/p/61485410/ludacris-with-special-guestsbow-wow-bone-thugsnharmony-albuquerque-sandia-casino-amphitheater"
 HEADLESS_MODE = True
+# Events that can be loading their landing page at the same time
+EVENT_LANDING_CONCURRENCY = int(getenv("EVENT_LANDING_CONCURRENCY", 4))
 
 class EventManager:
-    def __init__(self, base_url, webhook_url, browser,  proxy_manager, debug_ui, network_sem, initial_load_complete_callback):
+    def __init__(self, base_url, webhook_url, browser,  proxy_manager, debug_ui, network_sem, initial_load_complete_callback,
+                 landing_sem: Optional[asyncio.Semaphore] = None, spawn_sem: Optional[asyncio.Semaphore] = None,
+                 startup_report: Optional["StartupReport"] = None, checkpoint_store: Optional[CheckpointStore] = None):
         self.playwright = None
         self.base_url = base_url
         self.browser: Browser = browser
@@ -31,7 +41,7 @@ class EventManager:
         self.network_sem: PrioritySemaphore = network_sem
         self.context = None
         self.page = None
-        self.debug_ui = debug_ui
+        self.debug_ui: "DebugUI" = debug_ui
         self.logger = setup_logger("EventManager")
         self.logger.propagate = False
         self.client = httpx.AsyncClient()
@@ -41,10 +51,65 @@ class EventManager:
         self.retries_remaining = 3
         self.has_manifest_image_event = asyncio.Event()
         self.initial_load_complete_callback = initial_load_complete_callback
+        # Shared between all events, so only a few events load at once and reach their sections sooner
+        self.landing_sem = landing_sem or asyncio.Semaphore(EVENT_LANDING_CONCURRENCY)
+        self.spawn_sem = spawn_sem
+        self.startup_report = startup_report
+        self.event_created = asyncio.Event()
+        self.seating_scraper: Optional[AreaSeatingScraper] = None
+        self.stopped = False
+        self.checkpoint_store = checkpoint_store
+        # Event id, time, areas, GA sections and section navigation data found so far
+        self.checkpoint: dict = {}
+
+    @property
+    def section_count(self) -> int:
+        """Number of available sections last seen on the event page. 0 until the page has been read."""
+        if self.seating_scraper is None:
+            return 0
+        return len(self.seating_scraper.prev_available_area_numbers)
+
+    async def stop(self):
+        """Stop monitoring this event and close all of its tabs."""
+        self.stopped = True
+        if self.seating_scraper:
+            await self.seating_scraper.stop()
+        if self.page:
+            await self.proxy_manager.close_tab(self.page)
+        self.logger.info(f"Stopped event {self.base_url}")
 
     async def init_browser(self):
         self.page = await self.proxy_manager.create_tab()
 
+    async def load_checkpoint(self):
+        if self.checkpoint_store is None:
+            return
+        checkpoint = await self.checkpoint_store.load(self.base_url) or {}
+        if checkpoint.get("webhook_url") != self.webhook_url:
+            # The event was re-registered with another webhook. Let the backend hand out its id again
+            checkpoint.pop("event_id", None)
+        self.checkpoint = checkpoint
+        if checkpoint:
+            self.logger.info(f"Loaded checkpoint for {self.base_url}: event {checkpoint.get('event_id')}, "
+                             f"{len(checkpoint.get('areas', []))} areas, {len(checkpoint.get('ga_sections', []))} GA sections")
+
+    def save_checkpoint(self, **fields):
+        """Merge ``fields`` into the checkpoint of this event and schedule a write."""
+        if self.checkpoint_store is None:
+            return
+        self.checkpoint.update(fields)
+        self.checkpoint_store.save(self.base_url, self.checkpoint)
+
+    def new_seating_scraper(self) -> AreaSeatingScraper:
+        self.seating_scraper = AreaSeatingScraper(self.browser, self.page,  self.post_to_fastapi,
+                                                  self.proxy_manager, self.base_url, self.debug_ui,
+                                                  self.network_sem,
+                                                  self.initial_load_complete_callback,
+                                                  spawn_sem=self.spawn_sem,
+                                                  checkpoint=self.checkpoint,
+                                                  save_checkpoint=self.save_checkpoint)
+        return self.seating_scraper
+
     async def look_for_map(self, page: Page):
         self.logger.info("Image with usemap not found. Looking for seating chart button")
         button = await page.wait_for_selector("a:has-text('Seating Chart')")
@@ -86,23 +151,32 @@ class EventManager:
             return None
 
     async def run_main_monitor(self):
-        while self.retries_remaining > 0:
+        while self.retries_remaining > 0 and not self.stopped:
             try:
-                async with self.network_sem.priority(8): 
-                    if not await self.check_manifest_image(self.page):
-                        # Current version can't handle seating canvas anyway.
-                        return
+                async with self.landing_sem:
+                    async with self.network_sem.priority(8): 
+                        if not await self.check_manifest_image(self.page):
+                            # Current version can't handle seating canvas anyway.
+                            return
 
-                self.logger.info("Manifest image found. Starting main refresh loop...")
+                    self.logger.info("Manifest image found. Starting main refresh loop...")
 
-                time_str = await self.get_event_time(self.page)
+                    if not self.checkpoint.get("event_id"):
+                        time_str = await self.get_event_time(self.page)
 
                 self.retries_remaining = 3 # resetting the retries
-                await self.create_event(time_str)
-                seating_scraper = AreaSeatingScraper(self.browser, self.page,  self.post_to_fastapi,
-                                                      self.proxy_manager, self.base_url, self.debug_ui,
-                                                      self.network_sem,
-                                                      self.initial_load_complete_callback)
+                if self.checkpoint.get("event_id"):
+                    # Known from the checkpoint. The event already exists in the backend
+                    self.event_id = self.checkpoint["event_id"]
+                    self.event_created.set()
+                else:
+                    # Sections start spawning while the event is being created. Posts wait for the event id
+                    self.event_created.clear()
+                    asyncio.create_task(self.create_event(time_str))
+
+                seating_scraper = self.seating_scraper
+                if seating_scraper is None or seating_scraper.page is not self.page or seating_scraper.quit_flag:
+                    seating_scraper = self.new_seating_scraper()
                 await seating_scraper.run()
             except TimeoutError:
                 self.retries_remaining -= 1
@@ -112,34 +186,51 @@ class EventManager:
 
 
     async def post_to_fastapi(self, data: dict):
+        await self.event_created.wait()
         async with aiohttp.ClientSession() as session:
             async with session.post(f"{getenv('BACKEND_BASEURL', 'http://localhost:4000')}/ingest", json={**data, "event_id": self.event_id}) as response:
-                if response.status != 200:
+                if response.status == 409:
+                    # A newer scrape of the section got there first
+                    self.logger.info(f"Backend skipped a stale snapshot of section {data.get('section')}")
+                elif response.status != 200:
                     self.logger.warning(f"Post failed: {(await response.text())[:400]}...")
                 else:
                     self.logger.info(f"Successfully posted data to webserver")
+                    if self.startup_report:
+                        self.startup_report.data_received(self.base_url)
 
     async def create_event(self, time):
-        async with aiohttp.ClientSession() as session:
-            async with session.post(f"{getenv('BACKEND_BASEURL', 'http://localhost:4000')}/create-event",
-                                    json={"url": self.base_url, "time": time, 'webhook_url': self.webhook_url}) as response:
-                if response.status != 200:
-                    self.logger.warning(f"Creating event failed for url {self.base_url}")
-                else:
-                    self.event_id = (await response.json())["event_id"]
-                    self.logger.info(f"Successfully created event {self.base_url}")
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{getenv('BACKEND_BASEURL', 'http://localhost:4000')}/create-event",
+                                        json={"url": self.base_url, "time": time, 'webhook_url': self.webhook_url}) as response:
+                    if response.status != 200:
+                        self.logger.warning(f"Creating event failed for url {self.base_url}")
+                    else:
+                        self.event_id = (await response.json())["event_id"]
+                        self.logger.info(f"Successfully created event {self.base_url}")
+                        self.save_checkpoint(event_id=self.event_id, time=time, webhook_url=self.webhook_url)
+        except Exception as e:
+            self.logger.error(f"Creating event failed for url {self.base_url}: {e}")
+        finally:
+            self.event_created.set()
 
     async def _on_request(self, request: Request):
-        if request.url.startswith("https://cdn.etix.com/etix/viewable_chart/"):
+        if request.url.startswith(MANIFEST_IMAGE_PREFIX):
             self.has_manifest_image_event.set()
             
     async def run(self):
-        while True:
+        await self.load_checkpoint()
+        while not self.stopped:
             try:
-                await self.init_browser()
-                async with self.network_sem.priority(7):
-                    await self.page.goto(self.base_url) # waiting for 10 minutes
-                    self.page.on('request', lambda req: self._on_request(req))
+                async with self.landing_sem:
+                    await self.init_browser()
+                    if self.seating_scraper is None and self.checkpoint.get("areas"):
+                        # Known sections start loading while the event page is still on its way
+                        await self.new_seating_scraper().resume_known_areas()
+                    async with self.network_sem.priority(7):
+                        await self.page.goto(self.base_url) # waiting for 10 minutes
+                        self.page.on('request', lambda req: self._on_request(req))
                 await self.run_main_monitor()
                 break  # If everything finishes without crash, exit the loop
             except TargetClosedError:
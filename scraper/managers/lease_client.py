@@ -0,0 +1,94 @@
+import os
+import socket
+import time
+from os import getenv
+from typing import Dict, List, Optional, Tuple
+
+import aiohttp
+from dotenv import load_dotenv
+
+from utils.logger import setup_logger
+
+load_dotenv(override=True)
+
+# "file" reads event_list, "lease" claims events from the backend's event registry
+EVENT_SOURCE = getenv("EVENT_SOURCE", "file")
+# Seconds between lease renewals. Must be well under the backend's LEASE_TTL
+LEASE_RENEW_INTERVAL = float(getenv("LEASE_RENEW_INTERVAL", 20))
+
+
+def default_scraper_id() -> str:
+    return getenv("SCRAPER_ID") or f"{socket.gethostname()}-{os.getpid()}"
+
+
+class LeaseClient:
+    def __init__(self, scraper_id: Optional[str] = None, base_url: Optional[str] = None):
+        """
+        Claims, renews and releases event leases on the backend, so several scrapers can share
+        one event list without doing the same work twice.
+
+        Args:
+            scraper_id: Name of this scraper instance. Defaults to SCRAPER_ID, or host and pid
+            base_url: Backend url. Defaults to BACKEND_BASEURL
+        """
+        self.scraper_id = scraper_id or default_scraper_id()
+        self.base_url = base_url or getenv('BACKEND_BASEURL', 'http://localhost:4000')
+        self.leases: Dict[str, str] = {}  # url -> webhook url of the events currently held
+        self.expires_at: Dict[str, float] = {}
+
+        self.logger = setup_logger("LeaseClient")
+        self.logger.propagate = False
+
+    async def _post(self, path: str, payload: dict) -> Optional[dict]:
+        try:
+            async with aiohttp.ClientSession() as session:
+                async with session.post(f"{self.base_url}{path}", json=payload) as response:
+                    if response.status != 200:
+                        self.logger.warning(f"{path} failed: {(await response.text())[:400]}...")
+                        return None
+                    return await response.json()
+        except aiohttp.ClientError as e:
+            self.logger.warning(f"{path} failed: {e}")
+            return None
+
+    async def claim(self, capacity: int) -> Dict[str, str]:
+        """Claim up to ``capacity`` more events. Returns the newly leased events, url -> webhook url."""
+        if capacity <= 0:
+            return {}
+        response = await self._post("/leases/claim", {"scraper_id": self.scraper_id, "capacity": capacity})
+        if not response:
+            return {}
+        claimed = {lease["url"]: lease["webhook_url"] for lease in response["leases"]}
+        self.leases.update(claimed)
+        self.expires_at.update({lease["url"]: lease["expires_at"] for lease in response["leases"]})
+        if claimed:
+            self.logger.info(f"{self.scraper_id} claimed {len(claimed)} events")
+        return claimed
+
+    async def renew(self) -> Tuple[List[str], bool]:
+        """
+        Renew every held lease. Returns the urls that were lost, and whether the backend could be
+        reached. While the backend is unreachable leases are kept until they expire, since another
+        scraper may claim them from then on.
+        """
+        if not self.leases:
+            return [], True
+        response = await self._post("/leases/renew", {"scraper_id": self.scraper_id, "urls": list(self.leases)})
+        if response is None:
+            lost = [url for url in self.leases if self.expires_at.get(url, 0) < time.time()]
+        else:
+            lost = response["lost"]
+            self.expires_at.update({lease["url"]: lease["expires_at"] for lease in response["renewed"]})
+        for url in lost:
+            self.leases.pop(url, None)
+            self.expires_at.pop(url, None)
+        return lost, response is not None
+
+    async def release(self, urls: Optional[List[str]] = None) -> None:
+        urls = list(self.leases) if urls is None else urls
+        if not urls:
+            return
+        await self._post("/leases/release", {"scraper_id": self.scraper_id, "urls": urls})
+        for url in urls:
+            self.leases.pop(url, None)
+            self.expires_at.pop(url, None)
@@ -0,0 +1,180 @@
+import asyncio
+import time
+from os import getenv
+from typing import Callable, Dict, List, Optional, Tuple
+
+import psutil
+from dotenv import load_dotenv
+from playwright.async_api import Browser, Page
+
+from scraper.managers.proxy_manager import ProxyManager
+from utils.logger import setup_logger
+
+load_dotenv(override=True)
+
+# 0 means "use 80% of the machine's memory"
+MEMORY_BUDGET_MB = int(getenv("MEMORY_BUDGET_MB", 0))
+MEMORY_WATCHDOG_INTERVAL = float(getenv("MEMORY_WATCHDOG_INTERVAL", 15))
+# Minimum time between two recycles, so only one section is ever being replaced at a time
+RECYCLE_STAGGER = float(getenv("RECYCLE_STAGGER", 20))
+MAX_TAB_AGE = float(getenv("MAX_TAB_AGE", 3600))
+MAX_CONTEXT_AGE = float(getenv("MAX_CONTEXT_AGE", 4 * 3600))
+
+JS_HEAP_SCRIPT = "() => performance.memory ? performance.memory.usedJSHeapSize : 0"
+
+
+def _rss_by_pid(pids: List[int]) -> Dict[int, int]:
+    """Resident set size of each pid. Processes that went away in the meantime are skipped."""
+    rss = {}
+    for pid in pids:
+        try:
+            rss[pid] = psutil.Process(pid).memory_info().rss
+        except (psutil.NoSuchProcess, psutil.AccessDenied):
+            continue
+    return rss
+
+
+def _own_process_tree() -> List[int]:
+    """This process plus everything it spawned (playwright driver and every chromium process)."""
+    me = psutil.Process()
+    return [me.pid] + [child.pid for child in me.children(recursive=True)]
+
+
+class MemoryWatchdog:
+    def __init__(self, get_browsers: Callable[[], List[Tuple[Browser, ProxyManager]]]):
+        """
+        Samples the memory used by the scraper and recycles tabs and contexts before chromium
+        runs out of memory.
+
+        Args:
+            get_browsers: Returns the live (browser, proxy manager) pairs to watch
+        """
+        self.get_browsers = get_browsers
+        self.budget_bytes = (
+            MEMORY_BUDGET_MB * 1024 * 1024 if MEMORY_BUDGET_MB
+            else int(psutil.virtual_memory().total * 0.8)
+        )
+        self.logger = setup_logger("MemoryWatchdog")
+        self.logger.propagate = False
+        self._cdp_sessions = {}
+        self._last_recycle = 0.0
+
+    async def run(self):
+        self.logger.info(f"Starting with a budget of {self.budget_bytes // (1024 * 1024)}MB")
+        while True:
+            await asyncio.sleep(MEMORY_WATCHDOG_INTERVAL)
+            try:
+                await self._tick()
+            except Exception as e:
+                self.logger.error(f"Watchdog tick failed: {e}")
+
+    async def _browser_processes(self, browser: Browser) -> Dict[int, str]:
+        """Map pid -> process type (browser, renderer, GPU, utility) for one chromium instance."""
+        session = self._cdp_sessions.get(browser)
+        if session is None:
+            session = await browser.new_browser_cdp_session()
+            self._cdp_sessions[browser] = session
+        info = await session.send("SystemInfo.getProcessInfo")
+        return {process["id"]: process["type"] for process in info["processInfo"]}
+
+    async def sample(self, browsers: List[Tuple[Browser, ProxyManager]]) -> Tuple[int, Dict[Browser, Dict[str, int]]]:
+        """
+        Returns the total RSS of the scraper and a per browser breakdown of RSS by process type.
+        RSS over-counts memory shared between chromium processes, which errs on the safe side.
+        """
+        # Forget sessions of browsers that are gone
+        live = {browser for browser, _ in browsers}
+        for browser in list(self._cdp_sessions):
+            if browser not in live:
+                del self._cdp_sessions[browser]
+
+        processes: Dict[Browser, Dict[int, str]] = {}
+        for browser, _ in browsers:
+            try:
+                processes[browser] = await self._browser_processes(browser)
+            except Exception as e:
+                self._cdp_sessions.pop(browser, None)
+                self.logger.warning(f"Couldn't list chromium processes: {e}")
+
+        all_pids = await asyncio.to_thread(_own_process_tree)
+        rss = await asyncio.to_thread(_rss_by_pid, all_pids)
+
+        breakdown: Dict[Browser, Dict[str, int]] = {}
+        for browser, pid_types in processes.items():
+            per_type: Dict[str, int] = {}
+            for pid, process_type in pid_types.items():
+                per_type[process_type] = per_type.get(process_type, 0) + rss.get(pid, 0)
+            breakdown[browser] = per_type
+
+        return sum(rss.values()), breakdown
+
+    async def _tab_heap(self, page: Page) -> int:
+        try:
+            return await asyncio.wait_for(page.evaluate(JS_HEAP_SCRIPT), timeout=2)
+        except Exception:
+            return 0
+
+    async def _worst_offender(self, browsers: List[Tuple[Browser, ProxyManager]]) -> Optional[Tuple[ProxyManager, Page]]:
+        """The recyclable tab with the largest JS heap across every browser."""
+        candidates = [
+            (proxy_manager, page)
+            for _, proxy_manager in browsers
+            for page in list(proxy_manager.recycle_handlers)
+        ]
+        if not candidates:
+            return None
+        heaps = await asyncio.gather(*(self._tab_heap(page) for _, page in candidates))
+        heaviest = max(range(len(candidates)), key=lambda i: heaps[i])
+        return candidates[heaviest]
+
+    def _next_aged_tab(self, browsers: List[Tuple[Browser, ProxyManager]]) -> Optional[Tuple[ProxyManager, Page]]:
+        """
+        Drains contexts that lived too long and returns the next tab to recycle: tabs of
+        draining contexts first, then the oldest tab past MAX_TAB_AGE.
+        """
+        now = time.monotonic()
+        oldest: Optional[Tuple[float, ProxyManager, Page]] = None
+        for _, proxy_manager in browsers:
+            for context, created_at in list(proxy_manager.context_created_at.items()):
+                if now - created_at > MAX_CONTEXT_AGE and context not in proxy_manager.draining_contexts:
+                    proxy_manager.drain_context(context)
+
+            for context in proxy_manager.draining_contexts:
+                for page in proxy_manager.context_to_tabs.get(context, []):
+                    if proxy_manager.can_recycle(page):
+                        return proxy_manager, page
+
+            for page, created_at in proxy_manager.tab_created_at.items():
+                if not proxy_manager.can_recycle(page) or now - created_at <= MAX_TAB_AGE:
+                    continue
+                if oldest is None or created_at < oldest[0]:
+                    oldest = (created_at, proxy_manager, page)
+
+        return (oldest[1], oldest[2]) if oldest else None
+
+    async def _tick(self):
+        browsers = [(browser, pm) for browser, pm in self.get_browsers() if pm is not None]
+        if not browsers:
+            return
+
+        total, breakdown = await self.sample(browsers)
+        renderer_total = sum(per_type.get("renderer", 0) for per_type in breakdown.values())
+        self.logger.info(
+            f"Memory: {total // (1024 * 1024)}MB total, {renderer_total // (1024 * 1024)}MB in renderers, "
+            f"budget {self.budget_bytes // (1024 * 1024)}MB"
+        )
+
+        if time.monotonic() - self._last_recycle < RECYCLE_STAGGER:
+            return
+
+        if total > self.budget_bytes:
+            self.logger.warning("Over memory budget. Recycling the heaviest tab")
+            victim = await self._worst_offender(browsers)
+        else:
+            victim = self._next_aged_tab(browsers)
+
+        if victim:
+            proxy_manager, page = victim
+            self._last_recycle = time.monotonic()
+            # Recycling is awaited, so at most one section is being replaced at any time
+            await proxy_manager.recycle_tab(page)
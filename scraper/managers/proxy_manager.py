@@ -1,16 +1,27 @@
 import asyncio
-from collections import defaultdict
+from collections import defaultdict, deque
 from os import getenv
 import logging
-from typing import Dict, List, Optional, Set, Tuple
-import httpx
+import time
+from typing import TYPE_CHECKING, Awaitable, Callable, Deque, Dict, List, Optional, Set, Tuple
 from playwright.async_api import Browser, BrowserContext, Page, Response
 
-from utils.debug_ui import DebugUI
+from utils.priority_semaphore import PrioritySemaphore
 import utils.logger as logger
+from scraper.helpers.browser_profiles import BrowserProfile, get_browser_profile
+from scraper.managers.proxy_prober import DIRECT_PROXY, PROXY_PROBE_TIMEOUT, ProxyHealthProber
 from dotenv import load_dotenv
 
 load_dotenv(override=True)
+
+if TYPE_CHECKING:
+    # Textual is only imported when the debug ui is enabled
+    from utils.debug_ui import DebugUI
+
+WARM_POOL_SIZE = int(getenv("WARM_POOL_SIZE", 2))
+# Lower than every priority used for scraping (see area_seating_scraper), so refills never compete with live tabs
+POOL_REFILL_PRIORITY = 12
+
 @property
 def is_connected(self: BrowserContext) -> bool:
     try:
@@ -21,7 +32,9 @@ def is_connected(self: BrowserContext) -> bool:
         return False
 
 class ProxyManager:
-    def __init__(self, browser: Browser, debug_ui: DebugUI, proxies: List[Dict[str, str]], max_tabs_per_context: int = 10):
+    def __init__(self, browser: Browser, debug_ui: "DebugUI", proxies: List[Dict[str, str]], max_tabs_per_context: int = 10,
+                 profile: Optional[BrowserProfile] = None, network_sem: Optional[PrioritySemaphore] = None,
+                 warm_pool_size: int = WARM_POOL_SIZE):
         """
         Initialize the ProxyManager with a Playwright Browser instance and a list of proxies.
 
@@ -37,11 +50,18 @@ class ProxyManager:
                          ...
                      ]
             max_tabs_per_context: Maximum number of tabs allowed per browser context
+            profile: Browser profile whose context settings and router are applied to every context.
+                     Defaults to the one selected by BROWSER_PROFILE
+            network_sem: Shared network semaphore. Warm pool refills wait on it at the lowest priority
+            warm_pool_size: Number of blank tabs kept ready for instant respawns
         """
         self.browser = browser
         self.debug_ui = debug_ui
         self.proxies = proxies
         self.max_tabs_per_context = max_tabs_per_context
+        self.profile = profile or get_browser_profile()
+        self.network_sem = network_sem
+        self.warm_pool_size = warm_pool_size
 
         self.logger = logger.setup_logger("ProxyManager")
         self.logger.propagate = False
@@ -50,20 +70,50 @@ class ProxyManager:
         httpx_logger.handlers = [logging.NullHandler()]
         httpx_logger.propagate = False
 
+        # Proxies are checked in the background. Contexts are only created on proxies known to be healthy
+        self.health_prober = ProxyHealthProber(self.proxies)
+        self.health_prober.start()
+
         # Track contexts and their associated proxies
         self.context_to_proxy: Dict[BrowserContext, Dict[str, str]] = {}
         self.proxy_to_contexts: Dict[tuple, List[BrowserContext]] = {
             self._proxy_to_key(proxy): [] for proxy in proxies
         }
 
-        # Track tabs in each context
+        # Track tabs in each context, and the reverse page -> context index
         self.context_to_tabs: Dict[BrowserContext, List[Page]] = {}
+        self.page_to_context: Dict[Page, BrowserContext] = {}
+        self.context_to_proxy_key: Dict[BrowserContext, tuple] = {}
+
+        # Proxies without any context, in the order they should be tried
+        self.idle_proxies: Dict[tuple, Dict[str, str]] = {
+            self._proxy_to_key(proxy): proxy for proxy in proxies
+        }
+        # Non-draining contexts bucketed by their number of tabs, for least loaded lookups
+        self.contexts_by_load: Dict[int, Dict[BrowserContext, None]] = defaultdict(dict)
+
+        # Incrementally maintained stats
+        self.total_tabs = 0
+        self.proxy_tab_counts: Dict[tuple, int] = {}
+
+        # Lifetime tracking used by the memory watchdog
+        self.context_created_at: Dict[BrowserContext, float] = {}
+        self.tab_created_at: Dict[Page, float] = {}
+        # Contexts being drained stop receiving new tabs and are closed once empty
+        self.draining_contexts: Set[BrowserContext] = set()
+        # Owners of a tab register a coroutine factory that replaces the tab without losing coverage
+        self.recycle_handlers: Dict[Page, Callable[[], Awaitable[None]]] = {}
 
-        # Preventing race conditions between other tasks requesting proxies that are already being assigned
-        self.proxy_assignment_lock = asyncio.Lock()
-        self.proxies_being_assigned: Set[tuple] = set()
         self.context_management_lock = asyncio.Lock()
 
+        # Times of renderer crashes, read by the autoscaler
+        self.crash_times: Deque[float] = deque(maxlen=100)
+
+        # Blank tabs (routing already installed on their context) handed out by acquire_tab
+        self.warm_tabs: Deque[Page] = deque()
+        self.refill_task: Optional[asyncio.Task] = None
+        self._refill_warm_pool()
+
 
         self.logger.info("Starting up...")
 
@@ -82,32 +132,100 @@ class ProxyManager:
 
     async def _create_context_with_proxy(self, proxy: Dict[str, str]) -> BrowserContext:
         """Create a new browser context with the given proxy."""
-        pw_proxy = self._proxy_to_playwright_format(proxy)
-        context = await self.browser.new_context(proxy=pw_proxy)
+        if proxy["server"] == DIRECT_PROXY["server"]:
+            context = await self.browser.new_context(**self.profile.context_options)
+        else:
+            pw_proxy = self._proxy_to_playwright_format(proxy)
+            context = await self.browser.new_context(proxy=pw_proxy, **self.profile.context_options)
+        if self.profile.route_handler:
+            await context.route("**/*", self.profile.route_handler)
         context.on("close",lambda ctx: self._context_closed_event(ctx) )
         context.set_default_navigation_timeout(int(getenv("DEFAULT_NAVIGATION_TIMEOUT",300000)))
+        self._index_context(context, proxy)
+        return context
+
+    def _index_context(self, context: BrowserContext, proxy: Dict[str, str]) -> None:
+        proxy_key = self._proxy_to_key(proxy)
         self.context_to_proxy[context] = proxy
-        self.proxy_to_contexts[self._proxy_to_key(proxy)].append(context)
+        self.context_to_proxy_key[context] = proxy_key
+        self.proxy_to_contexts[proxy_key].append(context)
         self.context_to_tabs[context] = []
+        self.context_created_at[context] = time.monotonic()
+        self.contexts_by_load[0][context] = None
+        self.idle_proxies.pop(proxy_key, None)
+        self.proxy_tab_counts.setdefault(proxy_key, 0)
+
+    def _unindex_context(self, context: BrowserContext) -> List[Page]:
+        """Remove a context from every index. Returns the tabs it still had."""
+        proxy_key = self.context_to_proxy_key.pop(context)
+        proxy = self.context_to_proxy.pop(context)
+        pages = self.context_to_tabs.pop(context)
+        self.contexts_by_load[len(pages)].pop(context, None)
+        for page in pages:
+            self.page_to_context.pop(page, None)
+            self._forget_tab(page)
+        self.context_created_at.pop(context, None)
+        self.draining_contexts.discard(context)
+
+        self.proxy_to_contexts[proxy_key].remove(context)
+        self.total_tabs -= len(pages)
+        self.proxy_tab_counts[proxy_key] -= len(pages)
+        if not self.proxy_to_contexts[proxy_key]:
+            del self.proxy_tab_counts[proxy_key]
+            if proxy in self.proxies:
+                # Not handed over to another browser in the meantime
+                self.idle_proxies[proxy_key] = proxy
+        return pages
+
+    def _move_load_bucket(self, context: BrowserContext, old_load: int, new_load: int) -> None:
+        self.contexts_by_load[old_load].pop(context, None)
+        if context not in self.draining_contexts:
+            self.contexts_by_load[new_load][context] = None
+
+    def _index_tab(self, context: BrowserContext, page: Page) -> None:
+        tabs = self.context_to_tabs[context]
+        tabs.append(page)
+        self._move_load_bucket(context, len(tabs) - 1, len(tabs))
+        self.page_to_context[page] = context
+        self.tab_created_at[page] = time.monotonic()
+        self.total_tabs += 1
+        self.proxy_tab_counts[self.context_to_proxy_key[context]] += 1
+
+    def _unindex_tab(self, page: Page) -> Optional[BrowserContext]:
+        """Remove a tab from every index. Returns its context, or None if it wasn't tracked."""
+        context = self.page_to_context.pop(page, None)
+        if context is None:
+            return None
+        tabs = self.context_to_tabs[context]
+        tabs.remove(page)
+        self._move_load_bucket(context, len(tabs) + 1, len(tabs))
+        self._forget_tab(page)
+        self.total_tabs -= 1
+        self.proxy_tab_counts[self.context_to_proxy_key[context]] -= 1
         return context
 
+    def _publish_stats(self) -> None:
+        stats = self.get_context_stats()
+        self.debug_ui.update_context_stats_widget(stats['total_tabs'],stats['avg_tabs_per_proxy'])
+
     def _get_available_proxies(self) -> List[Dict[str, str]]:
         """Get proxies that don't have any contexts assigned yet."""
-        return [
-            proxy for proxy in self.proxies 
-            if not self.proxy_to_contexts[self._proxy_to_key(proxy)]
-        ]
+        return list(self.idle_proxies.values())
 
     def _get_least_loaded_context(self) -> BrowserContext:
         """Get the context with the fewest tabs across all proxies."""
-        if not self.context_to_proxy:
-            raise ValueError("No contexts available")
-        return min(self.context_to_proxy.keys(), key=lambda ctx: len(self.context_to_tabs[ctx]))
+        # Loads are bounded by max_tabs_per_context, so this is a scan over a handful of buckets
+        for load in sorted(self.contexts_by_load):
+            bucket = self.contexts_by_load[load]
+            if bucket:
+                return next(iter(bucket))
+        raise ValueError("No contexts available")
 
     def _get_available_context_for_proxy(self, proxy: Dict[str, str]) -> Optional[BrowserContext]:
         """Get an available context for the specified proxy."""
         for context in self.proxy_to_contexts[self._proxy_to_key(proxy)]:
-            return context
+            if context not in self.draining_contexts:
+                return context
         return None
 
     async def get_or_create_context(self, proxy: Optional[Dict[str, str]] = None) -> BrowserContext:
@@ -117,8 +235,8 @@ class ProxyManager:
            - Try to find available context for that proxy
            - If none available, create new context for that proxy
         2. If no proxy specified:
-           - First check for proxies with no contexts and create one
-           - If all proxies have contexts, use the least loaded context
+           - First check for healthy proxies with no contexts and create one on the fastest
+           - If all healthy proxies have contexts, use the least loaded context
         """
         # If proxy is specified
         if proxy:
@@ -134,37 +252,48 @@ class ProxyManager:
             return await self._create_context_with_proxy(proxy)
 
         # If no proxy specified
-        # First check for proxies with no contexts
+        # First check for healthy proxies with no contexts, fastest first. Health comes from
+        # the background prober, so this never waits on a proxy check
         available_proxies = self._get_available_proxies()
-        if available_proxies:
-            for proxy in available_proxies:
-                proxy_key = self._proxy_to_key(proxy)
-
-
-                async with self.proxy_assignment_lock:
-                    if proxy_key in self.proxies_being_assigned: # prevent race conditions when checking proxies
-                        continue
-                    self.proxies_being_assigned.add(proxy_key)
-                if await self.check_proxy(proxy):
-                    # Create context for checked available proxy
-                    self.logger.info("Found a proxy. Creating context...")
-                    return await self._create_context_with_proxy(proxy)
-                else:
-                    # proxy failed check
-                    self.logger.warning(f"Proxy {proxy['server']} not working! Moving to next proxy")
-                    self.proxies.append(self.proxies.pop(self.proxies.index(proxy)))
-        else:
+        healthy_proxies = self.health_prober.fastest(available_proxies)
+        if healthy_proxies:
+            self.logger.info("Found a proxy. Creating context...")
+            return await self._create_context_with_proxy(healthy_proxies[0])
+
+        if not self.context_to_proxy:
+            # Nothing to fall back on. The caller retries later
+            raise RuntimeError("No healthy proxy to create a context on")
+
+        if not available_proxies:
             self.logger.warning("No more proxies available!")
 
-        # All proxies have contexts - use least loaded one
-        while True:
-            async with self.proxy_assignment_lock:
-                if not self.proxies_being_assigned:
-                    break
-            await asyncio.sleep(0.1)  # small backoff
+        # All healthy proxies have contexts - use least loaded one
+        if self.draining_contexts.issuperset(self.context_to_proxy.keys()) and self.context_to_proxy:
+            # Every context is being drained. Open a fresh one on the same proxy
+            draining_ctx = next(iter(self.draining_contexts))
+            draining_proxy = self.context_to_proxy[draining_ctx]
+            return await self._create_context_with_proxy(
+                draining_proxy if draining_proxy in self.proxies or not self.proxies else self.proxies[0]
+            )
 
         return self._get_least_loaded_context()
 
+    async def _wait_for_healthy_proxy(self) -> None:
+        """
+        Give the prober one round when no healthy proxy is known yet, or when proxies without
+        a context haven't been checked yet (right after startup), rather than piling every tab
+        onto the first proxy. Called before taking context_management_lock, so waiting never
+        holds up other tabs.
+        """
+        available_proxies = self._get_available_proxies()
+        if self.health_prober.fastest(available_proxies):
+            return
+        if not self.context_to_proxy:
+            self.logger.warning("No healthy proxy known yet. Waiting for the prober...")
+            await self.health_prober.wait_for_probe(PROXY_PROBE_TIMEOUT)
+        elif self.health_prober.unprobed(available_proxies):
+            await self.health_prober.wait_for_probe(PROXY_PROBE_TIMEOUT)
+
     async def create_tab(self, proxy: Optional[Dict[str, str]] = None, url: Optional[str] = None) -> Page:
         """
         Create a new tab following the specified logic:
@@ -173,6 +302,9 @@ class ProxyManager:
         3. Create new tab in selected context
         """
 
+        if not proxy:
+            await self._wait_for_healthy_proxy()
+
         # If context is at max capacity, create new one
         async with self.context_management_lock:
             context = await self.get_or_create_context(proxy)
@@ -182,128 +314,202 @@ class ProxyManager:
 
             page = await context.new_page()
             page.on("crash", lambda page: self._page_crashed_event(page))
-            self.context_to_tabs[context].append(page)
+            self._index_tab(context, page)
 
         if url:
             await page.goto(url)
 
-        stats = self.get_context_stats()
-        self.debug_ui.update_context_stats_widget(stats['total_tabs'],stats['avg_tabs_per_proxy'])
+        self._publish_stats()
         return page
 
+    async def acquire_tab(self) -> Page:
+        """
+        Hand out a blank tab from the warm pool, or create one if the pool is empty.
+        The pool is refilled in the background.
+        """
+        while self.warm_tabs:
+            page = self.warm_tabs.popleft()
+            context = self.page_to_context.get(page)
+            if context is None or page.is_closed():
+                continue
+            if context in self.draining_contexts:
+                asyncio.create_task(self.close_tab(page))
+                continue
+            self._refill_warm_pool()
+            return page
+
+        self._refill_warm_pool()
+        return await self.create_tab()
+
+    def _refill_warm_pool(self) -> None:
+        if self.warm_pool_size and (self.refill_task is None or self.refill_task.done()):
+            self.refill_task = asyncio.create_task(self._fill_warm_pool(), name="warm_pool_refill")
+
+    async def _fill_warm_pool(self):
+        while len(self.warm_tabs) < self.warm_pool_size:
+            try:
+                if self.network_sem:
+                    async with self.network_sem.priority(POOL_REFILL_PRIORITY):
+                        page = await self.create_tab()
+                else:
+                    page = await self.create_tab()
+            except Exception as e:
+                self.logger.warning(f"Couldn't refill warm pool: {e}")
+                return
+            self.warm_tabs.append(page)
+
     async def _page_crashed_event(self, page: Page):
-        context = None
         self.logger.error("Page Crashed!")
+        self.crash_times.append(time.monotonic())
         async with self.context_management_lock:
-            for ctx, tabs in self.context_to_tabs.items():
-                if page in tabs:
-                    context = ctx
-                    break
-
-        if not context:
-            self.logger.error("Page not found in any managed context. Probably already closed")
-            return
-
-        stats = self.get_context_stats()
-        self.debug_ui.update_context_stats_widget(stats['total_tabs'],stats['avg_tabs_per_proxy'])
-
-        async with self.context_management_lock:
-            self.context_to_tabs[context].remove(page)
+            context = self._unindex_tab(page)
+            if not context:
+                self.logger.error("Page not found in any managed context. Probably already closed")
+                return
+            pages = self._detach_context_if_done(context)
 
-            # If context is now empty and we have more contexts for this proxy than needed, close it
-            proxy_key = self._proxy_to_key(self.context_to_proxy[context])
-            if (not self.context_to_tabs[context] and
-                    len(self.proxy_to_contexts[proxy_key]) > 1):
-                self.logger.info("Context empty. Closing context...")
-                await self.close_context(context)
+        self._publish_stats()
+        if pages is not None:
+            self.logger.info("Context empty. Closing context...")
+            await self._close_detached_context(context, pages)
 
     async def _context_closed_event(self, context: BrowserContext):
         self.logger.warning("Closed context event received!")
         async with self.context_management_lock:
-            # Close all tabs in this context first
-            for page in self.context_to_tabs[context][:]:
-                await page.close()
+            if context not in self.context_to_proxy:
+                # Already cleaned up by close_context
+                return
+            pages = self._unindex_context(context)
 
-            # Clean up tracking
-            proxy = self.context_to_proxy[context]
-            proxy_key = self._proxy_to_key(proxy)
-            self.proxy_to_contexts[proxy_key].remove(context)
-            del self.context_to_proxy[context]
-            del self.context_to_tabs[context]
-
-            stats = self.get_context_stats()
-            self.debug_ui.update_context_stats_widget(stats['total_tabs'],stats['avg_tabs_per_proxy'])
+        self._publish_stats()
+        for page in pages:
+            await page.close()
 
     async def close_tab(self, page: Page) -> None:
         """Close a specific tab and clean up if its context becomes empty."""
-        context = None
+        # Under the lock, so create_tab never picks a context that is about to be closed
         async with self.context_management_lock:
-            for ctx, tabs in self.context_to_tabs.items():
-                if page in tabs:
-                    context = ctx
-                    break
-
-        if not context:
-            self.logger.error("Page not found in any managed context. Probably already closed")
-            return
+            context = self._unindex_tab(page)
+            if not context:
+                self.logger.error("Page not found in any managed context. Probably already closed")
+                return
+            pages = self._detach_context_if_done(context)
+
+        await page.close()
+        self._publish_stats()
+        if pages is not None:
+            self.logger.info("Context empty. Closing context...")
+            await self._close_detached_context(context, pages)
+
+    def _detach_context_if_done(self, context: BrowserContext) -> Optional[List[Page]]:
+        """
+        Unindex ``context`` if it should be closed, so no new tab is placed in it. Returns the tabs
+        it still had, or None if it stays open. Call with context_management_lock held.
+        """
+        if not self._should_close_context(context):
+            return None
+        return self._unindex_context(context)
 
-        async with self.context_management_lock:
-            self.context_to_tabs[context].remove(page)
-            await page.close()
+    def _should_close_context(self, context: BrowserContext) -> bool:
+        """
+        A context is closed once it has no tabs left and either it is being drained or
+        its proxy still has other contexts.
+        """
+        if self.context_to_tabs.get(context) or context not in self.context_to_proxy:
+            return False
+        if context in self.draining_contexts:
+            return True
+        return len(self.proxy_to_contexts[self.context_to_proxy_key[context]]) > 1
 
-            # If context is now empty and we have more contexts for this proxy than needed, close it
-            proxy_key = self._proxy_to_key(self.context_to_proxy[context])
-            if (not self.context_to_tabs[context] and
-                    len(self.proxy_to_contexts[proxy_key]) > 1):
-                self.logger.info("Context empty. Closing context...")
-                await self.close_context(context)
+    def _forget_tab(self, page: Page) -> None:
+        """Drop the lifetime and recycling bookkeeping of a tab."""
+        self.tab_created_at.pop(page, None)
+        self.recycle_handlers.pop(page, None)
 
-                stats = self.get_context_stats()
-                self.debug_ui.update_context_stats_widget(stats['total_tabs'],stats['avg_tabs_per_proxy'])
+    def register_recycle_handler(self, page: Page, handler: Callable[[], Awaitable[None]]) -> None:
+        """
+        Register how a tab can be replaced. The handler must bring up a replacement before
+        closing ``page`` so that recycling never leaves a gap in coverage.
+        """
+        if page in self.page_to_context:
+            self.recycle_handlers[page] = handler
 
-    async def close_context(self, context: BrowserContext) -> None:
-        """Close a browser context and clean up tracking."""
-        if context not in self.context_to_proxy:
-            self.logger.error("Context not managed by this ProxyManager. Probably already closed")
-            return
+    def can_recycle(self, page: Page) -> bool:
+        return page in self.recycle_handlers
 
-        async with self.context_management_lock:
-            # Close all tabs in this context first
-            for page in self.context_to_tabs[context][:]:
-                await page.close()
+    async def recycle_tab(self, page: Page) -> bool:
+        """Replace a tab through its registered handler. Returns False if the tab can't be recycled."""
+        handler = self.recycle_handlers.pop(page, None)
+        if handler is None:
+            return False
+        await handler()
+        return True
 
-            # Clean up tracking
-            proxy = self.context_to_proxy[context]
+    def drain_context(self, context: BrowserContext) -> None:
+        """
+        Stop placing new tabs in ``context``. It is closed as soon as its last tab is
+        recycled or closed.
+        """
+        if context in self.context_to_proxy:
+            self.logger.info("Draining context")
+            self.draining_contexts.add(context)
+            self.contexts_by_load[len(self.context_to_tabs[context])].pop(context, None)
+            # Warm tabs would keep the context alive forever
+            for page in list(self.warm_tabs):
+                if self.page_to_context.get(page) is context:
+                    self.warm_tabs.remove(page)
+                    asyncio.create_task(self.close_tab(page))
+
+    def add_proxies(self, proxies: List[Dict[str, str]]) -> None:
+        """Take over proxies from another browser. They are used once the prober has checked them."""
+        for proxy in proxies:
             proxy_key = self._proxy_to_key(proxy)
-            self.proxy_to_contexts[proxy_key].remove(context)
-            del self.context_to_proxy[context]
-            del self.context_to_tabs[context]
-
-            stats = self.get_context_stats()
-            self.debug_ui.update_context_stats_widget(stats['total_tabs'],stats['avg_tabs_per_proxy'])
+            if proxy in self.proxies:
+                continue
+            self.proxies.append(proxy)
+            self.proxy_to_contexts.setdefault(proxy_key, [])
+            if not self.proxy_to_contexts[proxy_key]:
+                self.idle_proxies[proxy_key] = proxy
+
+    def remove_proxies(self, proxies: List[Dict[str, str]]) -> None:
+        """
+        Hand proxies over to another browser. Their contexts are drained, so the tabs on them
+        keep running until they are recycled.
+        """
+        for proxy in proxies:
+            if proxy not in self.proxies:
+                continue
+            proxy_key = self._proxy_to_key(proxy)
+            self.proxies.remove(proxy)
+            self.idle_proxies.pop(proxy_key, None)
+            for context in list(self.proxy_to_contexts.get(proxy_key, [])):
+                self.drain_context(context)
 
+    async def close_context(self, context: BrowserContext) -> None:
+        """Close a browser context and clean up tracking."""
+        async with self.context_management_lock:
+            if context not in self.context_to_proxy:
+                self.logger.error("Context not managed by this ProxyManager. Probably already closed")
+                return
+            pages = self._unindex_context(context)
+
+        self._publish_stats()
+        await self._close_detached_context(context, pages)
+
+    def close(self) -> None:
+        """Stop the background tasks of this ProxyManager. Called when its browser is gone or retired."""
+        if self.health_prober.task is not None:
+            self.health_prober.task.cancel()
+        if self.refill_task is not None:
+            self.refill_task.cancel()
+
+    async def _close_detached_context(self, context: BrowserContext, pages: List[Page]) -> None:
+        """Close an already unindexed context, all tabs first."""
+        for page in pages:
+            await page.close()
         await context.close()
         self.logger.info("Context closed")
 
-    async def check_proxy(self, proxy: Dict[str, str]) -> bool:
-        try:
-            proxy_url = f"http://{proxy['username']}:{proxy['password']}@{proxy['server'][7:]}"
-            async with httpx.AsyncClient(proxy=proxy_url, timeout=5) as client:
-                response = await client.get("https://api.ipify.org/?format=json")
-                async with self.proxy_assignment_lock:
-                    self.proxies_being_assigned.discard(self._proxy_to_key(proxy))
-                if response.status_code == 200:
-                    self.logger.info(f"Proxy {proxy['server']} is working. IP: {response.json().get('ip')}")
-                    return True
-                else:
-                    return False
-            return True
-        except Exception as e:
-            async with self.proxy_assignment_lock:
-                self.proxies_being_assigned.discard(self._proxy_to_key(proxy))
-            self.logger.warning(f"Proxy check failed for {proxy['server']}: {e}")
-            return False
-
     def _get_context_for_page(self, page: Page) -> Optional[BrowserContext]:
         """
         Given a Playwright Page, return its corresponding BrowserContext.
@@ -314,27 +520,16 @@ class ProxyManager:
         Returns:
             The BrowserContext associated with the Page, or None if not found.
         """
-        for context, tabs in self.context_to_tabs.items():
-            if page in tabs:
-                return context
-        return None
+        return self.page_to_context.get(page)
 
     def get_context_stats(self) -> Dict[str, Dict]:
-        """Get statistics about all contexts."""
-        proxy_to_tab_counts = defaultdict(int)
-
-        for context, proxy in self.context_to_proxy.items():
-            proxy_key = self._proxy_to_key(proxy)
-            proxy_to_tab_counts[proxy_key] += len(self.context_to_tabs[context])
-
-
-        total_tabs = sum(proxy_to_tab_counts.values())
+        """Get statistics about all contexts. Counters are maintained as tabs come and go."""
         avg_tabs_per_proxy = (
-            total_tabs / len(proxy_to_tab_counts) if proxy_to_tab_counts else 0
+            self.total_tabs / len(self.proxy_tab_counts) if self.proxy_tab_counts else 0
         )
 
         return {
-            "total_tabs": total_tabs,
+            "total_tabs": self.total_tabs,
             "avg_tabs_per_proxy": avg_tabs_per_proxy,
         }
     def check_context_status(self, tab: Page):
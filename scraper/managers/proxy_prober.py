@@ -0,0 +1,119 @@
+import asyncio
+import time
+from dataclasses import dataclass
+from os import getenv
+from typing import Dict, List, Optional
+
+import httpx
+from dotenv import load_dotenv
+
+import utils.logger as logger
+
+load_dotenv(override=True)
+
+PROXY_CHECK_URL = "https://api.ipify.org/?format=json"
+# How long a probe result is trusted before the proxy is checked again
+PROXY_HEALTH_TTL = float(getenv("PROXY_HEALTH_TTL", 300))
+PROXY_PROBE_CONCURRENCY = int(getenv("PROXY_PROBE_CONCURRENCY", 20))
+PROXY_PROBE_TIMEOUT = float(getenv("PROXY_PROBE_TIMEOUT", 5))
+# Stands in for a proxy to connect without one, e.g. to a local test site
+DIRECT_PROXY = {"server": "direct"}
+
+
+@dataclass
+class ProxyHealth:
+    healthy: bool
+    latency: float  # seconds, inf when the proxy failed
+    checked_at: float
+
+
+class ProxyHealthProber:
+    def __init__(self, proxies: List[Dict[str, str]]):
+        """
+        Checks proxies in the background and caches their health and latency, so that picking
+        a proxy never waits on the network.
+
+        Args:
+            proxies: Proxy dictionaries in the same format ProxyManager uses. The list is shared,
+                     proxies added to it later are picked up on the next round
+        """
+        self.proxies = proxies
+        self.health: Dict[tuple, ProxyHealth] = {}
+        self.semaphore = asyncio.Semaphore(PROXY_PROBE_CONCURRENCY)
+        self.probe_event = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+        self.logger = logger.setup_logger("ProxyHealthProber")
+        self.logger.propagate = False
+
+    @staticmethod
+    def _key(proxy: Dict[str, str]) -> tuple:
+        return (proxy["server"], proxy.get("username"), proxy.get("password"))
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run(), name="proxy_health_prober")
+
+    async def run(self):
+        while True:
+            now = time.monotonic()
+            stale = [
+                proxy for proxy in list(self.proxies)
+                if self._key(proxy) not in self.health
+                or now - self.health[self._key(proxy)].checked_at > PROXY_HEALTH_TTL
+            ]
+            if stale:
+                await asyncio.gather(*(self.probe(proxy) for proxy in stale))
+                healthy = sum(1 for health in self.health.values() if health.healthy)
+                self.logger.info(f"Probed {len(stale)} proxies. {healthy}/{len(self.proxies)} healthy")
+            await asyncio.sleep(min(PROXY_HEALTH_TTL / 4, 30))
+
+    async def probe(self, proxy: Dict[str, str]) -> ProxyHealth:
+        async with self.semaphore:
+            started = time.monotonic()
+            try:
+                if proxy["server"] == DIRECT_PROXY["server"]:
+                    healthy = True
+                else:
+                    proxy_url = f"http://{proxy['username']}:{proxy['password']}@{proxy['server'][7:]}"
+                    async with httpx.AsyncClient(proxy=proxy_url, timeout=PROXY_PROBE_TIMEOUT) as client:
+                        response = await client.get(PROXY_CHECK_URL)
+                    healthy = response.status_code == 200
+            except Exception as e:
+                self.logger.warning(f"Proxy check failed for {proxy['server']}: {e}")
+                healthy = False
+
+            finished = time.monotonic()
+            health = ProxyHealth(
+                healthy=healthy,
+                latency=finished - started if healthy else float("inf"),
+                checked_at=finished,
+            )
+            self.health[self._key(proxy)] = health
+            self.probe_event.set()
+            return health
+
+    def is_healthy(self, proxy: Dict[str, str]) -> bool:
+        health = self.health.get(self._key(proxy))
+        return bool(health and health.healthy)
+
+    def mark_unhealthy(self, proxy: Dict[str, str]) -> None:
+        """Record a failure seen outside of probing. The proxy is retried once its entry goes stale."""
+        self.health[self._key(proxy)] = ProxyHealth(healthy=False, latency=float("inf"), checked_at=time.monotonic())
+
+    def fastest(self, proxies: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """The healthy proxies among ``proxies``, fastest first."""
+        healthy = [proxy for proxy in proxies if self.is_healthy(proxy)]
+        return sorted(healthy, key=lambda proxy: self.health[self._key(proxy)].latency)
+
+    def unprobed(self, proxies: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        return [proxy for proxy in proxies if self._key(proxy) not in self.health]
+
+    async def wait_for_probe(self, timeout: float) -> None:
+        """Wait until the next probe finishes, or for ``timeout`` seconds."""
+        self.start()
+        self.probe_event.clear()
+        try:
+            await asyncio.wait_for(self.probe_event.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
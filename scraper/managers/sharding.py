@@ -0,0 +1,121 @@
+import bisect
+import hashlib
+import math
+from typing import Dict, Hashable, Iterable, List, Optional
+
+
+# Virtual nodes per node. More of them spread keys more evenly over the ring
+DEFAULT_VNODES = 128
+# A node never takes more than this many times its fair share of the total weight
+DEFAULT_LOAD_FACTOR = 1.1
+
+
+def stable_hash(key: str) -> int:
+    """Same value in every process and on every run, unlike hash()."""
+    return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+class ConsistentHashRing:
+    def __init__(self, nodes: Iterable[str] = (), vnodes: int = DEFAULT_VNODES,
+                 load_factor: float = DEFAULT_LOAD_FACTOR):
+        """
+        Consistent hashing with bounded loads. Keys are placed on the first node clockwise from
+        their hash that still has room, so adding or removing a node only moves the keys that
+        node gains or loses, and the few that no longer fit under the new bound, while no node
+        goes over ``load_factor`` times the average weight.
+
+        Args:
+            nodes: Initial node names
+            vnodes: Points each node gets on the ring
+            load_factor: Upper bound on a node's weight relative to the average
+        """
+        self.vnodes = vnodes
+        self.load_factor = load_factor
+        self._points: List[int] = []
+        self._owners: Dict[int, str] = {}
+        self.nodes: List[str] = []
+        for node in nodes:
+            self.add_node(node)
+
+    def add_node(self, node: str) -> None:
+        if node in self.nodes:
+            return
+        self.nodes.append(node)
+        for replica in range(self.vnodes):
+            point = stable_hash(f"{node}#{replica}")
+            self._owners[point] = node
+            bisect.insort(self._points, point)
+
+    def remove_node(self, node: str) -> None:
+        if node not in self.nodes:
+            return
+        self.nodes.remove(node)
+        self._points = [point for point in self._points if self._owners[point] != node]
+        self._owners = {point: owner for point, owner in self._owners.items() if owner != node}
+
+    def _walk(self, key: str):
+        """Distinct nodes in ring order, starting from the position of ``key``."""
+        if not self._points:
+            return
+        start = bisect.bisect(self._points, stable_hash(key))
+        seen = set()
+        for offset in range(len(self._points)):
+            node = self._owners[self._points[(start + offset) % len(self._points)]]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == len(self.nodes):
+                    return
+
+    def lookup(self, key: str) -> Optional[str]:
+        """Owner of ``key`` ignoring load."""
+        return next(self._walk(key), None)
+
+    def assign(self, weights: Dict[Hashable, float],
+               current: Optional[Dict[Hashable, str]] = None) -> Dict[str, List[Hashable]]:
+        """
+        Place every key on a node, keeping each node under its bounded load.
+
+        Args:
+            weights: Key -> expected cost of the key (e.g. number of sections of an event)
+            current: Key -> node it is on now. Keys stay where they are as long as their node
+                     still exists and has room, so only keys of removed or overloaded nodes move
+
+        Returns:
+            Node -> keys placed on it. Every node is present, possibly with no keys
+        """
+        assignment: Dict[str, List[Hashable]] = {node: [] for node in self.nodes}
+        if not self.nodes or not weights:
+            return assignment
+
+        total = sum(weights.values())
+        capacity = max(self.load_factor * total / len(self.nodes), max(weights.values()))
+        loads = {node: 0.0 for node in self.nodes}
+        current = current or {}
+
+        def fits(node: str, weight: float) -> bool:
+            return loads[node] + weight <= capacity or math.isclose(loads[node] + weight, capacity)
+
+        # Heaviest first so large keys still find room. Ties are broken by key so every process agrees
+        ordered = sorted(weights, key=lambda k: (-weights[k], str(k)))
+
+        # Keys that can stay where they are go first, so keys that have to move never push them out
+        placed = set()
+        for key in ordered:
+            node = current.get(key)
+            if node in loads and fits(node, weights[key]):
+                loads[node] += weights[key]
+                assignment[node].append(key)
+                placed.add(key)
+
+        for key in ordered:
+            if key in placed:
+                continue
+            weight = weights[key]
+            owner = next((node for node in self._walk(str(key)) if fits(node, weight)), None)
+            if owner is None:
+                owner = min(loads, key=loads.get)
+            loads[owner] += weight
+            assignment[owner].append(key)
+
+        return assignment
@@ -0,0 +1,273 @@
+import asyncio
+import json
+import multiprocessing
+import os
+import queue
+import signal
+import time
+from dataclasses import dataclass, field
+from os import getenv
+from typing import Dict, List, Optional
+
+from dotenv import load_dotenv
+
+from scraper.managers.lease_client import default_scraper_id
+from scraper.managers.proxy_prober import DIRECT_PROXY
+from scraper.managers.sharding import ConsistentHashRing
+from utils.logger import setup_logger
+
+load_dotenv(override=True)
+
+# Seconds between two heartbeats of a worker
+HEARTBEAT_INTERVAL = float(getenv("WORKER_HEARTBEAT_INTERVAL", 10))
+# A worker that hasn't sent a heartbeat for this long is killed and restarted
+HEARTBEAT_TIMEOUT = float(getenv("WORKER_HEARTBEAT_TIMEOUT", 120))
+# Minimum seconds between two restarts of the same worker
+RESTART_BACKOFF = float(getenv("WORKER_RESTART_BACKOFF", 30))
+STATUS_INTERVAL = 60
+STATUS_FILE = "./logs/workers_status.json"
+
+
+def _run_worker(worker_id: str, events: Optional[Dict[str, str]], proxies: List[Dict[str, str]],
+                max_browsers: int, events_per_browser: int, status_queue: multiprocessing.Queue,
+                scraper_id: str):
+    """Entry point of a worker process. Runs its own event loop, browsers and proxy slice."""
+    # Each worker writes and rotates its own log files
+    os.environ["LOG_FILE_SUFFIX"] = worker_id
+    try:
+        asyncio.run(_worker_main(worker_id, events, proxies, max_browsers, events_per_browser, status_queue, scraper_id))
+    except asyncio.CancelledError:
+        # Stopped by the coordinator. The leases were released on the way out
+        pass
+
+
+async def _worker_main(worker_id: str, events: Optional[Dict[str, str]], proxies: List[Dict[str, str]],
+                       max_browsers: int, events_per_browser: int, status_queue: multiprocessing.Queue,
+                       scraper_id: str):
+    # Imported here so importing the coordinator doesn't pull in playwright
+    from scraper.managers.browser_manager import BrowserManager
+    from utils.headless_ui import HeadlessUI
+    from utils.profiling import install_profiler
+
+    profiler = install_profiler(f"scraper-{worker_id}")
+    profiler.watch_loop()
+    # The coordinator stops workers with SIGTERM. Cancelling the main task runs the shutdown below,
+    # so the worker's event leases are released instead of waiting out their TTL
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+    except NotImplementedError:  # Windows
+        pass
+    manager = BrowserManager(max_browsers=max_browsers, events_per_browser=events_per_browser,
+                             events=events, proxies=proxies, debug_ui=HeadlessUI(), scraper_id=scraper_id)
+    try:
+        await manager.initialize()
+
+        while True:
+            status_queue.put({"worker": worker_id, "time": time.time(), **manager.status()})
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+    finally:
+        await manager.shutdown()
+
+
+@dataclass
+class WorkerState:
+    worker_id: str
+    process: Optional[multiprocessing.Process] = None
+    events: Dict[str, str] = field(default_factory=dict)
+    proxies: List[Dict[str, str]] = field(default_factory=list)
+    started_at: float = 0.0
+    last_heartbeat: float = 0.0
+    restarts: int = 0
+    status: dict = field(default_factory=dict)
+
+
+class WorkerCoordinator:
+    def __init__(self, num_workers: int, events: Optional[Dict[str, str]], proxies: List[Dict[str, str]],
+                 max_browsers: int = 1, events_per_browser: int = 50):
+        """
+        Runs the scraper in ``num_workers`` processes so the Python side of the scraper can use
+        more than one core. Each worker owns its own browsers, proxy slice and event shard.
+        The coordinator assigns shards, watches heartbeats, restarts dead or stuck workers and
+        aggregates their status.
+
+        Args:
+            num_workers: Number of worker processes
+            events: Event url -> webhook url for all workers. None lets each worker lease its own
+                    events from the backend
+            proxies: All proxies. Each proxy is used by exactly one worker, except the direct
+                     connection, which every worker gets. With fewer proxies than workers, only
+                     as many workers as there are proxies are started
+            max_browsers: Browsers per worker
+            events_per_browser: Passed on to each worker's BrowserManager
+        """
+        self.max_browsers = max_browsers
+        self.events_per_browser = events_per_browser
+        self.leasing = events is None
+        self.events = events or {}
+        self.scraper_id = default_scraper_id()
+        self.proxies = proxies
+
+        self.logger = setup_logger("WorkerCoordinator", logfile='./logs/browser_manager.log')
+        self.logger.propagate = False
+
+        sharded_proxies = [proxy for proxy in proxies if proxy["server"] != DIRECT_PROXY["server"]]
+        if len(sharded_proxies) == len(proxies) and len(proxies) < num_workers:
+            # A worker without proxies couldn't open a single tab
+            self.logger.warning(f"Only {len(sharded_proxies)} proxies for {num_workers} workers. "
+                                f"Starting {max(1, len(sharded_proxies))} workers")
+            num_workers = max(1, len(sharded_proxies))
+        # spawn rather than fork: playwright and asyncio state must not be inherited
+        self.mp_context = multiprocessing.get_context("spawn")
+        self.status_queue = self.mp_context.Queue()
+        self.workers: Dict[str, WorkerState] = {
+            f"worker-{i}": WorkerState(worker_id=f"worker-{i}") for i in range(num_workers)
+        }
+        self.running = False
+
+        self._assign_shards()
+
+    @staticmethod
+    def _proxy_key(proxy: Dict[str, str]) -> tuple:
+        return (proxy["server"], proxy.get("username"), proxy.get("password"))
+
+    def _assign_shards(self):
+        ring = ConsistentHashRing(self.workers)
+        # Section counts aren't known before the workers have read the event pages, so events weigh the same
+        weights = {event_url: 1 for event_url in self.events}
+        event_plan = ring.assign(weights)
+        # A direct connection isn't a limited resource. Every worker gets it
+        shared = [proxy for proxy in self.proxies if proxy["server"] == DIRECT_PROXY["server"]]
+        proxies_by_key = {self._proxy_key(proxy): proxy for proxy in self.proxies if proxy not in shared}
+        proxy_plan = ring.assign({key: 1 for key in proxies_by_key})
+        # The load bound doesn't promise every worker a proxy. Hand one over from the busiest
+        for keys in proxy_plan.values():
+            busiest = max(proxy_plan.values(), key=len)
+            if not keys and len(busiest) > 1:
+                keys.append(busiest.pop())
+
+        for worker_id, worker in self.workers.items():
+            worker.events = {event_url: self.events[event_url] for event_url in event_plan[worker_id]}
+            worker.proxies = [proxies_by_key[key] for key in proxy_plan[worker_id]] + [dict(proxy) for proxy in shared]
+            self.logger.info(f"{worker_id}: {len(worker.events)} events, {len(worker.proxies)} proxies")
+
+    def _start_worker(self, worker: WorkerState):
+        worker.process = self.mp_context.Process(
+            target=_run_worker,
+            args=(worker.worker_id, None if self.leasing else worker.events, worker.proxies,
+                  self.max_browsers, self.events_per_browser, self.status_queue,
+                  f"{self.scraper_id}-{worker.worker_id}"),
+            name=worker.worker_id,
+            daemon=False,
+        )
+        worker.process.start()
+        worker.started_at = time.monotonic()
+        # Startup gets a full timeout before the first heartbeat is due
+        worker.last_heartbeat = worker.started_at
+        self.logger.info(f"Started {worker.worker_id} (pid {worker.process.pid})")
+
+    def _stop_worker(self, worker: WorkerState):
+        if worker.process is None:
+            return
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(10)
+            if worker.process.is_alive():
+                worker.process.kill()
+                worker.process.join()
+        worker.process = None
+
+    def _check_workers(self):
+        now = time.monotonic()
+        for worker in self.workers.values():
+            if not worker.events and not self.leasing:
+                continue
+            alive = worker.process is not None and worker.process.is_alive()
+            stuck = alive and now - worker.last_heartbeat > HEARTBEAT_TIMEOUT
+            if alive and not stuck:
+                continue
+            if now - worker.started_at < RESTART_BACKOFF:
+                continue
+
+            if stuck:
+                self.logger.error(f"{worker.worker_id} missed its heartbeats for {now - worker.last_heartbeat:.0f}s. Restarting")
+            else:
+                exitcode = worker.process.exitcode if worker.process else None
+                self.logger.error(f"{worker.worker_id} died (exit code {exitcode}). Restarting")
+            self._stop_worker(worker)
+            worker.restarts += 1
+            # Same shard, so no other worker is disturbed
+            self._start_worker(worker)
+
+    def _drain_heartbeats(self, timeout: float):
+        try:
+            heartbeat = self.status_queue.get(timeout=timeout)
+        except queue.Empty:
+            return
+        while True:
+            worker = self.workers.get(heartbeat.pop("worker", None))
+            if worker is not None:
+                worker.last_heartbeat = time.monotonic()
+                worker.status = heartbeat
+            try:
+                heartbeat = self.status_queue.get_nowait()
+            except queue.Empty:
+                return
+
+    def aggregate_status(self) -> dict:
+        """Totals over all workers, plus each worker's last heartbeat."""
+        statuses = [worker.status for worker in self.workers.values()]
+        return {
+            "workers": len(self.workers),
+            "workers_alive": sum(1 for w in self.workers.values() if w.process is not None and w.process.is_alive()),
+            "browsers": sum(status.get("browsers", 0) for status in statuses),
+            "events": sum(status.get("events", 0) for status in statuses),
+            "events_loaded": sum(status.get("events_loaded", 0) for status in statuses),
+            "sections": sum(status.get("sections", 0) for status in statuses),
+            "tabs": sum(status.get("tabs", 0) for status in statuses),
+            "restarts": sum(w.restarts for w in self.workers.values()),
+            "per_worker": {
+                worker_id: {
+                    "pid": worker.process.pid if worker.process else None,
+                    "events": len(worker.events),
+                    "proxies": len(worker.proxies),
+                    "restarts": worker.restarts,
+                    "heartbeat_age": round(time.monotonic() - worker.last_heartbeat, 1),
+                    **worker.status,
+                }
+                for worker_id, worker in self.workers.items()
+            },
+        }
+
+    def _publish_status(self):
+        status = self.aggregate_status()
+        self.logger.info(
+            f"{status['workers_alive']}/{status['workers']} workers alive. {status['events_loaded']}/{status['events']} events "
+            f"loaded, {status['sections']} sections, {status['tabs']} tabs, {status['browsers']} browsers"
+        )
+        with open(STATUS_FILE, "w") as status_file:
+            json.dump(status, status_file, indent=2)
+
+    def run(self):
+        """Start all workers and supervise them until interrupted."""
+        self.running = True
+        for worker in self.workers.values():
+            if worker.events or self.leasing:
+                self._start_worker(worker)
+
+        last_status = time.monotonic()
+        try:
+            while self.running:
+                self._drain_heartbeats(timeout=1)
+                self._check_workers()
+                if time.monotonic() - last_status > STATUS_INTERVAL:
+                    self._publish_status()
+                    last_status = time.monotonic()
+        except KeyboardInterrupt:
+            self.logger.info("Interrupted. Stopping workers...")
+        finally:
+            self.stop()
+
+    def stop(self):
+        self.running = False
+        for worker in self.workers.values():
+            self._stop_worker(worker)
@@ -1,7 +1,10 @@
 import asyncio
+import glob
 import os
-import shutil
-from scraper.managers.browser_manager import BrowserManager
+from scraper.managers.browser_manager import BrowserManager, read_event_list, read_proxy_list
+from scraper.managers.worker_coordinator import WorkerCoordinator
+from scraper.managers.lease_client import EVENT_SOURCE
+from utils.profiling import install_profiler
 from dotenv import load_dotenv
 
 
@@ -9,24 +12,43 @@ load_dotenv(override=True)
 
 HEADLESS_MODE = True
 
-async def main():
-
-    # Housekeeping
-    for dirname in ["logs/browser_manager.log", "logs/logfile.log", ]:
-        if os.path.exists(dirname):
-            os.remove(dirname)
-    
-    if os.path.exists("fails"):
-        shutil.rmtree("fails")
-        os.makedirs("fails")
+def housekeeping():
+    # Rotated files and the files of worker processes included
+    for pattern in ["logs/browser_manager*.log*", "logs/logfile*.log*", ]:
+        for logfile in glob.glob(pattern):
+            os.remove(logfile)
 
 
-    manager = BrowserManager(max_browsers=1, events_per_browser=50)
-    await manager.initialize()
-    
-    # Keep main running while there are active tasks
-    while any(b.tasks for b in manager.active_browsers):
-        await asyncio.sleep(1)
+async def main():
+    housekeeping()
+    profiler = install_profiler("scraper")
+    profiler.watch_loop()
+    manager = BrowserManager(max_browsers=int(os.getenv("MAX_BROWSERS", 1)),
+                             events_per_browser=int(os.getenv("EVENTS_PER_BROWSER", 50)))
+    try:
+        await manager.initialize()
+
+        # Keep main running while there are active tasks
+        while any(b.tasks for b in manager.active_browsers) or manager.lease_client:
+            await asyncio.sleep(1)
+    finally:
+        await manager.shutdown()
+
+def run_workers(num_workers: int):
+    housekeeping()
+    coordinator = WorkerCoordinator(
+        num_workers,
+        read_event_list() if EVENT_SOURCE == "file" else None,
+        read_proxy_list(),
+        max_browsers=int(os.getenv("MAX_BROWSERS", 1)),
+        events_per_browser=int(os.getenv("EVENTS_PER_BROWSER", 50)),
+    )
+    coordinator.run()
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    # Several worker processes, each with its own browsers, when WORKERS > 1
+    num_workers = int(os.getenv("WORKERS", 1))
+    if num_workers > 1:
+        run_workers(num_workers)
+    else:
+        asyncio.run(main())
\ No newline at end of file
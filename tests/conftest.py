@@ -0,0 +1,42 @@
+import os
+import tempfile
+
+import pytest
+from dotenv import dotenv_values
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Backend modules read their settings when imported, which for some is while tests are collected.
+# So they're set before any test module is imported
+WORKDIR = tempfile.mkdtemp(prefix="backend_tests_")
+BACKEND_ENV = {
+    "DATABASE_URL": f"sqlite:///{os.path.join(WORKDIR, 'events.db')}",
+    "EVENT_LIST_PATH": os.path.join(WORKDIR, "event_list"),
+    "HISTORY": "False",
+    "HISTORY_DIR": os.path.join(WORKDIR, "history"),
+    "SHARED_STATE": "memory",
+    "BACKEND_WORKERS": "1",
+    "INGEST_RECORD_PATH": "",
+    "DEBUG": "True",
+}
+os.environ.update(BACKEND_ENV)
+open(BACKEND_ENV["EVENT_LIST_PATH"], "w").close()
+
+
+@pytest.fixture(scope="session")
+def backend_app():
+    """The backend app on a temporary database, imported once per test run."""
+    # The backend loads .env over the environment. It must not point the tests at a real database
+    overridden = set(BACKEND_ENV) & set(dotenv_values(os.path.join(ROOT, ".env")))
+    if overridden:
+        pytest.skip(f".env sets {', '.join(sorted(overridden))}")
+    from backend.backend_main import app
+    return app
+
+
+@pytest.fixture
+def client(backend_app):
+    from fastapi.testclient import TestClient
+
+    # Without the lifespan, so no dispatcher sends the alerts the tests cause
+    return TestClient(backend_app)
@@ -0,0 +1,67 @@
+import math
+import random
+from types import SimpleNamespace
+
+from backend.utils.alert_rules import SectionArrays
+
+
+def _section(rng):
+    """Rows with gaps in their seat indexes, seats out of order and some unparseable prices."""
+    rows = []
+    for row_index in range(rng.randint(1, 6)):
+        seat_indexes = sorted(rng.sample(range(40), rng.randint(0, 30)))
+        seats = [
+            SimpleNamespace(rowIndex=row_index, seatIndex=seat_index, row=f"R{row_index}", seat=str(seat_index + 1),
+                            isAvailable=rng.random() < 0.6,
+                            priceNum=rng.choice([45.0, 85.0, 120.0, "n/a"]))
+            for seat_index in seat_indexes
+        ]
+        rng.shuffle(seats)
+        rows.append(SimpleNamespace(seats=seats))
+    rng.shuffle(rows)
+    return rows
+
+
+def _price(seat):
+    try:
+        return float(seat.priceNum)
+    except (TypeError, ValueError):
+        return math.inf
+
+
+def _reference_runs(rows, max_price=None, min_length=1):
+    seats = sorted((seat for row in rows for seat in row.seats), key=lambda seat: (seat.rowIndex, seat.seatIndex))
+    runs, current, previous = [], [], None
+    for seat in seats:
+        counts = seat.isAvailable and (max_price is None or _price(seat) <= max_price)
+        adjacent = (previous is not None and seat.rowIndex == previous.rowIndex
+                    and seat.seatIndex == previous.seatIndex + 1)
+        if counts and current and adjacent:
+            current.append(seat)
+        else:
+            if current:
+                runs.append(current)
+            current = [seat] if counts else []
+        previous = seat
+    if current:
+        runs.append(current)
+    runs = [run for run in runs if len(run) >= min_length]
+    runs.sort(key=lambda run: -len(run))
+    return [(run[0].row, run[0].seat, run[-1].seat, len(run),
+             min(_price(seat) for seat in run), max(_price(seat) for seat in run)) for run in runs]
+
+
+def test_runs_match_reference():
+    rng = random.Random(0)
+    for _ in range(300):
+        rows = _section(rng)
+        arrays = SectionArrays.from_rows(rows)
+        for max_price, min_length in ((None, 1), (85.0, 1), (120.0, 3), (None, 4)):
+            runs = [(run.row, run.first_seat, run.last_seat, run.length, run.min_price, run.max_price)
+                    for run in arrays.runs(max_price, min_length)]
+            assert runs == _reference_runs(rows, max_price, min_length)
+
+
+def test_runs_of_empty_section():
+    assert SectionArrays.from_rows([]).runs() == []
+    assert SectionArrays.from_rows([SimpleNamespace(seats=[])]).runs(50.0, 2) == []
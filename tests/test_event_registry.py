@@ -0,0 +1,78 @@
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.utils.event_registry import claim_leases, load_event_list, release_leases, renew_leases
+from backend.utils.models import Base, EventLease
+
+URLS = [f"https://www.etix.com/ticket/p/{40000000 + i}/event" for i in range(40)]
+
+
+@pytest.fixture
+def sessions(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'events.db'}", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    event_list = tmp_path / "event_list"
+    event_list.write_text("".join(f"{url}@http://127.0.0.1:9/webhook\n" for url in URLS))
+    make_session = sessionmaker(bind=engine)
+    with make_session() as db:
+        assert load_event_list(db, str(event_list)) == len(URLS)
+    yield make_session
+    engine.dispose()
+
+
+def test_racing_claims_get_disjoint_events(sessions):
+    claimants = [f"scraper-{i}" for i in range(4)]
+    claimed = {}
+    start = threading.Barrier(len(claimants))
+
+    def claim(scraper_id):
+        with sessions() as db:
+            start.wait()
+            claimed[scraper_id] = {lease.url for lease in claim_leases(db, scraper_id, capacity=len(URLS))}
+
+    threads = [threading.Thread(target=claim, args=(scraper_id,)) for scraper_id in claimants]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for i, first in enumerate(claimants):
+        for second in claimants[i + 1:]:
+            assert not claimed[first] & claimed[second]
+    assert set().union(*claimed.values()) == set(URLS)
+    with sessions() as db:
+        owners = {lease.url: lease.owner for lease in db.query(EventLease)}
+    assert all(url in claimed[owners[url]] for url in URLS)
+
+
+def test_claimed_events_are_not_claimed_again(sessions):
+    with sessions() as db:
+        first = {lease.url for lease in claim_leases(db, "a", capacity=10)}
+        second = {lease.url for lease in claim_leases(db, "b", capacity=len(URLS))}
+    assert len(first) == 10
+    assert second == set(URLS) - first
+
+
+def test_expired_lease_can_be_reclaimed(sessions):
+    with sessions() as db:
+        expired = sorted(lease.url for lease in claim_leases(db, "a", capacity=len(URLS), ttl=-1))
+        taken_over = sorted(lease.url for lease in claim_leases(db, "b", capacity=len(URLS)))
+        assert taken_over == expired == sorted(URLS)
+        # The old owner lost it and can't renew or release it anymore
+        assert renew_leases(db, "a", expired) == []
+        assert release_leases(db, "a", expired) == 0
+        assert {lease.owner for lease in renew_leases(db, "b", expired)} == {"b"}
+
+
+def test_released_lease_is_free_again(sessions):
+    with sessions() as db:
+        urls = [lease.url for lease in claim_leases(db, "a", capacity=3)]
+        assert release_leases(db, "a", urls) == 3
+        lease = db.get(EventLease, urls[0])
+        db.refresh(lease)
+        assert lease.owner is None and lease.expires_at < time.time()
+        assert {lease.url for lease in claim_leases(db, "b", capacity=3)} == set(urls)
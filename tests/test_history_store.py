@@ -0,0 +1,43 @@
+import random
+from types import SimpleNamespace
+
+from backend.utils.history_store import decode_layout, decode_snapshot, encode_layout, encode_snapshot
+
+
+def _seats(count, price_levels, rng):
+    return [
+        SimpleNamespace(seatIdentifier=f"{i // 20}-{i % 20 + 1}", row=str(i // 20), seat=str(i % 20 + 1),
+                        isAvailable=rng.random() < 0.3, priceNum=rng.choice(price_levels))
+        for i in range(count)
+    ]
+
+
+def test_layout_round_trip():
+    seats = _seats(45, [50.0], random.Random(0))
+    assert decode_layout(encode_layout(seats)) == [[seat.seatIdentifier, seat.row, seat.seat] for seat in seats]
+
+
+def test_snapshot_round_trip():
+    rng = random.Random(1)
+    # Seat counts that do and don't fill the last availability byte
+    for count in (0, 1, 8, 13, 200):
+        seats = _seats(count, [45.0, 85.0, 120.0, 250.5], rng)
+        available, prices = decode_snapshot(encode_snapshot(seats))
+        assert available == [seat.isAvailable for seat in seats]
+        assert prices == [seat.priceNum for seat in seats]
+
+
+def test_snapshot_round_trip_with_many_prices():
+    # More than 256 distinct prices need two bytes per price level
+    rng = random.Random(2)
+    seats = _seats(600, [float(price) for price in range(300)], rng)
+    available, prices = decode_snapshot(encode_snapshot(seats))
+    assert available == [seat.isAvailable for seat in seats]
+    assert prices == [seat.priceNum for seat in seats]
+
+
+def test_snapshot_unparseable_price_is_zero():
+    seats = _seats(3, [10.0], random.Random(3))
+    seats[1].priceNum = "n/a"
+    _, prices = decode_snapshot(encode_snapshot(seats))
+    assert prices == [10.0, 0.0, 10.0]
@@ -0,0 +1,36 @@
+def _payload(event_id, sequence=None, available=True):
+    seat = {
+        "rowIndex": 0, "seatIndex": 0, "row": "A", "seat": "1", "seatIdentifier": "A-1",
+        "status": "O", "currentStatus": "O", "realStatus": "O", "isAvailable": available, "note": "",
+        "holdComment": "", "priceLevelId": "L1", "price": "$45.00", "priceNum": 45.0,
+        "priceCode": {"id": "1", "name": "Standard", "description": "Standard"},
+    }
+    payload = {"event_id": event_id, "section": "101", "rows": [{"row": "A", "seats": [seat]}]}
+    if sequence is not None:
+        payload["sequence"] = sequence
+    return payload
+
+
+def _create_event(client, event_id):
+    response = client.post("/create-event", json={
+        "url": f"https://www.etix.com/ticket/p/{event_id}/test-event",
+        "time": "2026-11-20T20:00:00",
+        "webhook_url": "http://127.0.0.1:9/test-webhook",
+    })
+    assert response.status_code == 200
+
+
+def test_ingest_rejects_stale_sequences(client):
+    _create_event(client, "31000001")
+    assert client.post("/ingest", json=_payload("31000001", 10)).status_code == 200
+    assert client.post("/ingest", json=_payload("31000001", 20)).status_code == 200
+    assert client.post("/ingest", json=_payload("31000001", 15)).status_code == 409
+    assert client.post("/ingest", json=_payload("31000001", 20)).status_code == 409
+    # Scrapers that don't number their payloads are never rejected
+    assert client.post("/ingest", json=_payload("31000001")).status_code == 200
+
+
+def test_unknown_event_does_not_take_a_sequence(client):
+    assert client.post("/ingest", json=_payload("31000002", 10)).status_code == 404
+    _create_event(client, "31000002")
+    assert client.post("/ingest", json=_payload("31000002", 5)).status_code == 200
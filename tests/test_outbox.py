@@ -0,0 +1,83 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.utils import outbox
+from backend.utils.models import Base, OutboxMessage
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+def _enqueue(db, webhook_url, count, start=0):
+    outbox.enqueue(db, webhook_url, [{"title": f"{webhook_url} {i}"} for i in range(start, start + count)])
+    db.commit()
+
+
+def _titles(batch):
+    return [message.embed for message in batch]
+
+
+def test_next_batch_is_oldest_first_per_webhook(db):
+    _enqueue(db, "a", 3)
+    _enqueue(db, "b", 2)
+    _enqueue(db, "a", 12, start=3)
+
+    batch = outbox.next_batch(db, "a")
+    assert len(batch) == outbox.OUTBOX_BATCH_SIZE
+    assert [message.id for message in batch] == sorted(message.id for message in batch)
+    assert _titles(batch) == [f'{{"title": "a {i}"}}' for i in range(outbox.OUTBOX_BATCH_SIZE)]
+    assert _titles(outbox.next_batch(db, "b")) == ['{"title": "b 0"}', '{"title": "b 1"}']
+
+    outbox.delivered(db, [message.id for message in batch])
+    assert _titles(outbox.next_batch(db, "a")) == [f'{{"title": "a {i}"}}' for i in range(10, 15)]
+
+
+def test_next_batch_waits_for_the_oldest_retry(db, monkeypatch):
+    _enqueue(db, "a", 4)
+    first = outbox.next_batch(db, "a")[:2]
+    assert outbox.failed(db, [message.id for message in first], attempts=1)
+    # Nothing goes out before the oldest message, so the webhook's messages stay in order
+    assert outbox.next_batch(db, "a") == []
+
+    monkeypatch.setattr(outbox.time, "time", lambda: first[0].next_attempt_at + 1)
+    db.expire_all()
+    # Once due, the retried messages go first, followed by the newer ones
+    assert _titles(outbox.next_batch(db, "a")) == [f'{{"title": "a {i}"}}' for i in range(4)]
+
+
+def test_next_batch_stops_at_a_message_waiting_for_its_retry(db):
+    _enqueue(db, "a", 5)
+    messages = outbox.next_batch(db, "a")
+    assert outbox.failed(db, [messages[2].id], attempts=1)
+    db.expire_all()
+    # The messages after it wait with it, so none of them overtakes it
+    assert [message.id for message in outbox.next_batch(db, "a")] == [message.id for message in messages[:2]]
+
+
+def test_failed_backs_off_exponentially(db, monkeypatch):
+    monkeypatch.setattr(outbox.time, "time", lambda: 1000.0)
+    _enqueue(db, "a", 1)
+    message_id = outbox.next_batch(db, "a")[0].id
+
+    for attempts in range(1, outbox.OUTBOX_MAX_ATTEMPTS):
+        assert outbox.failed(db, [message_id], attempts)
+        message = db.get(OutboxMessage, message_id)
+        db.refresh(message)
+        expected = min(outbox.OUTBOX_RETRY_DELAY * 2 ** (attempts - 1), outbox.OUTBOX_MAX_RETRY_DELAY)
+        assert message.attempts == attempts
+        assert message.next_attempt_at == pytest.approx(1000.0 + expected)
+
+
+def test_failed_drops_after_max_attempts(db):
+    _enqueue(db, "a", 1)
+    message_id = outbox.next_batch(db, "a")[0].id
+    assert not outbox.failed(db, [message_id], outbox.OUTBOX_MAX_ATTEMPTS)
+    assert db.get(OutboxMessage, message_id) is None
+    assert outbox.pending_webhooks(db) == []
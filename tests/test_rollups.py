@@ -0,0 +1,98 @@
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+
+from backend.utils.models import Base
+from backend.utils.rollups import HOUR, MINUTE, query_rollups, section_stats, upsert_rollups
+
+HOUR_START = 1_800_000_000 // HOUR * HOUR
+
+
+@pytest.fixture
+def db():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    with sessionmaker(bind=engine)() as session:
+        yield session
+    engine.dispose()
+
+
+def _rows(availability, prices=None):
+    """One row per string, "x" for an available seat and "." for a sold one."""
+    prices = prices or {}
+    return [
+        SimpleNamespace(row=f"R{r}", seats=[
+            SimpleNamespace(rowIndex=r, seatIndex=s, row=f"R{r}", seat=str(s + 1), isAvailable=mark == "x",
+                            priceNum=prices.get((r, s), 50.0))
+            for s, mark in enumerate(row)
+        ])
+        for r, row in enumerate(availability)
+    ]
+
+
+def test_section_stats():
+    assert section_stats(_rows(["xx.xxx", "x..x.."], {(1, 3): 20.0, (0, 2): 5.0})) == (7, 20.0, 3)
+    assert section_stats(_rows(["...", "..."])) == (0, None, 0)
+    assert section_stats([]) == (0, None, 0)
+
+
+def test_scrapes_in_one_minute_fold_into_one_bucket(db):
+    upsert_rollups(db, "e", "101", _rows(["xxxx"]), HOUR_START + 5)
+    upsert_rollups(db, "e", "101", _rows(["x.x."], {(0, 2): 30.0}), HOUR_START + 20)
+    upsert_rollups(db, "e", "101", _rows(["xxx."]), HOUR_START + 50)
+    db.commit()
+
+    _, (bucket,) = query_rollups(db, "e", HOUR_START, HOUR_START + MINUTE - 1, "minute")
+    assert bucket.bucket_start == HOUR_START
+    assert (bucket.available_first, bucket.available_last, bucket.available_min, bucket.available_max) == (4, 3, 2, 4)
+    assert bucket.min_price == 30.0
+    assert bucket.max_block == 4
+    assert bucket.samples == 3
+
+
+def test_hour_bucket_rolls_up_its_minutes(db):
+    upsert_rollups(db, "e", "101", _rows(["xx.."]), HOUR_START + 10)
+    upsert_rollups(db, "e", "101", _rows(["...."]), HOUR_START + 2 * MINUTE)
+    upsert_rollups(db, "e", "101", _rows(["xxx."], {(0, 1): 10.0}), HOUR_START + 59 * MINUTE)
+    upsert_rollups(db, "e", "101", _rows(["xxxx"]), HOUR_START + HOUR)
+    db.commit()
+
+    seconds, minutes = query_rollups(db, "e", HOUR_START, HOUR_START + HOUR - 1, "minute")
+    assert seconds == MINUTE
+    assert [bucket.bucket_start for bucket in minutes] == [HOUR_START, HOUR_START + 2 * MINUTE, HOUR_START + 59 * MINUTE]
+
+    seconds, (hour, next_hour) = query_rollups(db, "e", HOUR_START, HOUR_START + HOUR, "hour")
+    assert seconds == HOUR
+    assert (hour.available_first, hour.available_last, hour.available_min, hour.available_max) == (2, 3, 0, 3)
+    # Nothing was available in one scrape. That doesn't hide the cheapest price of the others
+    assert hour.min_price == 10.0
+    assert hour.max_block == 3
+    assert hour.samples == 3
+    assert (next_hour.bucket_start, next_hour.samples, next_hour.available_last) == (HOUR_START + HOUR, 1, 4)
+
+
+def test_rollups_endpoint(client):
+    client.post("/create-event", json={"url": "https://www.etix.com/ticket/p/32000001/test-event",
+                                       "time": "2026-11-20T20:00:00", "webhook_url": "http://127.0.0.1:9/test-webhook"})
+    for offset, available in ((5, [True, True]), (MINUTE + 5, [True, False])):
+        seats = [{
+            "rowIndex": 0, "seatIndex": s, "row": "A", "seat": str(s + 1), "seatIdentifier": f"A-{s + 1}",
+            "status": "O", "currentStatus": "O", "realStatus": "O", "isAvailable": is_available, "note": "",
+            "holdComment": "", "priceLevelId": "L1", "price": "$45.00", "priceNum": 45.0, "priceCode": {},
+        } for s, is_available in enumerate(available)]
+        response = client.post("/ingest", json={"event_id": "32000001", "section": "101", "scraped_at": HOUR_START + offset,
+                                                "rows": [{"row": "A", "seats": seats}]})
+        assert response.status_code == 200
+
+    params = {"start": HOUR_START, "end": HOUR_START + HOUR - 1}
+    minutes = client.get("/rollups/32000001", params={**params, "resolution": "minute"}).json()
+    assert minutes["resolution"] == MINUTE
+    assert minutes["sections"]["101"]["time"] == [HOUR_START, HOUR_START + MINUTE]
+    assert minutes["sections"]["101"]["available_last"] == [2, 1]
+
+    hours = client.get("/rollups/32000001", params={**params, "resolution": "hour"}).json()
+    assert hours["sections"]["101"]["samples"] == [2]
+    assert hours["sections"]["101"]["max_block"] == [2]
+    assert client.get("/rollups/32000001", params={"resolution": "day"}).status_code == 422
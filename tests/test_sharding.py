@@ -0,0 +1,75 @@
+import math
+import random
+
+from scraper.managers.sharding import DEFAULT_LOAD_FACTOR, ConsistentHashRing
+
+NODES = [f"worker-{i}" for i in range(8)]
+
+
+def _owners(assignment):
+    return {key: node for node, keys in assignment.items() for key in keys}
+
+
+def _loads(assignment, weights):
+    return {node: sum(weights[key] for key in keys) for node, keys in assignment.items()}
+
+
+def test_assign_places_every_key_once():
+    ring = ConsistentHashRing(NODES)
+    weights = {f"https://www.etix.com/ticket/p/{i}/event": 1 for i in range(1000)}
+    assignment = ring.assign(weights)
+    assert set(assignment) == set(NODES)
+    placed = [key for keys in assignment.values() for key in keys]
+    assert sorted(placed) == sorted(weights)
+
+
+def test_assign_stays_within_load_bound():
+    ring = ConsistentHashRing(NODES)
+    weights = {f"event-{i}": 1 for i in range(1000)}
+    bound = math.floor(DEFAULT_LOAD_FACTOR * len(weights) / len(NODES))
+    assert max(_loads(ring.assign(weights), weights).values()) <= bound
+
+
+def test_assign_weighted_stays_within_load_bound():
+    rng = random.Random(0)
+    ring = ConsistentHashRing(NODES)
+    weights = {f"event-{i}": rng.randint(1, 40) for i in range(300)}
+    bound = DEFAULT_LOAD_FACTOR * sum(weights.values()) / len(NODES)
+    assert max(_loads(ring.assign(weights), weights).values()) <= bound
+
+
+def test_lookup_is_stable_across_rings():
+    keys = [f"event-{i}" for i in range(200)]
+    first, second = ConsistentHashRing(NODES), ConsistentHashRing(reversed(NODES))
+    assert [first.lookup(key) for key in keys] == [second.lookup(key) for key in keys]
+
+
+def test_adding_a_node_only_moves_keys_to_it():
+    ring = ConsistentHashRing(NODES)
+    weights = {f"event-{i}": 1 for i in range(1000)}
+    plan = ring.assign(weights)
+    before = _owners(plan)
+
+    ring.add_node("worker-8")
+    after = _owners(ring.assign(weights, current=before))
+
+    moved = [key for key in weights if before[key] != after[key]]
+    # Keys move to the new node, or off nodes that are over the lower bound of nine nodes
+    bound = DEFAULT_LOAD_FACTOR * len(weights) / len(ring.nodes)
+    loads_before = _loads(plan, weights)
+    assert all(after[key] == "worker-8" or loads_before[before[key]] > bound for key in moved)
+    # At most the new node's fair share, not a reshuffle
+    assert len(moved) <= len(weights) / len(ring.nodes)
+
+
+def test_removing_a_node_only_moves_its_keys():
+    ring = ConsistentHashRing(NODES)
+    weights = {f"event-{i}": 1 for i in range(1000)}
+    before = _owners(ring.assign(weights))
+
+    ring.remove_node("worker-3")
+    after = _owners(ring.assign(weights, current=before))
+
+    moved = {key for key in weights if before[key] != after[key]}
+    assert moved == {key for key, node in before.items() if node == "worker-3"}
+    assert "worker-3" not in after.values()
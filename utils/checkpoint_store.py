@@ -0,0 +1,92 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+from os import getenv
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from utils.logger import setup_logger
+
+load_dotenv(override=True)
+
+# Keep discovered event and section state on disk, so restarts can skip rediscovering it
+CHECKPOINTS = getenv("CHECKPOINTS", "True") == "True"
+CHECKPOINT_DIR = getenv("CHECKPOINT_DIR", "./checkpoints")
+# Checkpoints older than this (seconds) are ignored on startup
+CHECKPOINT_MAX_AGE = float(getenv("CHECKPOINT_MAX_AGE", 24 * 3600))
+# Saves within this many seconds of each other are written once
+CHECKPOINT_FLUSH_DELAY = 1.0
+
+
+class CheckpointStore:
+    def __init__(self, directory: str = CHECKPOINT_DIR, max_age: float = CHECKPOINT_MAX_AGE):
+        """
+        Small json store for state that is expensive to rediscover after a restart. One file per
+        key, written atomically off the event loop. Saves are coalesced, so callers can save on
+        every change.
+
+        Args:
+            directory: Where checkpoint files are kept
+            max_age: Checkpoints older than this are treated as missing
+        """
+        self.directory = directory
+        self.max_age = max_age
+        self.pending: Dict[str, dict] = {}
+        self.flush_task: Optional[asyncio.Task] = None
+        os.makedirs(directory, exist_ok=True)
+
+        self.logger = setup_logger("CheckpointStore")
+        self.logger.propagate = False
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, hashlib.sha1(key.encode()).hexdigest() + ".json")
+
+    def _read(self, key: str) -> Optional[dict]:
+        try:
+            with open(self._path(key)) as checkpoint_file:
+                checkpoint = json.load(checkpoint_file)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Couldn't read checkpoint for {key}: {e}")
+            return None
+        if time.time() - checkpoint.get("saved_at", 0) > self.max_age:
+            return None
+        return checkpoint.get("data")
+
+    def _write(self, key: str, data: dict) -> None:
+        path = self._path(key)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as checkpoint_file:
+            json.dump({"key": key, "saved_at": time.time(), "data": data}, checkpoint_file)
+        os.replace(tmp_path, path)
+
+    async def load(self, key: str) -> Optional[dict]:
+        if key in self.pending:
+            return dict(self.pending[key])
+        return await asyncio.to_thread(self._read, key)
+
+    def save(self, key: str, data: dict) -> None:
+        """Schedule ``data`` to be written for ``key``. Returns immediately."""
+        self.pending[key] = dict(data)
+        if self.flush_task is None or self.flush_task.done():
+            self.flush_task = asyncio.create_task(self._flush())
+
+    async def _flush(self):
+        await asyncio.sleep(CHECKPOINT_FLUSH_DELAY)
+        pending, self.pending = self.pending, {}
+        for key, data in pending.items():
+            try:
+                await asyncio.to_thread(self._write, key, data)
+            except (OSError, TypeError, ValueError) as e:
+                self.logger.warning(f"Couldn't write checkpoint for {key}: {e}")
+
+    async def delete(self, key: str) -> None:
+        self.pending.pop(key, None)
+        try:
+            await asyncio.to_thread(os.remove, self._path(key))
+        except FileNotFoundError:
+            pass
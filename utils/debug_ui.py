@@ -4,7 +4,17 @@ from textual.widgets import TabbedContent, TabPane, DataTable, Header, Footer, L
 from textual.containers import Container
 from datetime import datetime
 from collections import defaultdict
-import asyncio
+from os import getenv
+import time
+
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+# Seconds between two redraws of the status tables
+STATUS_REFRESH_INTERVAL = float(getenv("STATUS_REFRESH_INTERVAL", 1.0))
+# Most status cells waiting for the next redraw. Further cells are dropped until then
+STATUS_BUFFER_SIZE = int(getenv("STATUS_BUFFER_SIZE", 20000))
 
 class ContextStatsWidget(Static):
     def __init__(self):
@@ -32,18 +42,28 @@ class EventTab(TabPane):
         super().__init__(truncated_name)
         self.event_id = event_id
         self.table = DataTable(zebra_stripes=True)
-        self.table.add_columns("Area", "Status", "Last Updated")
+        self.table.add_column("Area", key="area")
+        self.table.add_column("Status", key="status")
+        self.table.add_column("Last Updated", key="updated")
         self._latest_context_stats = {"total_tabs": 0, "avg_tabs_per_proxy": 0.0}
 
     def compose(self) -> ComposeResult:
         yield self.table
 
     def update_table(self, areas: dict):
-        self.table.clear()
-        now = datetime.now()
-        for area, (status, timestamp) in sorted(areas.items()):
-            seconds_ago = int((now - timestamp).total_seconds())
-            self.table.add_row(str(area), status, f"{seconds_ago}s ago")
+        """Update the rows of the areas in ``areas`` only. Rows of other areas are left as they are."""
+        added = False
+        for area, (status, timestamp) in areas.items():
+            updated = datetime.fromtimestamp(timestamp).strftime("%H:%M:%S")
+            row_key = str(area)
+            if row_key in self.table.rows:
+                self.table.update_cell(row_key, "status", status)
+                self.table.update_cell(row_key, "updated", updated)
+            else:
+                self.table.add_row(row_key, status, updated, key=row_key)
+                added = True
+        if added:
+            self.table.sort("area")
 
 class DebugUI(App):
     CSS_PATH = None
@@ -54,16 +74,20 @@ class DebugUI(App):
 
     def __init__(self):
         super().__init__()
-        self._event_status = defaultdict(dict)  # event_id -> {area_number: (status, timestamp)}
-        self._lock = asyncio.Lock()
+        # (event_id, area_number) -> (status, timestamp) of cells changed since the last redraw.
+        # Only the latest status of a cell is kept, and only the event loop touches it, so it needs no lock
+        self._pending: Dict[tuple, tuple] = {}
         self._running = True
         self._tab_panes = {}
         self._context_stats_widget = None
         self._latest_context_stats = {"total_tabs": 0, "avg_tabs_per_proxy": 0.0}
 
-    async def update_status(self, event_id, area_number, status):
-        async with self._lock:
-            self._event_status[event_id][area_number] = (status, datetime.now())
+    def update_status(self, event_id, area_number, status):
+        """Record a status. Never blocks: the tables pick it up on their next redraw."""
+        key = (event_id, area_number)
+        if len(self._pending) >= STATUS_BUFFER_SIZE and key not in self._pending:
+            return
+        self._pending[key] = (status, time.time())
 
     async def stop(self):
         self._running = False
@@ -77,7 +101,7 @@ class DebugUI(App):
         yield Footer()
 
     async def on_mount(self):
-        self.set_interval(0.5, self.refresh_tabs)
+        self.set_interval(STATUS_REFRESH_INTERVAL, self.refresh_tabs)
 
     def action_toggle_context_stats(self):
         if self._context_stats_widget:
@@ -98,11 +122,16 @@ class DebugUI(App):
         if self._context_stats_widget:
             self._context_stats_widget.update_stats(total_tabs, avg_tabs_per_proxy)
 
-    async def refresh_tabs(self):
-        async with self._lock:
-            snapshot = dict(self._event_status)
+    def refresh_tabs(self):
+        if not self._pending:
+            return
+        pending, self._pending = self._pending, {}
 
-        for event_id, areas in snapshot.items():
+        changed = defaultdict(dict)
+        for (event_id, area_number), update in pending.items():
+            changed[event_id][area_number] = update
+
+        for event_id, areas in changed.items():
             if event_id not in self._tab_panes:
                 tab = EventTab(event_id)
                 self._tab_panes[event_id] = tab
@@ -110,9 +139,3 @@ class DebugUI(App):
 
             self._tab_panes[event_id].update_table(areas)
 
-        current_ids = set(snapshot.keys())
-        for stale_id in list(self._tab_panes.keys()):
-            if stale_id not in current_ids:
-                self._tabs.remove_pane(self._tab_panes[stale_id])
-                del self._tab_panes[stale_id]
-
@@ -0,0 +1,130 @@
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from os import getenv
+from typing import Set
+
+try:
+    import fcntl
+except ImportError:  # Windows: a single scraper worker only
+    fcntl = None
+
+from dotenv import load_dotenv
+
+from utils.logger import setup_logger
+
+load_dotenv(override=True)
+
+FAILURE_SNAPSHOTS_DIR = getenv("FAILURE_SNAPSHOTS_DIR", "./fails")
+# Distinct pages kept per event. The oldest is deleted when a new one comes in. 0 disables snapshots
+FAILURE_SNAPSHOTS_PER_EVENT = int(getenv("FAILURE_SNAPSHOTS_PER_EVENT", 20))
+# Snapshots being written at once, over all events. Further failures aren't captured until one is done
+MAX_PENDING_SNAPSHOTS = 4
+# Snapshots being written. Shared by every event, so the html held in memory stays bounded
+_pending: Set[asyncio.Task] = set()
+
+# Index files are read and rewritten by worker threads, and by the threads of other scraper workers
+_index_lock = threading.Lock()
+
+
+class FailureSnapshots:
+    def __init__(self, directory: str = FAILURE_SNAPSHOTS_DIR, per_event: int = FAILURE_SNAPSHOTS_PER_EVENT):
+        """
+        Keeps the html of pages that failed, for debugging. Pages are gzipped and written by a
+        worker thread. Each event has its own folder with at most ``per_event`` distinct pages and an
+        index.json listing them, newest last. A page identical to one already kept only updates
+        its entry.
+
+        Args:
+            directory: Folder that holds one folder per event
+            per_event: Distinct pages kept per event. 0 or less disables snapshots
+        """
+        self.directory = directory
+        self.per_event = per_event
+
+        self.logger = setup_logger("FailureSnapshots")
+        self.logger.propagate = False
+
+    def should_capture(self, event_key: str, section: str) -> bool:
+        """
+        Whether a snapshot would be taken now. Check it before reading the page, which is a round trip
+        to the browser and a copy of the whole html.
+        """
+        if self.per_event <= 0:
+            return False
+        if len(_pending) >= MAX_PENDING_SNAPSHOTS:
+            self.logger.warning("Skipped a failure snapshot, too many pending", extra={"event": event_key, "section": section})
+            return False
+        return True
+
+    def capture(self, event_key: str, section: str, reason: str, url: str, content: str) -> None:
+        """Store ``content`` in the background. Returns immediately; drops the snapshot when too many are pending."""
+        if not self.should_capture(event_key, section):
+            return
+        task = asyncio.create_task(asyncio.to_thread(self._write, event_key, section, reason, url, content))
+        _pending.add(task)
+        task.add_done_callback(self._done)
+
+    def _done(self, task: asyncio.Task):
+        _pending.discard(task)
+        if not task.cancelled() and task.exception():
+            self.logger.error("Couldn't write failure snapshot: %s", task.exception())
+
+    @staticmethod
+    @contextmanager
+    def _index_file_lock(event_dir: str):
+        """Keeps other scraper workers from rewriting an event's index at the same time."""
+        with _index_lock:
+            if fcntl is None:
+                yield
+                return
+            with open(os.path.join(event_dir, "index.lock"), "a") as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+    def _write(self, event_key: str, section: str, reason: str, url: str, content: str):
+        data = content.encode()
+        digest = hashlib.sha1(data).hexdigest()
+        event_dir = os.path.join(self.directory, event_key)
+        os.makedirs(event_dir, exist_ok=True)
+        filename = f"{digest}.html.gz"
+
+        with self._index_file_lock(event_dir):
+            index_path = os.path.join(event_dir, "index.json")
+            try:
+                with open(index_path) as index_file:
+                    index = json.load(index_file)
+            except (OSError, ValueError):
+                index = []
+
+            entry = next((entry for entry in index if entry["file"] == filename), None)
+            if entry is None:
+                with gzip.open(os.path.join(event_dir, filename), "wb") as snapshot_file:
+                    snapshot_file.write(data)
+                entry = {"file": filename, "first_seen": time.time(), "count": 0, "sections": []}
+            else:
+                index.remove(entry)
+            entry.update(last_seen=time.time(), count=entry["count"] + 1, reason=reason, url=url, size=len(data))
+            if section not in entry["sections"]:
+                entry["sections"].append(section)
+            index.append(entry)
+
+            for evicted in index[:-self.per_event]:
+                try:
+                    os.remove(os.path.join(event_dir, evicted["file"]))
+                except FileNotFoundError:
+                    pass
+            index = index[-self.per_event:]
+
+            tmp_path = f"{index_path}.tmp"
+            with open(tmp_path, "w") as index_file:
+                json.dump(index, index_file, indent=2)
+            os.replace(tmp_path, index_path)
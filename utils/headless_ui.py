@@ -0,0 +1,18 @@
+
+class HeadlessUI:
+    """
+    Stand-in for DebugUI when the terminal UI is disabled. Has the same interface and does nothing,
+    so Textual is never imported.
+    """
+
+    def update_status(self, event_id, area_number, status):
+        pass
+
+    def update_context_stats_widget(self, total_tabs: int, avg_tabs_per_proxy: float):
+        pass
+
+    async def run_async(self):
+        pass
+
+    async def stop(self):
+        pass
@@ -1,13 +1,166 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import re
+import threading
+import time
+from os import getenv
+from typing import Dict
 
-def setup_logger(name, level=logging.DEBUG, logfile='./logs/logfile.log'):
+from dotenv import load_dotenv
+
+load_dotenv(override=True)
+
+LOG_LEVEL = getenv("LOG_LEVEL", "DEBUG")
+# Log files are rotated at this size, keeping LOG_BACKUP_COUNT old files
+LOG_MAX_BYTES = int(getenv("LOG_MAX_BYTES", 50 * 1024 * 1024))
+LOG_BACKUP_COUNT = int(getenv("LOG_BACKUP_COUNT", 5))
+# Each message template is logged at most LOG_RATE_LIMIT times per LOG_RATE_INTERVAL seconds. 0 disables the limit
+LOG_RATE_LIMIT = int(getenv("LOG_RATE_LIMIT", 30))
+LOG_RATE_INTERVAL = float(getenv("LOG_RATE_INTERVAL", 60))
+# Records waiting for the writer thread. Further records are dropped and counted
+LOG_QUEUE_SIZE = 10000
+
+# Extra fields that are appended to the message when a record has them
+STRUCTURED_FIELDS = ("event", "section", "proxy")
+
+_DIGITS = re.compile(r"\d+")
+
+
+class RateLimitFilter(logging.Filter):
+    def __init__(self, limit: int = LOG_RATE_LIMIT, interval: float = LOG_RATE_INTERVAL):
+        """
+        Lets each message template through at most ``limit`` times per ``interval`` seconds. The
+        template is the unformatted message of %-style calls, or the message with its numbers
+        masked otherwise. Warnings and errors are limited the same way, so incident storms
+        can't flood the disk. The first record after a window reports how many were suppressed.
+        """
+        super().__init__()
+        self.limit = limit
+        self.interval = interval
+        # key -> [window start, records in window, suppressed in window]
+        self.windows: Dict[tuple, list] = {}
+        self.lock = threading.Lock()
+
+    def _key(self, record: logging.LogRecord) -> tuple:
+        template = getattr(record, "log_key", None)
+        if template is None:
+            template = record.msg if record.args or not isinstance(record.msg, str) else _DIGITS.sub("#", record.msg[:200])
+        # Every section gets its own budget, so one noisy section doesn't hide the others
+        return record.name, record.levelno, str(template), getattr(record, "event", None), getattr(record, "section", None)
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0:
+            return True
+        key = self._key(record)
+        now = time.monotonic()
+        with self.lock:
+            window = self.windows.get(key)
+            if window is None or now - window[0] >= self.interval:
+                suppressed = window[2] if window else 0
+                self.windows[key] = [now, 1, 0]
+                if len(self.windows) > LOG_QUEUE_SIZE:
+                    self._forget_old(now)
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if window[1] < self.limit:
+                window[1] += 1
+                return True
+            window[2] += 1
+            return False
+
+    def _forget_old(self, now: float):
+        for key in [key for key, window in self.windows.items() if now - window[0] >= self.interval]:
+            del self.windows[key]
+
+
+class StructuredFormatter(logging.Formatter):
+    """The usual format, followed by ``key=value`` for the structured fields a record carries."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        message = super().format(record)
+        fields = [f"{name}={getattr(record, name)}" for name in STRUCTURED_FIELDS if hasattr(record, name)]
+        if getattr(record, "suppressed", 0):
+            fields.append(f"suppressed={record.suppressed}")
+        if getattr(record, "dropped", 0):
+            fields.append(f"dropped={record.dropped}")
+        return f"{message} [{' '.join(fields)}]" if fields else message
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """Never blocks the caller. When the writer thread falls behind, records are dropped and counted."""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # The queue never leaves the process, so the record is formatted by the writer thread
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self.dropped:
+            record.dropped = self.dropped
+        try:
+            self.queue.put_nowait(record)
+            self.dropped = 0
+        except queue.Full:
+            self.dropped += 1
+
+
+_handlers: Dict[str, DroppingQueueHandler] = {}
+_listeners = []
+_handlers_lock = threading.Lock()
+
+
+def _queue_handler(logfile: str) -> DroppingQueueHandler:
+    """One queue and writer thread per log file, shared by every logger writing to it."""
+    suffix = getenv("LOG_FILE_SUFFIX")
+    if suffix:
+        # Processes sharing a log directory each rotate their own file
+        root, ext = os.path.splitext(logfile)
+        logfile = f"{root}.{suffix}{ext}"
+
+    with _handlers_lock:
+        if logfile in _handlers:
+            return _handlers[logfile]
+
+        os.makedirs(os.path.dirname(logfile) or ".", exist_ok=True)
+        file_handler = logging.handlers.RotatingFileHandler(logfile, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUP_COUNT)
+        file_handler.setFormatter(StructuredFormatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+
+        log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        listener = logging.handlers.QueueListener(log_queue, file_handler, respect_handler_level=False)
+        listener.start()
+        _listeners.append(listener)
+
+        handler = DroppingQueueHandler(log_queue)
+        handler.addFilter(RateLimitFilter())
+        _handlers[logfile] = handler
+        return handler
+
+
+@atexit.register
+def _stop_listeners():
+    """Write out whatever is still queued."""
+    for listener in _listeners:
+        listener.stop()
+    _listeners.clear()
+
+
+def setup_logger(name, level=LOG_LEVEL, logfile='./logs/logfile.log'):
     """
-    Configure and return a logger with the specified name and level
-    
+    Configure and return a logger with the specified name and level. Records are handed to a
+    writer thread through a bounded queue, so logging never does disk I/O on the event loop.
+
     Args:
         name: Logger name
         level: Logging level
-        
+        logfile: File to write to. Rotated at LOG_MAX_BYTES
+
     Returns:
         Configured logger instance
     """
@@ -16,18 +169,7 @@ def setup_logger(name, level=logging.DEBUG, logfile='./logs/logfile.log'):
     # Only configure if no handlers exist (prevent duplicate handlers)
     if not logger.handlers:
         logger.setLevel(level)
-
-        # Create file handler
-        handler = logging.FileHandler(logfile)
-        handler.setLevel(level)
-
-        # Create formatter
-        formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-        handler.setFormatter(formatter)
-
-        # Add handler to logger
-
-        logger.addHandler(handler)
+        logger.addHandler(_queue_handler(logfile))
 
     return logger
 
@@ -35,4 +177,4 @@ def setup_logger(name, level=logging.DEBUG, logfile='./logs/logfile.log'):
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
-)
\ No newline at end of file
+)
@@ -0,0 +1,172 @@
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+import tracemalloc
+from collections import Counter
+from os import getenv
+from typing import Dict, Optional
+
+from dotenv import load_dotenv
+
+from utils.logger import setup_logger
+
+load_dotenv(override=True)
+
+# Profile this many seconds right after start. 0 only profiles on SIGUSR1
+PROFILE_SECONDS = float(getenv("PROFILE_SECONDS", 0))
+# Length of a profile started by SIGUSR1
+PROFILE_SIGNAL_SECONDS = float(getenv("PROFILE_SIGNAL_SECONDS", 30))
+# Seconds between two samples of every thread's stack
+PROFILE_INTERVAL = float(getenv("PROFILE_INTERVAL", 0.01))
+# Also diff tracemalloc snapshots taken at the start and end of a profile. Slows allocations down while it runs
+PROFILE_TRACEMALLOC = getenv("PROFILE_TRACEMALLOC", "False") == "True"
+PROFILE_DIR = getenv("PROFILE_DIR", "./profiles")
+# Frames kept per sample, innermost first. Deeper stacks lose their outermost frames
+MAX_STACK_DEPTH = 128
+# Lines of the tracemalloc diff written
+TRACEMALLOC_TOP = 50
+
+
+def _frame_label(code) -> str:
+    # co_qualname is new in Python 3.11
+    return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)})"
+
+
+def _coroutine_label(task: asyncio.Task) -> str:
+    coroutine = task.get_coro()
+    name = getattr(coroutine, "__qualname__", None) or type(coroutine).__name__
+    return f"task {name}"
+
+
+class SamplingProfiler:
+    def __init__(self, name: str, directory: str = PROFILE_DIR, interval: float = PROFILE_INTERVAL,
+                 trace_memory: bool = PROFILE_TRACEMALLOC):
+        """
+        Samples the stack of every thread from a background thread and writes them as folded
+        stacks (``thread;task;outer;...;inner <count>``), the input of flamegraph.pl, speedscope and
+        similar tools. Samples taken on a watched event loop's thread start with the coroutine
+        of the asyncio task running at that moment, so time spent in e.g. CDP round trips,
+        JSON decoding or logging is attributed to the task that caused it.
+
+        Nothing runs between profiles. A profile only reads frames, so it doesn't change what the
+        process does; at the default interval it costs a few percent of one core.
+
+        Args:
+            name: Process name, used in file names (e.g. "scraper" or "backend")
+            directory: Folder profiles are written to
+            interval: Seconds between two samples
+            trace_memory: Also write a diff of tracemalloc snapshots from the start and end of each profile
+        """
+        self.name = name
+        self.directory = directory
+        self.interval = interval
+        self.trace_memory = trace_memory
+        # thread id -> event loop running on it
+        self.loops: Dict[int, asyncio.AbstractEventLoop] = {}
+        self.thread: Optional[threading.Thread] = None
+
+        self.logger = setup_logger("Profiler")
+        self.logger.propagate = False
+
+    def watch_loop(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Attribute samples of the calling thread to the asyncio task running on ``loop`` (default: the running loop)."""
+        self.loops[threading.get_ident()] = loop or asyncio.get_running_loop()
+
+    @property
+    def running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds: float) -> bool:
+        """Profile for ``seconds`` in the background. False if a profile is already running."""
+        if self.running:
+            self.logger.warning("A profile is already running")
+            return False
+        self.thread = threading.Thread(target=self._run, args=(seconds,), name="profiler", daemon=True)
+        self.thread.start()
+        return True
+
+    def _sample(self, stacks: Counter, own_id: int):
+        threads = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            labels = []
+            while frame is not None and len(labels) < MAX_STACK_DEPTH:
+                labels.append(_frame_label(frame.f_code))
+                frame = frame.f_back
+            labels.append(threads.get(thread_id, str(thread_id)))
+            loop = self.loops.get(thread_id)
+            if loop is not None:
+                try:
+                    task = asyncio.current_task(loop)
+                except RuntimeError:
+                    task = None
+                labels.insert(-1, _coroutine_label(task) if task else "no task")
+            stacks[";".join(reversed(labels))] += 1
+
+    def _run(self, seconds: float):
+        started_at = time.time()
+        self.logger.info(f"Profiling {self.name} for {seconds:.0f}s")
+        try:
+            if self.trace_memory:
+                tracing = tracemalloc.is_tracing()
+                if not tracing:
+                    tracemalloc.start()
+                first_snapshot = self._memory_snapshot()
+
+            stacks: Counter = Counter()
+            samples = 0
+            own_id = threading.get_ident()
+            deadline = time.monotonic() + seconds
+            while time.monotonic() < deadline:
+                self._sample(stacks, own_id)
+                samples += 1
+                time.sleep(self.interval)
+
+            os.makedirs(self.directory, exist_ok=True)
+            prefix = os.path.join(self.directory, f"{self.name}-{os.getpid()}-{time.strftime('%Y%m%d-%H%M%S', time.localtime(started_at))}")
+            self._write(f"{prefix}.folded", "".join(f"{stack} {count}\n" for stack, count in stacks.most_common()))
+            self.logger.info(f"Wrote {samples} samples of {self.name} to {prefix}.folded")
+
+            if self.trace_memory:
+                growth = self._memory_snapshot().compare_to(first_snapshot, "lineno")
+                if not tracing:
+                    tracemalloc.stop()
+                lines = [f"Allocations that grew during {seconds:.0f}s, largest first\n"]
+                lines.extend(f"{stat}\n" for stat in growth[:TRACEMALLOC_TOP])
+                self._write(f"{prefix}.tracemalloc.txt", "".join(lines))
+                self.logger.info(f"Wrote allocation growth of {self.name} to {prefix}.tracemalloc.txt")
+        except Exception as e:
+            self.logger.error(f"Profiling failed: {e}")
+
+    @staticmethod
+    def _memory_snapshot() -> tracemalloc.Snapshot:
+        # Without the samples collected by the profile itself
+        return tracemalloc.take_snapshot().filter_traces((
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, tracemalloc.__file__),
+        ))
+
+    @staticmethod
+    def _write(path: str, content: str):
+        # Tools watching the folder never see a half written file
+        with open(path + ".tmp", "w") as f:
+            f.write(content)
+        os.replace(path + ".tmp", path)
+
+
+def install_profiler(name: str) -> SamplingProfiler:
+    """
+    Set up profiling of this process: a profile of PROFILE_SECONDS right away if set, and one of
+    PROFILE_SIGNAL_SECONDS whenever the process gets SIGUSR1 (``kill -USR1 <pid>``). Call it from
+    the main thread, and ``watch_loop`` from the event loop to attribute samples to tasks.
+    """
+    profiler = SamplingProfiler(name)
+    if hasattr(signal, "SIGUSR1") and threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.start(PROFILE_SIGNAL_SECONDS))
+    if PROFILE_SECONDS > 0:
+        profiler.start(PROFILE_SECONDS)
+    return profiler
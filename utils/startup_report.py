@@ -0,0 +1,73 @@
+import time
+from typing import Dict, Iterable, Optional
+
+from utils.logger import setup_logger
+
+
+class StartupReport:
+    def __init__(self):
+        """
+        Tracks how long a (re)start takes to become useful: time until the first section data
+        reaches the backend, and time until every event has all of its sections loaded.
+        All times are in seconds since the report was created.
+        """
+        self.started_at = time.monotonic()
+        self.expected_events: set[str] = set()
+        self.browsers_ready: int = 0
+        self.first_data_at: Optional[float] = None
+        self.full_coverage_at: Optional[float] = None
+        self.event_first_data: Dict[str, float] = {}
+        self.event_covered: Dict[str, float] = {}
+
+        self.logger = setup_logger("StartupReport", logfile='./logs/browser_manager.log')
+        self.logger.propagate = False
+
+    def _elapsed(self) -> float:
+        return time.monotonic() - self.started_at
+
+    def expect_events(self, event_urls: Iterable[str]) -> None:
+        self.expected_events.update(event_urls)
+
+    def forget_event(self, event_url: str) -> None:
+        """An event was removed or its lease lost. Full coverage no longer waits for it."""
+        self.expected_events.discard(event_url)
+        self._check_full_coverage()
+
+    def browser_ready(self) -> None:
+        self.browsers_ready += 1
+        self.logger.info(f"Browser {self.browsers_ready} ready after {self._elapsed():.1f}s")
+
+    def data_received(self, event_url: str) -> None:
+        """Called after every successful post. Only the first one per event is recorded."""
+        if event_url in self.event_first_data:
+            return
+        elapsed = self._elapsed()
+        self.event_first_data[event_url] = elapsed
+        if self.first_data_at is None:
+            self.first_data_at = elapsed
+            self.logger.info(f"Time to first data: {elapsed:.1f}s ({event_url})")
+
+    def event_loaded(self, event_url: str) -> None:
+        """Called once all sections found at startup for an event have been spawned."""
+        if event_url in self.event_covered:
+            return
+        elapsed = self._elapsed()
+        self.event_covered[event_url] = elapsed
+        self.logger.info(f"Initial loading complete after {elapsed:.1f}s: {event_url} "
+                         f"({len(self.event_covered)}/{len(self.expected_events)} events)")
+        self._check_full_coverage()
+
+    def _check_full_coverage(self) -> None:
+        if self.full_coverage_at is None and self.event_covered and self.expected_events <= set(self.event_covered):
+            self.full_coverage_at = self._elapsed()
+            self.logger.info(f"Time to full coverage: {self.full_coverage_at:.1f}s")
+
+    def summary(self) -> dict:
+        return {
+            "browsers_ready": self.browsers_ready,
+            "events_expected": len(self.expected_events),
+            "events_with_data": len(self.event_first_data),
+            "events_loaded": len(self.event_covered),
+            "time_to_first_data": self.first_data_at,
+            "time_to_full_coverage": self.full_coverage_at,
+        }